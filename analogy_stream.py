@@ -0,0 +1,64 @@
+import re
+from typing import List, Optional, Tuple
+
+# The five sections every analogy prompt asks the model for, in order
+ANALOGY_SECTIONS = ["Simple Explanation", "Local Analogy", "Connection", "Example", "Summary"]
+
+# Name feed() reports for text the model writes before the first section header
+PREAMBLE = "Preamble"
+
+SECTION_HEADER = re.compile(
+    r"(?:^|\n)[ \t]*(?:#+[ \t]*)?(?:\d+\.[ \t]*)?\*\*(" + "|".join(ANALOGY_SECTIONS) + r")\*\*",
+    re.IGNORECASE
+)
+
+
+class SectionStreamParser:
+    """
+    Incrementally splits streamed analogy text into its five sections.
+
+    feed() returns the sections completed by a chunk as (name, text) pairs; a
+    section is complete once the next section header has fully arrived. Any
+    text before the first header is returned once, as PREAMBLE, when that
+    header arrives. finish() flushes whatever is left when the stream ends.
+    """
+
+    def __init__(self):
+        self.buffer = ""
+        self.current: Optional[str] = None
+        self.header_end = 0
+        self.preamble = ""
+
+    def feed(self, chunk: str) -> List[Tuple[str, str]]:
+        self.buffer += chunk
+        completed = []
+        while True:
+            match = SECTION_HEADER.search(self.buffer, self.header_end)
+            if match is None:
+                return completed
+            text = self.buffer[:match.start()]
+            if self.current is None:
+                self.preamble += text
+                if self.preamble.strip():
+                    completed.append((PREAMBLE, self.preamble.strip()))
+            else:
+                completed.append((self.current, text.strip()))
+            self.current = self._canonical(match.group(1))
+            self.buffer = self.buffer[match.start():]
+            self.header_end = match.end() - match.start()
+
+    def finish(self) -> List[Tuple[str, str]]:
+        if self.current is None:
+            # The model ignored the structure; surface everything as one section
+            text = (self.preamble + self.buffer).strip()
+            return [(ANALOGY_SECTIONS[0], text)] if text else []
+        completed = [(self.current, self.buffer.strip())]
+        self.buffer = ""
+        self.current = None
+        return completed
+
+    def _canonical(self, name: str) -> str:
+        for section in ANALOGY_SECTIONS:
+            if section.lower() == name.lower():
+                return section
+        return name
@@ -0,0 +1,77 @@
+"""
+Load test for the async service paths.
+
+Drives agenerate_analogy and agenerate_exercises against a local fake
+model at increasing concurrency on a single event loop and reports
+throughput and latency percentiles.
+
+    python -m benchmarks.async_load --requests 400 --latency 0.1
+"""
+import argparse
+import asyncio
+import statistics
+import time
+
+from fake_model import FakeGenerativeModel
+from generate_analogy import LocalAnalogyService, generate_local_analogy
+from personalized_exercise import PersonalizedExerciseService, generate_personalized_exercises
+from benchmarks.samples import SAMPLE_ANALOGY_REQUEST, SAMPLE_EXERCISE_REQUEST
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+async def run_level(call, requests: int, concurrency: int) -> dict:
+    semaphore = asyncio.Semaphore(concurrency)
+    timings = []
+
+    async def one():
+        async with semaphore:
+            start = time.perf_counter()
+            result = await call()
+            timings.append(time.perf_counter() - start)
+            assert result["success"], result
+
+    start = time.perf_counter()
+    await asyncio.gather(*(one() for _ in range(requests)))
+    elapsed = time.perf_counter() - start
+    return {
+        "concurrency": concurrency,
+        "rps": requests / elapsed,
+        "p50_ms": statistics.median(timings) * 1000,
+        "p99_ms": percentile(timings, 99) * 1000
+    }
+
+
+async def main_async(args):
+    model = FakeGenerativeModel(latency=args.latency)
+    analogy_service = LocalAnalogyService(model=model)
+    exercise_service = PersonalizedExerciseService(model=model)
+    analogy_request = generate_local_analogy(SAMPLE_ANALOGY_REQUEST)
+    exercise_request = generate_personalized_exercises(SAMPLE_EXERCISE_REQUEST)
+
+    workloads = [
+        ("agenerate_analogy", lambda: analogy_service.agenerate_analogy(analogy_request)),
+        ("agenerate_exercises", lambda: exercise_service.agenerate_exercises(exercise_request)),
+    ]
+    for name, call in workloads:
+        print(name)
+        print(f"{'concurrency':>12}{'req/s':>10}{'p50 ms':>10}{'p99 ms':>10}")
+        for concurrency in args.concurrency:
+            row = await run_level(call, args.requests, concurrency)
+            print(f"{row['concurrency']:>12}{row['rps']:>10.1f}{row['p50_ms']:>10.1f}{row['p99_ms']:>10.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=400)
+    parser.add_argument("--latency", type=float, default=0.1, help="seconds per model call")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 10, 50, 100, 400])
+    asyncio.run(main_async(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+"""
+Classroom burst: many students submit the same projected question at once.
+
+Sends --students identical analogy requests (different student ids)
+concurrently, from threads and from asyncio tasks, with and without a
+SingleFlight layer, and reports wall time, model calls and how many
+requests were coalesced onto an in-flight generation.
+
+    python -m benchmarks.coalescing --students 30 --latency 0.2
+"""
+import argparse
+import asyncio
+import copy
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from fake_model import FakeGenerativeModel
+from generate_analogy import LocalAnalogyService, generate_local_analogy
+from single_flight import SingleFlight
+from benchmarks.samples import SAMPLE_ANALOGY_REQUEST
+
+
+def classroom(students: int):
+    requests = []
+    for index in range(students):
+        payload = copy.deepcopy(SAMPLE_ANALOGY_REQUEST)
+        payload["student_context"]["student_id"] = f"student-{index}"
+        requests.append(generate_local_analogy(payload))
+    return requests
+
+
+def run(mode: str, coalesce: bool, args) -> dict:
+    model = FakeGenerativeModel(latency=args.latency)
+    single_flight = SingleFlight() if coalesce else None
+    service = LocalAnalogyService(model=model, single_flight=single_flight)
+    requests = classroom(args.students)
+
+    start = time.perf_counter()
+    if mode == "threads":
+        with ThreadPoolExecutor(max_workers=args.students) as executor:
+            results = list(executor.map(service.generate_analogy, requests))
+    else:
+        async def burst():
+            return await asyncio.gather(*(service.agenerate_analogy(req) for req in requests))
+        results = asyncio.run(burst())
+    elapsed = time.perf_counter() - start
+
+    assert all(result["success"] for result in results)
+    assert [result["student_id"] for result in results] == [req.student_context.student_id for req in requests]
+    return {
+        "elapsed_ms": elapsed * 1000,
+        "calls": model.stats()["calls"],
+        "coalesced": single_flight.stats()["coalesced"] if single_flight else 0
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--students", type=int, default=30)
+    parser.add_argument("--latency", type=float, default=0.2, help="fixed seconds per model call")
+    args = parser.parse_args()
+
+    print(f"{'mode':<10}{'single-flight':>15}{'wall ms':>10}{'calls':>8}{'coalesced':>11}")
+    for mode in ("threads", "asyncio"):
+        for coalesce in (False, True):
+            row = run(mode, coalesce, args)
+            print(f"{mode:<10}{'on' if coalesce else 'off':>15}{row['elapsed_ms']:>10.0f}"
+                  f"{row['calls']:>8}{row['coalesced']:>11}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+"""
+Repair-loop benchmark for malformed exercise responses.
+
+A fake model corrupts a share of its full-set responses the ways real
+output breaks (code fence plus trailing commas, unescaped quotes, truncation,
+missing fields). The service repairs JSON locally and regenerates only the
+broken exercises; the baseline regenerates the whole set whenever anything
+is wrong. Reports latency, model calls and the service's repair stats.
+
+    python -m benchmarks.exercise_repair --requests 100 --corrupt-rate 0.3
+"""
+import argparse
+import json
+import random
+import statistics
+import time
+
+from fake_model import FakeGenerativeModel, default_responder
+from personalized_exercise import PersonalizedExerciseService, generate_personalized_exercises
+from benchmarks.samples import SAMPLE_EXERCISE_REQUEST
+
+
+def corrupt(text: str, rng: random.Random) -> str:
+    data = json.loads(text.strip("`").removeprefix("json\n"))
+    kind = rng.choice(["trailing_comma", "unescaped_quote", "truncated", "missing_field"])
+    if kind == "missing_field":
+        data["exercises"][rng.randrange(len(data["exercises"]))].pop("correct_answer")
+        return json.dumps(data)
+    body = json.dumps(data, indent=2)
+    if kind == "trailing_comma":
+        return "```json\n" + body.replace('"\n    }', '",\n    }') + "\n```"
+    if kind == "unescaped_quote":
+        return body.replace("Count the objects", 'Count the "objects"', 1)
+    return body[:int(len(body) * rng.uniform(0.5, 0.9))]
+
+
+def make_responder(corrupt_rate: float, seed: int):
+    rng = random.Random(seed)
+
+    def responder(prompt: str) -> str:
+        text = default_responder(prompt)
+        # Only full-set responses are corrupted, so both strategies converge
+        if "replace ids" not in prompt and rng.random() < corrupt_rate:
+            return corrupt(text, rng)
+        return text
+    return responder
+
+
+def run(targeted: bool, args) -> dict:
+    model = FakeGenerativeModel(latency=args.latency, per_token_latency=args.per_token_latency,
+                                responder=make_responder(args.corrupt_rate, args.seed))
+    service = PersonalizedExerciseService(model=model)
+    exercise_request = generate_personalized_exercises(SAMPLE_EXERCISE_REQUEST)
+
+    timings = []
+    for _ in range(args.requests):
+        start = time.perf_counter()
+        if targeted:
+            result = service.generate_exercises(exercise_request)
+        else:
+            # Baseline: any malformed JSON or invalid exercise regenerates the whole set
+            prompt = service._create_exercise_prompt(exercise_request)
+            for _ in range(3):
+                exercises, repaired = service._extract_exercises(service._generate_content(prompt))
+                exercises = service._pad_exercises(exercises, exercise_request)
+                if not repaired and not service._failing_indices(exercises):
+                    break
+            result = {"exercises": exercises}
+        timings.append(time.perf_counter() - start)
+        assert len(result["exercises"]) == exercise_request.exercise_count
+
+    return {
+        "p50_ms": statistics.median(timings) * 1000,
+        "mean_ms": statistics.mean(timings) * 1000,
+        "calls_per_request": model.stats()["calls"] / args.requests,
+        "repair": service.repair_stats() if targeted else None
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=100)
+    parser.add_argument("--corrupt-rate", type=float, default=0.3)
+    parser.add_argument("--latency", type=float, default=0.02, help="fixed seconds per model call")
+    parser.add_argument("--per-token-latency", type=float, default=0.0002)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    baseline = run(False, args)
+    targeted = run(True, args)
+
+    print(f"{'strategy':<18}{'p50 ms':>10}{'mean ms':>10}{'calls':>8}")
+    for name, row in (("whole-set retry", baseline), ("targeted repair", targeted)):
+        print(f"{name:<18}{row['p50_ms']:>10.1f}{row['mean_ms']:>10.1f}{row['calls_per_request']:>8.2f}")
+
+    repair = targeted["repair"]
+    print(f"\nrepair rate {repair['repair_rate']:.0%} of {repair['needed_repair']} broken responses "
+          f"({repair['repaired_locally']} fixed locally, {repair['regenerated_items']} exercises regenerated "
+          f"in {repair['regeneration_calls']} calls), latency saved {repair['latency_saved']:.2f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,65 @@
+"""
+Parity benchmark for the fused vs. chained analogy pipelines.
+
+Runs both modes of LocalAnalogyService against a local fake model and
+compares latency, model calls and token usage.
+
+    python -m benchmarks.fused_vs_chained --requests 50 --latency 0.05
+"""
+import argparse
+import statistics
+import time
+
+from fake_model import FakeGenerativeModel
+from generate_analogy import LocalAnalogyService, generate_local_analogy
+from benchmarks.samples import SAMPLE_ANALOGY_REQUEST
+
+PARITY_FIELDS = ["success", "student_id", "original_question", "subject", "topic", "cultural_context", "region"]
+
+
+def run_mode(fused: bool, requests: int, latency: float, per_token_latency: float) -> dict:
+    model = FakeGenerativeModel(latency=latency, per_token_latency=per_token_latency)
+    service = LocalAnalogyService(model=model, fused=fused)
+    analogy_request = generate_local_analogy(SAMPLE_ANALOGY_REQUEST)
+
+    timings = []
+    result = None
+    for _ in range(requests):
+        start = time.perf_counter()
+        result = service.generate_analogy(analogy_request)
+        timings.append(time.perf_counter() - start)
+
+    stats = model.stats()
+    return {
+        "result": result,
+        "p50_ms": statistics.median(timings) * 1000,
+        "mean_ms": statistics.mean(timings) * 1000,
+        "calls_per_request": stats["calls"] / requests,
+        "tokens_per_request": stats["total_tokens"] / requests,
+        "prompt_tokens_per_request": stats["prompt_tokens"] / requests
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=50)
+    parser.add_argument("--latency", type=float, default=0.05, help="fixed seconds per model call")
+    parser.add_argument("--per-token-latency", type=float, default=0.0005)
+    args = parser.parse_args()
+
+    chained = run_mode(False, args.requests, args.latency, args.per_token_latency)
+    fused = run_mode(True, args.requests, args.latency, args.per_token_latency)
+
+    for field in PARITY_FIELDS + ["detected_language", "translated_question"]:
+        assert chained["result"].get(field) == fused["result"].get(field), field
+    assert set(chained["result"]) == set(fused["result"])
+
+    print(f"{'mode':<10}{'p50 ms':>10}{'mean ms':>10}{'calls':>8}{'tokens':>10}{'prompt':>10}")
+    for name, row in (("chained", chained), ("fused", fused)):
+        print(f"{name:<10}{row['p50_ms']:>10.1f}{row['mean_ms']:>10.1f}{row['calls_per_request']:>8.1f}"
+              f"{row['tokens_per_request']:>10.0f}{row['prompt_tokens_per_request']:>10.0f}")
+    print(f"p50 speedup: {chained['p50_ms'] / fused['p50_ms']:.2f}x")
+
+
+if __name__ == "__main__":
+    main()
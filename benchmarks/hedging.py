@@ -0,0 +1,72 @@
+"""
+Tail-latency simulation for hedged requests.
+
+The fake model's latency is heavy-tailed: most calls take around
+--base-latency, but a --slow-rate share are Pareto-distributed stragglers
+several times slower. Analogy generations run on asyncio at
+--concurrency with and without a Hedger, and the run reports p50/p99/p99.9
+latency and how many extra model calls the hedges cost.
+
+    python -m benchmarks.hedging --requests 2000 --concurrency 50
+"""
+import argparse
+import asyncio
+import time
+
+from fake_model import FakeGenerativeModel, latency_distribution
+from generate_analogy import LocalAnalogyService, generate_local_analogy
+from hedging import Hedger
+from benchmarks.async_load import percentile
+from benchmarks.samples import SAMPLE_ANALOGY_REQUEST
+
+
+async def run(hedger, args) -> dict:
+    model = FakeGenerativeModel(latency=latency_distribution("heavy_tail", seed=args.seed, base=args.base_latency,
+                                                         slow_rate=args.slow_rate))
+    service = LocalAnalogyService(model=model, hedger=hedger)
+    payload = dict(SAMPLE_ANALOGY_REQUEST, question="Why does it rain?", preferred_language="english")
+    analogy_request = generate_local_analogy(payload)
+    semaphore = asyncio.Semaphore(args.concurrency)
+    timings = []
+
+    async def one():
+        async with semaphore:
+            start = time.perf_counter()
+            result = await service.agenerate_analogy(analogy_request)
+            timings.append(time.perf_counter() - start)
+            assert result["success"], result
+
+    await asyncio.gather(*(one() for _ in range(args.requests)))
+    return {
+        "p50_ms": percentile(timings, 50) * 1000,
+        "p99_ms": percentile(timings, 99) * 1000,
+        "p999_ms": percentile(timings, 99.9) * 1000,
+        "calls_per_request": model.stats()["calls"] / args.requests
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--base-latency", type=float, default=0.02)
+    parser.add_argument("--slow-rate", type=float, default=0.03)
+    parser.add_argument("--budget", type=float, default=0.05, help="max share of calls that may be hedged")
+    parser.add_argument("--seed", type=int, default=11)
+    args = parser.parse_args()
+
+    hedger = Hedger(delay_percentile=95, initial_delay=args.base_latency * 2,
+                    min_delay=args.base_latency, budget=args.budget)
+    print(f"{'hedging':<9}{'p50 ms':>9}{'p99 ms':>9}{'p99.9 ms':>10}{'calls/req':>11}")
+    for name, h in (("off", None), ("on", hedger)):
+        row = asyncio.run(run(h, args))
+        print(f"{name:<9}{row['p50_ms']:>9.1f}{row['p99_ms']:>9.1f}{row['p999_ms']:>10.1f}{row['calls_per_request']:>11.3f}")
+
+    stats = hedger.stats()
+    print(f"\nhedged {stats['hedged']} of {stats['calls']} calls ({stats['hedge_rate']:.1%}), "
+          f"backup won {stats['hedge_wins']}, denied by budget {stats['budget_denied']}, "
+          f"delay {stats['delay'] * 1000:.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,178 @@
+"""
+Load test for the HTTP service (server.py).
+
+By default the ASGI app is driven in-process against fake-model services,
+so the numbers are the server's own overhead (routing, body parsing,
+JSON serialization, admission) on top of the model latency. With --url
+it sends real HTTP requests to a running server from a thread pool, one
+keep-alive connection per thread, instead.
+
+For each endpoint and concurrency level it reports req/s, p50 and p99,
+then the highest throughput whose p99 stays within each --p99-target.
+
+    python -m benchmarks.http_load --requests 400 --latency 0.1 --p99-target 150 250
+    python -m benchmarks.http_load --url http://127.0.0.1:8000 --concurrency 8 32
+"""
+import argparse
+import asyncio
+import http.client
+import socket
+import statistics
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlsplit
+
+from fake_model import FakeGenerativeModel
+from generate_analogy import LocalAnalogyService
+from personalized_exercise import PersonalizedExerciseService
+from server import ServerConfig, create_app, dumps
+from benchmarks.async_load import percentile
+from benchmarks.samples import SAMPLE_ANALOGY_REQUEST, SAMPLE_EXERCISE_REQUEST
+
+ENDPOINTS = [("/analogy", SAMPLE_ANALOGY_REQUEST), ("/exercises", SAMPLE_EXERCISE_REQUEST)]
+
+
+async def asgi_post(app, path: str, body: bytes) -> int:
+    scope = {
+        "type": "http", "method": "POST", "path": path,
+        "headers": [(b"content-type", b"application/json"), (b"content-length", str(len(body)).encode())]
+    }
+    messages = [{"type": "http.request", "body": body, "more_body": False}]
+    status = []
+
+    async def receive():
+        return messages.pop() if messages else {"type": "http.disconnect"}
+
+    async def send(message):
+        if message["type"] == "http.response.start":
+            status.append(message["status"])
+
+    await app(scope, receive, send)
+    return status[0]
+
+
+def summarize(concurrency: int, timings, statuses, elapsed: float) -> dict:
+    ok = sum(1 for status in statuses if status == 200)
+    return {
+        "concurrency": concurrency,
+        "rps": ok / elapsed,
+        "errors": len(statuses) - ok,
+        "p50_ms": statistics.median(timings) * 1000,
+        "p99_ms": percentile(timings, 99) * 1000
+    }
+
+
+async def run_in_process(app, path: str, body: bytes, requests: int, concurrency: int) -> dict:
+    semaphore = asyncio.Semaphore(concurrency)
+    timings, statuses = [], []
+
+    async def one():
+        async with semaphore:
+            start = time.perf_counter()
+            statuses.append(await asgi_post(app, path, body))
+            timings.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(one() for _ in range(requests)))
+    return summarize(concurrency, timings, statuses, time.perf_counter() - start)
+
+
+class KeepAliveClient:
+    """
+    One keep-alive connection per thread to the server at base_url
+    """
+
+    def __init__(self, base_url: str):
+        parts = urlsplit(base_url)
+        self.connection_class = http.client.HTTPSConnection if parts.scheme == "https" else http.client.HTTPConnection
+        self.host, self.port = parts.hostname, parts.port
+        self.local = threading.local()
+
+    def post(self, path: str, body: bytes) -> int:
+        connection = getattr(self.local, "connection", None)
+        if connection is None:
+            connection = self.local.connection = self.connection_class(self.host, self.port, timeout=60)
+            connection.connect()
+            # Headers and body go out in separate writes; don't let Nagle delay the body
+            connection.sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        try:
+            connection.request("POST", path, body=body, headers={"Content-Type": "application/json"})
+            response = connection.getresponse()
+            response.read()
+        except (http.client.HTTPException, OSError):
+            connection.close()
+            self.local.connection = None
+            raise
+        if response.will_close:
+            connection.close()
+            self.local.connection = None
+        return response.status
+
+
+def run_remote(client: KeepAliveClient, path: str, body: bytes, requests: int, concurrency: int) -> dict:
+    def one(_):
+        start = time.perf_counter()
+        status = client.post(path, body)
+        return time.perf_counter() - start, status
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        results = list(executor.map(one, range(requests)))
+    elapsed = time.perf_counter() - start
+    return summarize(concurrency, [t for t, _ in results], [s for _, s in results], elapsed)
+
+
+def report(path: str, rows, targets):
+    print(path)
+    print(f"{'concurrency':>12}{'req/s':>10}{'p50 ms':>10}{'p99 ms':>10}{'errors':>8}")
+    for row in rows:
+        print(f"{row['concurrency']:>12}{row['rps']:>10.1f}{row['p50_ms']:>10.1f}"
+              f"{row['p99_ms']:>10.1f}{row['errors']:>8}")
+    for target in targets:
+        within = [row for row in rows if row["p99_ms"] <= target and not row["errors"]]
+        if within:
+            best = max(within, key=lambda row: row["rps"])
+            print(f"  p99 <= {target:.0f} ms: {best['rps']:.1f} req/s at concurrency {best['concurrency']}")
+        else:
+            print(f"  p99 <= {target:.0f} ms: not met at any level")
+    print()
+
+
+async def main_async(args):
+    model = FakeGenerativeModel(latency=args.latency)
+    config = ServerConfig(max_concurrency=args.max_concurrency, warm_up=False)
+    app = create_app(config, analogy_service=LocalAnalogyService(model=model),
+                     exercise_service=PersonalizedExerciseService(model=model))
+    for path, payload in ENDPOINTS:
+        body = dumps(payload)
+        await asgi_post(app, path, body)
+        rows = [await run_in_process(app, path, body, args.requests, concurrency)
+                for concurrency in args.concurrency]
+        report(path, rows, args.p99_target)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=400)
+    parser.add_argument("--latency", type=float, default=0.1, help="seconds per fake model call (in-process only)")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 10, 50, 100, 400])
+    parser.add_argument("--max-concurrency", type=int, default=256, help="server admission limit (in-process only)")
+    parser.add_argument("--p99-target", type=float, nargs="+", default=[250.0, 500.0], help="p99 budgets in ms")
+    parser.add_argument("--url", default=None, help="base URL of a running server")
+    args = parser.parse_args()
+
+    if args.url is None:
+        asyncio.run(main_async(args))
+        return
+    client = KeepAliveClient(args.url)
+    for path, payload in ENDPOINTS:
+        path = urlsplit(args.url).path.rstrip("/") + path
+        body = dumps(payload)
+        client.post(path, body)
+        rows = [run_remote(client, path, body, args.requests, concurrency) for concurrency in args.concurrency]
+        report(path, rows, args.p99_target)
+
+
+if __name__ == "__main__":
+    main()
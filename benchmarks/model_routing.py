@@ -0,0 +1,67 @@
+"""
+Per-step latency and cost with and without model routing.
+
+Two fake models stand in for a fast, cheap tier and a slower, stronger
+tier. The same analogy and exercise requests are run with every step on
+the strong model and then with the default step tiers, and the router's
+per-step accounting is printed for both.
+
+    python -m benchmarks.model_routing --requests 20
+"""
+import argparse
+import time
+
+from fake_model import FakeGenerativeModel
+from generate_analogy import LocalAnalogyService, generate_local_analogy
+from model_routing import FAST, STRONG, ModelPrice, ModelRouter
+from personalized_exercise import PersonalizedExerciseService, generate_personalized_exercises
+from benchmarks.samples import SAMPLE_ANALOGY_REQUEST, SAMPLE_EXERCISE_REQUEST
+
+PRICES = {
+    FAST: ModelPrice(input_per_million=0.075, output_per_million=0.30),
+    STRONG: ModelPrice(input_per_million=1.25, output_per_million=5.00),
+}
+
+
+def make_router(routed: bool, args) -> ModelRouter:
+    strong = FakeGenerativeModel("fake-strong", latency=args.strong_latency, per_token_latency=args.per_token_latency)
+    if not routed:
+        return ModelRouter({STRONG: strong}, prices={STRONG: PRICES[STRONG]})
+    fast = FakeGenerativeModel("fake-fast", latency=args.fast_latency, per_token_latency=args.per_token_latency / 4)
+    return ModelRouter({FAST: fast, STRONG: strong}, prices=PRICES)
+
+
+def run(routed: bool, args) -> dict:
+    router = make_router(routed, args)
+    analogy_service = LocalAnalogyService(router=router)
+    exercise_service = PersonalizedExerciseService(router=router)
+    # Romanized question with a Hindi answer: question and response translation both run
+    analogy_request = generate_local_analogy(SAMPLE_ANALOGY_REQUEST)
+    exercise_request = generate_personalized_exercises(SAMPLE_EXERCISE_REQUEST)
+
+    start = time.perf_counter()
+    for _ in range(args.requests):
+        assert analogy_service.generate_analogy(analogy_request)["success"]
+        assert exercise_service.generate_exercises(exercise_request)["success"]
+    return dict(router.stats(), wall_seconds=time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=20)
+    parser.add_argument("--fast-latency", type=float, default=0.02)
+    parser.add_argument("--strong-latency", type=float, default=0.08)
+    parser.add_argument("--per-token-latency", type=float, default=0.0002)
+    args = parser.parse_args()
+
+    for name, routed in (("single model", False), ("routed", True)):
+        stats = run(routed, args)
+        print(f"\n{name}: wall {stats['wall_seconds']:.2f}s, model time {stats['total_seconds']:.2f}s, "
+              f"cost ${stats['total_cost']:.5f}")
+        print(f"  {'step':<22}{'tier':<8}{'calls':>6}{'mean ms':>10}{'cost $':>11}")
+        for step, row in sorted(stats["steps"].items()):
+            print(f"  {step:<22}{row['tier']:<8}{row['calls']:>6}{row['mean_ms']:>10.1f}{row['cost']:>11.5f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,259 @@
+"""
+End-to-end benchmark of the analogy and exercise pipelines.
+
+Runs generate_local_analogy + LocalAnalogyService.generate_analogy and
+generate_personalized_exercises + PersonalizedExerciseService.generate_exercises
+against the local fake backend and reports, per pipeline:
+
+- mean latency per stage (parse, prompt build, detect, translate, generate,
+  parse output) and end to end; model stages come from the router's
+  per-step accounting, the rest from timing the service's own methods
+- throughput and p50/p99 at each --concurrency level on the async path
+- memory per request under tracemalloc: peak allocation while a request
+  runs and bytes still held after it returns
+
+--save-baseline writes the results as JSON; --baseline compares a run with
+a saved one and exits with status 1 if any metric regressed by more than
+--tolerance, so the suite can gate CI.
+
+    python -m benchmarks.pipeline --requests 50 --save-baseline baseline.json
+    python -m benchmarks.pipeline --requests 50 --baseline baseline.json
+"""
+import argparse
+import asyncio
+import json
+import sys
+import time
+import tracemalloc
+from collections import defaultdict
+from typing import Callable, Dict
+
+from generate_analogy import LocalAnalogyService, generate_local_analogy
+from model_backends import FAKE, BackendConfig, create_backend
+from model_routing import (ANALOGY_CREATION, EXERCISE_GENERATION, JSON_REPAIR, LANGUAGE_DETECTION,
+                           QUESTION_TRANSLATION, RESPONSE_TRANSLATION)
+from personalized_exercise import PersonalizedExerciseService, generate_personalized_exercises
+from benchmarks.async_load import run_level
+from benchmarks.samples import SAMPLE_ANALOGY_REQUEST, SAMPLE_EXERCISE_REQUEST
+
+STAGES = ["parse", "prompt_build", "detect", "translate", "generate", "parse_output"]
+
+STEP_STAGES = {
+    LANGUAGE_DETECTION: "detect",
+    QUESTION_TRANSLATION: "translate",
+    RESPONSE_TRANSLATION: "translate",
+    ANALOGY_CREATION: "generate",
+    EXERCISE_GENERATION: "generate",
+    JSON_REPAIR: "generate",
+}
+
+# Differences below these are noise whatever the relative change
+NOISE_FLOORS = {"_ms": 0.2, "_kb": 4.0, "rps": 1.0}
+
+
+class StageTimer:
+    """
+    Accumulates wall time per stage by wrapping methods of one service instance
+    """
+
+    def __init__(self):
+        self.seconds = defaultdict(float)
+
+    def wrap(self, obj, method: str, stage: str):
+        fn = getattr(obj, method)
+
+        def timed(*args, **kwargs):
+            started = time.perf_counter()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                self.seconds[stage] += time.perf_counter() - started
+        setattr(obj, method, timed)
+
+    def call(self, stage: str, fn: Callable, *args):
+        started = time.perf_counter()
+        try:
+            return fn(*args)
+        finally:
+            self.seconds[stage] += time.perf_counter() - started
+
+
+def make_model(args, latency: bool = True):
+    config = BackendConfig(backend=FAKE, seed=args.seed)
+    if latency:
+        config.latency = {"kind": "lognormal", "median": args.latency, "sigma": args.sigma}
+        config.per_token_latency = args.per_token_latency
+    return create_backend("fake-model", config)
+
+
+def analogy_pipeline(args, latency: bool = True):
+    service = LocalAnalogyService(model=make_model(args, latency))
+    return service, lambda payload: service.generate_analogy(generate_local_analogy(payload)), SAMPLE_ANALOGY_REQUEST
+
+
+def exercise_pipeline(args, latency: bool = True):
+    service = PersonalizedExerciseService(model=make_model(args, latency))
+    return service, lambda payload: service.generate_exercises(generate_personalized_exercises(payload)), SAMPLE_EXERCISE_REQUEST
+
+
+def instrument(name: str, service, timer: StageTimer):
+    if name == "analogy":
+        timer.wrap(service.language_detector, "detect", "detect")
+        for method in ("_build_detection_prompt", "_build_question_translation_prompt",
+                       "_build_analogy_prompt", "_build_response_translation_prompt"):
+            timer.wrap(service, method, "prompt_build")
+        timer.wrap(service, "_build_result", "parse_output")
+    else:
+        timer.wrap(service, "_create_exercise_prompt", "prompt_build")
+        timer.wrap(service, "_load_exercises", "parse_output")
+        timer.wrap(service, "_build_result", "parse_output")
+
+
+def measure_stages(name: str, build, args) -> Dict:
+    service, _, payload = build(args)
+    timer = StageTimer()
+    instrument(name, service, timer)
+    parse = generate_local_analogy if name == "analogy" else generate_personalized_exercises
+    run = service.generate_analogy if name == "analogy" else service.generate_exercises
+
+    started = time.perf_counter()
+    for _ in range(args.requests):
+        request = timer.call("parse", parse, payload)
+        assert run(request)["success"]
+    total = time.perf_counter() - started
+
+    seconds = dict(timer.seconds)
+    for step, metrics in service.router.stats()["steps"].items():
+        stage = STEP_STAGES.get(step, step)
+        seconds[stage] = seconds.get(stage, 0.0) + metrics["seconds"]
+    stages = {stage: seconds.get(stage, 0.0) / args.requests * 1000 for stage in STAGES}
+    stages["other"] = max(0.0, total / args.requests * 1000 - sum(stages.values()))
+    return {"stages_ms": stages, "total_ms": total / args.requests * 1000}
+
+
+def measure_memory(build, args) -> Dict:
+    # Zero-latency model: only allocations matter here, and tracemalloc is slow
+    _, call, payload = build(args, latency=False)
+    call(payload)
+    tracemalloc.start()
+    try:
+        peaks = []
+        before = tracemalloc.get_traced_memory()[0]
+        for _ in range(args.memory_requests):
+            current = tracemalloc.get_traced_memory()[0]
+            tracemalloc.reset_peak()
+            assert call(payload)["success"]
+            peaks.append(tracemalloc.get_traced_memory()[1] - current)
+        retained = tracemalloc.get_traced_memory()[0] - before
+    finally:
+        tracemalloc.stop()
+    return {
+        "peak_kb": sum(peaks) / len(peaks) / 1024,
+        "retained_kb": retained / args.memory_requests / 1024
+    }
+
+
+async def measure_throughput(name: str, build, args) -> Dict:
+    service, _, payload = build(args)
+    if name == "analogy":
+        request = generate_local_analogy(payload)
+        call = lambda: service.agenerate_analogy(request)
+    else:
+        request = generate_personalized_exercises(payload)
+        call = lambda: service.agenerate_exercises(request)
+    levels = {}
+    for concurrency in args.concurrency:
+        row = await run_level(call, args.throughput_requests, concurrency)
+        levels[str(concurrency)] = {key: row[key] for key in ("rps", "p50_ms", "p99_ms")}
+    return levels
+
+
+def run(args) -> Dict:
+    results = {}
+    for name, build in (("analogy", analogy_pipeline), ("exercises", exercise_pipeline)):
+        row = measure_stages(name, build, args)
+        row["memory"] = measure_memory(build, args)
+        row["throughput"] = asyncio.run(measure_throughput(name, build, args))
+        results[name] = row
+    return {
+        "config": {key: value for key, value in vars(args).items() if key not in ("baseline", "save_baseline")},
+        "pipelines": results
+    }
+
+
+def flatten(tree: Dict, prefix: str = "") -> Dict[str, float]:
+    flat = {}
+    for key, value in tree.items():
+        path = f"{prefix}.{key}" if prefix else key
+        if isinstance(value, dict):
+            flat.update(flatten(value, path))
+        else:
+            flat[path] = value
+    return flat
+
+
+def compare(current: Dict, baseline: Dict, tolerance: float) -> list:
+    """
+    Metrics worse than the baseline by more than tolerance (and the noise floor)
+    """
+    regressions = []
+    now, before = flatten(current["pipelines"]), flatten(baseline["pipelines"])
+    for metric, old in sorted(before.items()):
+        new = now.get(metric)
+        if new is None:
+            continue
+        higher_is_better = metric.endswith("rps")
+        worse = old - new if higher_is_better else new - old
+        floor = next((value for unit, value in NOISE_FLOORS.items() if unit in metric), 0.0)
+        if worse > max(floor, abs(old) * tolerance):
+            regressions.append((metric, old, new))
+    return regressions
+
+
+def report(results: Dict):
+    for name, row in results["pipelines"].items():
+        print(f"\n{name}: {row['total_ms']:.1f} ms per request, "
+              f"peak {row['memory']['peak_kb']:.1f} KB, retained {row['memory']['retained_kb']:.2f} KB")
+        print("  " + "".join(f"{stage:>14}" for stage in row["stages_ms"]))
+        print("  " + "".join(f"{ms:>14.3f}" for ms in row["stages_ms"].values()))
+        print(f"  {'concurrency':>12}{'req/s':>10}{'p50 ms':>10}{'p99 ms':>10}")
+        for concurrency, level in row["throughput"].items():
+            print(f"  {concurrency:>12}{level['rps']:>10.1f}{level['p50_ms']:>10.1f}{level['p99_ms']:>10.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=50, help="sequential requests for the stage breakdown")
+    parser.add_argument("--memory-requests", type=int, default=20)
+    parser.add_argument("--throughput-requests", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 10, 50])
+    parser.add_argument("--latency", type=float, default=0.02, help="median seconds per model call")
+    parser.add_argument("--sigma", type=float, default=0.3, help="lognormal spread of model latency")
+    parser.add_argument("--per-token-latency", type=float, default=0.0)
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--baseline", help="baseline JSON to compare against")
+    parser.add_argument("--save-baseline", help="write this run's results to a JSON file")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="allowed relative regression")
+    args = parser.parse_args()
+
+    results = run(args)
+    report(results)
+    if args.save_baseline:
+        with open(args.save_baseline, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+        print(f"\nbaseline written to {args.save_baseline}")
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline, args.tolerance)
+        if not regressions:
+            print(f"\nno regressions beyond {args.tolerance:.0%} against {args.baseline}")
+            return
+        print(f"\n{len(regressions)} regression(s) beyond {args.tolerance:.0%} against {args.baseline}:")
+        for metric, old, new in regressions:
+            print(f"  {metric}: {old:.3f} -> {new:.3f}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
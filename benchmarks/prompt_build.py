@@ -0,0 +1,51 @@
+"""
+Prompt build microbenchmark and golden check.
+
+Verifies the services' prompt builders against the original f-string
+prompts (tests/golden_prompts.py, which documents the caching reorder
+they are checked with), then times both.
+
+    python -m benchmarks.prompt_build --iterations 20000
+"""
+import argparse
+import time
+
+from generate_analogy import LocalAnalogyService, generate_local_analogy
+from personalized_exercise import PersonalizedExerciseService, generate_personalized_exercises
+from fake_model import FakeGenerativeModel
+from benchmarks.samples import SAMPLE_ANALOGY_REQUEST, SAMPLE_EXERCISE_REQUEST
+from tests.golden_prompts import check_golden, legacy_analogy_prompt, legacy_exercise_prompt
+
+
+def time_per_call(fn, iterations):
+    start = time.perf_counter()
+    for _ in range(iterations):
+        fn()
+    return (time.perf_counter() - start) / iterations * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--iterations", type=int, default=20000)
+    args = parser.parse_args()
+
+    analogy_service = LocalAnalogyService(model=FakeGenerativeModel())
+    exercise_service = PersonalizedExerciseService(model=FakeGenerativeModel())
+    check_golden(analogy_service, exercise_service)
+    print("golden check: prompts match the originals plus the documented reorder")
+
+    analogy_request = generate_local_analogy(SAMPLE_ANALOGY_REQUEST)
+    exercise_request = generate_personalized_exercises(SAMPLE_EXERCISE_REQUEST)
+    rows = [
+        ("analogy (f-string)", lambda: legacy_analogy_prompt(analogy_service, analogy_request, "Why does it rain?")),
+        ("analogy (service)", lambda: analogy_service._build_analogy_prompt(analogy_request, "Why does it rain?")),
+        ("exercise (f-string)", lambda: legacy_exercise_prompt(exercise_request)),
+        ("exercise (service)", lambda: exercise_service._create_exercise_prompt(exercise_request)),
+    ]
+    print(f"{'prompt':<22}{'us/build':>10}")
+    for name, fn in rows:
+        print(f"{name:<22}{time_per_call(fn, args.iterations):>10.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+"""
+Exam-season burst against a quota-enforcing fake model.
+
+The fake model allows --quota-rpm requests per minute and answers anything
+beyond that with a 429, like the Gemini API. A burst of interactive
+analogy requests and bulk worksheet requests is sent at once, first
+without a scheduler and then with both services sharing one. Reports
+successes, 429s seen by the model, and per-priority wait times.
+
+    python -m benchmarks.rate_limit --quota-rpm 600 --analogies 40 --worksheets 40
+"""
+import argparse
+import asyncio
+import time
+
+from fake_model import FakeGenerativeModel
+from generate_analogy import LocalAnalogyService, generate_local_analogy
+from personalized_exercise import PersonalizedExerciseService, generate_personalized_exercises
+from scheduler import RateLimits, Scheduler
+from benchmarks.async_load import percentile
+from benchmarks.samples import SAMPLE_ANALOGY_REQUEST, SAMPLE_EXERCISE_REQUEST
+
+
+async def run(args, scheduler) -> dict:
+    model = FakeGenerativeModel(latency=args.latency, requests_per_minute=args.quota_rpm)
+    analogy_service = LocalAnalogyService(model=model, scheduler=scheduler)
+    exercise_service = PersonalizedExerciseService(model=model, scheduler=scheduler)
+    analogy_request = generate_local_analogy(SAMPLE_ANALOGY_REQUEST)
+    exercise_request = generate_personalized_exercises(SAMPLE_EXERCISE_REQUEST)
+
+    timings = {"analogy": [], "worksheet": []}
+
+    async def timed(kind, call):
+        start = time.perf_counter()
+        result = await call()
+        timings[kind].append(time.perf_counter() - start)
+        return result["success"]
+
+    calls = [timed("analogy", lambda: analogy_service.agenerate_analogy(analogy_request)) for _ in range(args.analogies)]
+    calls += [timed("worksheet", lambda: exercise_service.agenerate_exercises(exercise_request)) for _ in range(args.worksheets)]
+    start = time.perf_counter()
+    outcomes = await asyncio.gather(*calls)
+    return {
+        "succeeded": sum(outcomes),
+        "failed": len(outcomes) - sum(outcomes),
+        "rejected_by_model": model.rejected,
+        "elapsed": time.perf_counter() - start,
+        "p95_ms": {kind: percentile(values, 95) * 1000 for kind, values in timings.items() if values}
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--quota-rpm", type=float, default=600)
+    parser.add_argument("--analogies", type=int, default=40)
+    parser.add_argument("--worksheets", type=int, default=40)
+    parser.add_argument("--latency", type=float, default=0.05)
+    args = parser.parse_args()
+
+    # Configure the scheduler slightly above the real quota so AIMD has something to adapt to
+    scheduler = Scheduler(default_limits=RateLimits(requests_per_minute=args.quota_rpm * 1.5),
+                          base_backoff=0.05, max_retries=8)
+    for name, sched in (("no scheduler", None), ("scheduler", scheduler)):
+        row = asyncio.run(run(args, sched))
+        latency = ", ".join(f"{kind} p95 {ms:.0f} ms" for kind, ms in row["p95_ms"].items())
+        print(f"{name:<14} ok {row['succeeded']:>4}  failed {row['failed']:>4}  429s {row['rejected_by_model']:>4}  "
+              f"{row['elapsed']:.2f}s  {latency}")
+
+    stats = scheduler.stats()
+    print(f"\nscheduler: admitted {stats['admitted']}, throttled {stats['throttled']}, retries {stats['retries']}, "
+          f"max queue depth {stats['max_queue_depth']}, rate factor {stats['rate_factor']}")
+    for name, wait in stats["wait"].items():
+        print(f"  {name:<12} waits {wait['count']:>4}  mean {wait['mean_ms']:.0f} ms  p95 {wait['p95_ms']:.0f} ms")
+
+
+if __name__ == "__main__":
+    main()
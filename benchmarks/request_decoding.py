@@ -0,0 +1,120 @@
+"""
+Decode throughput of request payloads on large batches.
+
+A JSON array of --batch analogy (or exercise) requests is decoded three
+ways: JSON parsing alone (the floor), parsing plus the hand-built
+dict.get mapping the API functions used before (no type checks), and
+the compiled Decoder, which validates every field while building the
+dataclasses. Reports requests/s and MB/s for each.
+
+    python -m benchmarks.request_decoding --batch 20000 --repeat 5
+"""
+import argparse
+import copy
+import json
+import time
+from typing import List
+
+from generate_analogy import AnalogyRequest, StudentContext
+from personalized_exercise import ExerciseRequest, StudentProfile
+from request_decoding import Decoder, orjson
+from benchmarks.samples import SAMPLE_ANALOGY_REQUEST, SAMPLE_EXERCISE_REQUEST
+
+
+def loads(body: bytes):
+    return orjson.loads(body) if orjson is not None else json.loads(body)
+
+
+def mapped_analogy_request(data) -> AnalogyRequest:
+    context_data = data['student_context']
+    student_context = StudentContext(
+        student_id=context_data.get('student_id', ''),
+        name=context_data.get('name', ''),
+        grade=context_data.get('grade', 1),
+        region=context_data.get('region', 'Rural India'),
+        local_language=context_data.get('local_language', 'Hindi'),
+        cultural_context=context_data.get('cultural_context', 'rural'),
+        familiar_concepts=context_data.get('familiar_concepts', [])
+    )
+    return AnalogyRequest(
+        student_context=student_context,
+        question=data.get('question', ''),
+        subject=data.get('subject', 'General'),
+        topic=data.get('topic', 'Basic Concepts'),
+        complexity_level=data.get('complexity_level', 'simple'),
+        preferred_language=data.get('preferred_language', 'English')
+    )
+
+
+def mapped_exercise_request(data) -> ExerciseRequest:
+    profile_data = data['student_profile']
+    student_profile = StudentProfile(
+        student_id=profile_data.get('student_id', ''),
+        name=profile_data.get('name', ''),
+        grade=profile_data.get('grade', 1),
+        learning_level=profile_data.get('learning_level', 'beginner'),
+        learning_style=profile_data.get('learning_style', 'visual'),
+        weaknesses=profile_data.get('weaknesses', []),
+        strengths=profile_data.get('strengths', []),
+        language_preference=profile_data.get('language_preference', 'English')
+    )
+    return ExerciseRequest(
+        student_profile=student_profile,
+        subject=data.get('subject', 'Mathematics'),
+        topic=data.get('topic', 'Basic Operations'),
+        difficulty_level=data.get('difficulty_level', 'beginner'),
+        exercise_count=data.get('exercise_count', 5),
+        exercise_types=data.get('exercise_types', ['multiple_choice'])
+    )
+
+
+def batch_payload(sample, key: str, size: int) -> bytes:
+    items = []
+    for i in range(size):
+        item = copy.deepcopy(sample)
+        # Distinct ids and lengths so the batch is not one string repeated
+        item[key]["student_id"] = str(i)
+        item[key]["name"] = f"student-{i}"
+        items.append(item)
+    return json.dumps(items, ensure_ascii=False).encode("utf-8")
+
+
+def best_seconds(fn, body: bytes, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn(body)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--batch", type=int, default=20000, help="requests per payload")
+    parser.add_argument("--repeat", type=int, default=5, help="timed runs; the best is reported")
+    args = parser.parse_args()
+
+    print(f"JSON parser: {'orjson' if orjson is not None else 'json'}, batch of {args.batch}, best of {args.repeat}")
+    workloads = [
+        ("analogy", SAMPLE_ANALOGY_REQUEST, "student_context", AnalogyRequest, mapped_analogy_request),
+        ("exercises", SAMPLE_EXERCISE_REQUEST, "student_profile", ExerciseRequest, mapped_exercise_request),
+    ]
+    for name, sample, key, cls, mapped in workloads:
+        body = batch_payload(sample, key, args.batch)
+        decoder = Decoder(List[cls])
+        assert decoder.decode(body) == [mapped(item) for item in loads(body)]
+        ways = [
+            ("parse only", loads),
+            ("parse + dict.get", lambda body: [mapped(item) for item in loads(body)]),
+            ("Decoder (validated)", decoder.decode),
+        ]
+        mb = len(body) / 1e6
+        print(f"\n{name}: {mb:.1f} MB")
+        print(f"{'':<22}{'req/s':>12}{'MB/s':>9}{'us/req':>9}")
+        for label, fn in ways:
+            seconds = best_seconds(fn, body, args.repeat)
+            print(f"{label:<22}{args.batch / seconds:>12,.0f}{mb / seconds:>9.1f}{seconds / args.batch * 1e6:>9.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,118 @@
+"""
+Memory held per --count requests for each request representation.
+
+The payloads are parsed first, so their strings exist before measuring and
+only the request objects and their containers are counted (tracemalloc).
+Compared: the original unslotted dataclasses with lists, the slotted
+dataclasses the decoder builds now, and the frozen, hashable variants with
+tuples and a precomputed cache_key, for analogy and exercise requests.
+
+    python -m benchmarks.request_memory --count 100000
+"""
+import argparse
+import copy
+import dataclasses
+import gc
+import sys
+import time
+import tracemalloc
+from typing import List
+
+from generate_analogy import AnalogyRequest, FrozenAnalogyRequest, FrozenStudentContext, StudentContext
+from personalized_exercise import ExerciseRequest, FrozenExerciseRequest, FrozenStudentProfile, StudentProfile
+from benchmarks.samples import SAMPLE_ANALOGY_REQUEST, SAMPLE_EXERCISE_REQUEST
+
+
+def unslotted(cls, name: str):
+    """
+    The dataclass as originally declared: same fields, no slots
+    """
+    return dataclasses.make_dataclass(name, [(f.name, f.type) for f in dataclasses.fields(cls)])
+
+
+UnslottedContext = unslotted(StudentContext, "UnslottedContext")
+UnslottedAnalogyRequest = unslotted(AnalogyRequest, "UnslottedAnalogyRequest")
+UnslottedProfile = unslotted(StudentProfile, "UnslottedProfile")
+UnslottedExerciseRequest = unslotted(ExerciseRequest, "UnslottedExerciseRequest")
+
+
+def analogy_builders():
+    def build(context_cls, request_cls, concepts):
+        def make(data):
+            c = data["student_context"]
+            context = context_cls(c["student_id"], c["name"], c["grade"], c["region"], c["local_language"],
+                                  c["cultural_context"], concepts(c["familiar_concepts"]))
+            return request_cls(context, data["question"], data["subject"], data["topic"],
+                               data["complexity_level"], data["preferred_language"])
+        return make
+    return [
+        ("dataclass, no slots", build(UnslottedContext, UnslottedAnalogyRequest, list)),
+        ("slotted dataclass", build(StudentContext, AnalogyRequest, list)),
+        ("frozen + cache_key", build(FrozenStudentContext, FrozenAnalogyRequest, tuple)),
+    ]
+
+
+def exercise_builders():
+    def build(profile_cls, request_cls, items):
+        def make(data):
+            p = data["student_profile"]
+            profile = profile_cls(p["student_id"], p["name"], p["grade"], p["learning_level"], p["learning_style"],
+                                  items(p["weaknesses"]), items(p["strengths"]), p["language_preference"])
+            return request_cls(profile, data["subject"], data["topic"], data["difficulty_level"],
+                               data["exercise_count"], items(data["exercise_types"]))
+        return make
+    return [
+        ("dataclass, no slots", build(UnslottedProfile, UnslottedExerciseRequest, list)),
+        ("slotted dataclass", build(StudentProfile, ExerciseRequest, list)),
+        ("frozen + cache_key", build(FrozenStudentProfile, FrozenExerciseRequest, tuple)),
+    ]
+
+
+def payloads(sample, key: str, count: int) -> List[dict]:
+    items = []
+    for i in range(count):
+        item = copy.deepcopy(sample)
+        item[key]["student_id"] = str(i)
+        items.append(item)
+    return items
+
+
+def measure(make, items) -> tuple:
+    # Timed without tracemalloc, which slows every allocation
+    start = time.perf_counter()
+    built = [make(item) for item in items]
+    elapsed = time.perf_counter() - start
+    del built
+    gc.collect()
+    tracemalloc.start()
+    built = [make(item) for item in items]
+    held, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    # Leave out the list holding them, which is the same for every representation
+    held -= sys.getsizeof(built)
+    return held, elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--count", type=int, default=100_000)
+    args = parser.parse_args()
+
+    workloads = [
+        ("analogy", SAMPLE_ANALOGY_REQUEST, "student_context", analogy_builders()),
+        ("exercises", SAMPLE_EXERCISE_REQUEST, "student_profile", exercise_builders()),
+    ]
+    for name, sample, key, builders in workloads:
+        items = payloads(sample, key, args.count)
+        print(f"\n{name}: {args.count:,} requests")
+        print(f"{'':<22}{'MB':>8}{'bytes/req':>11}{'vs first':>10}{'build us':>10}")
+        first = None
+        for label, make in builders:
+            held, elapsed = measure(make, items)
+            first = first or held
+            print(f"{label:<22}{held / 1e6:>8.1f}{held / args.count:>11.0f}{held / first - 1:>+10.0%}"
+                  f"{elapsed / args.count * 1e6:>10.2f}")
+
+
+if __name__ == "__main__":
+    main()
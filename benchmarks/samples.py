@@ -0,0 +1,39 @@
+"""
+Request payloads shared by the benchmarks
+"""
+
+SAMPLE_ANALOGY_REQUEST = {
+    "student_context": {
+        "student_id": "123",
+        "name": "GURU",
+        "grade": 5,
+        "region": "north india",
+        "local_language": "hindi",
+        "cultural_context": "rural",
+        "familiar_concepts": ["farming"]
+    },
+    "question": "ye barish kyu hoti hai?",
+    "subject": "environment",
+    "topic": "water cycle",
+    "complexity_level": "simple",
+    "preferred_language": "hindi"
+}
+
+SAMPLE_EXERCISE_REQUEST = {
+    "student_profile": {
+        "student_id": "123",
+        "name": "GURU",
+        "grade": 5,
+        "learning_level": "beginner",
+        "learning_style": "visual",
+        "weaknesses": ["focus"],
+        "strengths": ["visualization", "creativity"],
+        "language_preference": "Hindi"
+    },
+    "subject": "Mathematics",
+    "topic": "Basic Operations",
+    "difficulty_level": "beginner",
+    "exercise_count": 5,
+    "exercise_types": ["multiple_choice"]
+}
+
@@ -0,0 +1,72 @@
+"""
+Lookup latency of the semantic question cache versus index size.
+
+Fills a BruteForceIndex with random unit vectors (embedding a million real
+questions would dominate the run) and times single-question lookups,
+including the embedding step, at each size.
+
+    python -m benchmarks.semantic_lookup --sizes 1000 10000 100000 1000000
+"""
+import argparse
+import statistics
+import time
+
+import numpy as np
+
+from semantic_cache import BruteForceIndex, HashingVectorizer
+
+QUERIES = [
+    "Why does it rain?",
+    "Why does rain come?",
+    "How do plants make food?",
+    "What is gravity?",
+    "Why is the sky blue?",
+]
+
+
+def fill_index(size: int, dim: int, chunk: int = 100000) -> BruteForceIndex:
+    rng = np.random.default_rng(0)
+    index = BruteForceIndex(dim, initial_capacity=size)
+    for start in range(0, size, chunk):
+        count = min(chunk, size - start)
+        vectors = rng.standard_normal((count, dim)).astype(np.float32)
+        vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+        index.add_many(vectors, list(range(start, start + count)))
+    return index
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 100000, 1000000])
+    parser.add_argument("--dim", type=int, default=384, help="384 matches MiniLM sentence embeddings")
+    parser.add_argument("--repeats", type=int, default=20)
+    args = parser.parse_args()
+
+    vectorizer = HashingVectorizer(dim=args.dim)
+    embed_timings = []
+    for _ in range(args.repeats):
+        start = time.perf_counter()
+        vectorizer.embed([QUERIES[0]])
+        embed_timings.append(time.perf_counter() - start)
+    print(f"embed p50: {statistics.median(embed_timings) * 1000:.3f} ms")
+
+    print(f"{'entries':>10}{'search p50 ms':>16}{'lookup p50 ms':>16}{'index MB':>10}")
+    for size in args.sizes:
+        index = fill_index(size, args.dim)
+        search_timings = []
+        lookup_timings = []
+        for i in range(args.repeats):
+            query = QUERIES[i % len(QUERIES)]
+            start = time.perf_counter()
+            vector = vectorizer.embed([query])[0]
+            embedded = time.perf_counter()
+            index.search(vector, k=1)
+            done = time.perf_counter()
+            search_timings.append(done - embedded)
+            lookup_timings.append(done - start)
+        print(f"{size:>10}{statistics.median(search_timings) * 1000:>16.3f}"
+              f"{statistics.median(lookup_timings) * 1000:>16.3f}{size * args.dim * 4 / 2 ** 20:>10.0f}")
+
+
+if __name__ == "__main__":
+    main()
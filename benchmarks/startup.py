@@ -0,0 +1,98 @@
+"""
+Cold-start cost of importing the service modules.
+
+Each module is imported in a fresh interpreter under python -X importtime,
+--runs times, and the median cumulative import time is reported with the
+slowest imports it pulled in. The run fails (exit status 1) if a module
+takes longer than --max-ms or loads a dependency that should be deferred
+until first use (google.generativeai, flask, numpy, asyncio and
+concurrent.futures), so it can be run as a check before deploying
+serverless workers.
+
+    python -m benchmarks.startup --runs 5 --max-ms 150
+"""
+import argparse
+import statistics
+import subprocess
+import sys
+from typing import Dict, List, Tuple
+
+MODULES = ["generate_analogy", "personalized_exercise"]
+
+# Only needed once a request is served (or on an explicit warm_up())
+DEFERRED = ["google.generativeai", "flask", "numpy", "asyncio", "concurrent.futures"]
+
+# Constructing the services must not touch the SDK either
+CONSTRUCT = """
+import time
+started = time.perf_counter()
+from generate_analogy import LocalAnalogyService
+from personalized_exercise import PersonalizedExerciseService
+LocalAnalogyService()
+PersonalizedExerciseService()
+print((time.perf_counter() - started) * 1000)
+"""
+
+
+def import_times(module: str) -> Tuple[float, Dict[str, float]]:
+    """
+    Cumulative import time of module and of every import it triggered, in ms
+    """
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {module}"],
+                            capture_output=True, text=True, check=True)
+    # Children are printed, indented, before their parent; keep only module's own subtree
+    imports, group = {}, {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line.split("|")
+        group[name.strip()] = int(cumulative) / 1000
+        if not name[1:].startswith(" "):
+            if name.strip() == module:
+                imports = group
+            group = {}
+    return imports[module], imports
+
+
+def construct_ms() -> Tuple[float, List[str]]:
+    check = CONSTRUCT + "import sys\nprint(','.join(m for m in %r if m in sys.modules))\n" % DEFERRED
+    result = subprocess.run([sys.executable, "-c", check], capture_output=True, text=True, check=True)
+    elapsed, loaded = result.stdout.splitlines()
+    return float(elapsed), [name for name in loaded.split(",") if name]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--top", type=int, default=8, help="slowest imports to list per module")
+    parser.add_argument("--max-ms", type=float, default=None, help="fail if a module's median import exceeds this")
+    args = parser.parse_args()
+
+    failures = []
+    for module in MODULES:
+        runs = [import_times(module) for _ in range(args.runs)]
+        median = statistics.median(total for total, _ in runs)
+        imports = runs[-1][1]
+        print(f"{module}: {median:.1f} ms median over {args.runs} runs")
+        children = sorted(((ms, name) for name, ms in imports.items() if name != module), reverse=True)
+        for ms, name in children[:args.top]:
+            print(f"  {ms:8.1f} ms  {name}")
+        loaded = [name for name in DEFERRED if name in imports]
+        if loaded:
+            failures.append(f"{module} imports {', '.join(loaded)} at import time")
+        if args.max_ms is not None and median > args.max_ms:
+            failures.append(f"{module} takes {median:.1f} ms to import (budget {args.max_ms:.0f} ms)")
+
+    elapsed, loaded = construct_ms()
+    print(f"\nimport and construct both services: {elapsed:.1f} ms")
+    if loaded:
+        failures.append(f"constructing the services imports {', '.join(loaded)}")
+
+    if failures:
+        print("\nFAILED:\n  " + "\n  ".join(failures))
+        sys.exit(1)
+    print("\nno deferred dependency loaded at import or construction")
+
+
+if __name__ == "__main__":
+    main()
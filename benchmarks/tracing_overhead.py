@@ -0,0 +1,81 @@
+"""
+Cost of the tracing instrumentation, disabled and enabled.
+
+First a micro-benchmark of a @traced function against the undecorated
+function with the default no-op tracer, then full analogy and exercise
+requests against a zero-latency fake model (so instrumentation is the
+largest share it can be) with tracing disabled and with a Tracer writing
+to an InMemoryExporter. The disabled overhead per request is the
+per-call cost times the spans a request opens.
+
+    python -m benchmarks.tracing_overhead --requests 2000
+"""
+import argparse
+import time
+
+from fake_model import FakeGenerativeModel
+from generate_analogy import LocalAnalogyService, generate_local_analogy
+from personalized_exercise import PersonalizedExerciseService, generate_personalized_exercises
+from tracing import InMemoryExporter, NoOpTracer, Tracer, render_metrics, set_tracer, traced
+from benchmarks.samples import SAMPLE_ANALOGY_REQUEST, SAMPLE_EXERCISE_REQUEST
+
+
+def stage(value):
+    return value
+
+
+def per_call_ns(fn, calls: int) -> float:
+    start = time.perf_counter_ns()
+    for i in range(calls):
+        fn(i)
+    return (time.perf_counter_ns() - start) / calls
+
+
+def per_request_us(call, requests: int) -> float:
+    call()
+    start = time.perf_counter()
+    for _ in range(requests):
+        call()
+    return (time.perf_counter() - start) / requests * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--calls", type=int, default=1_000_000, help="calls for the decorator micro-benchmark")
+    args = parser.parse_args()
+
+    set_tracer(NoOpTracer())
+    raw = per_call_ns(stage, args.calls)
+    decorated = per_call_ns(traced("stage")(stage), args.calls)
+    print(f"decorator, tracing disabled: {decorated - raw:.0f} ns per call over a plain call ({raw:.0f} ns)")
+
+    model = FakeGenerativeModel()
+    analogy_service = LocalAnalogyService(model=model)
+    exercise_service = PersonalizedExerciseService(model=model)
+    analogy_request = generate_local_analogy(SAMPLE_ANALOGY_REQUEST)
+    exercise_request = generate_personalized_exercises(SAMPLE_EXERCISE_REQUEST)
+    workloads = [
+        ("analogy", lambda: analogy_service.generate_analogy(analogy_request)),
+        ("exercises", lambda: exercise_service.generate_exercises(exercise_request)),
+    ]
+
+    print(f"\n{'pipeline':<11}{'off us':>9}{'on us':>9}{'on cost':>9}{'spans':>7}{'us/span':>9}{'off cost (est.)':>17}")
+    for name, call in workloads:
+        set_tracer(NoOpTracer())
+        disabled = per_request_us(call, args.requests)
+        exporter = InMemoryExporter()
+        set_tracer(Tracer(exporter))
+        enabled = per_request_us(call, args.requests)
+        spans = len(exporter.get_finished_spans()) / (args.requests + 1)
+        disabled_cost = (decorated - raw) * spans / 1000
+        print(f"{name:<11}{disabled:>9.1f}{enabled:>9.1f}{(enabled - disabled) / disabled:>9.1%}{spans:>7.1f}"
+              f"{(enabled - disabled) / spans:>9.1f}{disabled_cost / disabled:>17.3%}")
+
+    print("\nsample of the Prometheus output:")
+    print("\n".join(line for line in render_metrics().splitlines() if "_bucket" not in line)[:1200])
+    set_tracer(NoOpTracer())
+
+
+if __name__ == "__main__":
+    main()
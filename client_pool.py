@@ -0,0 +1,97 @@
+import os
+import threading
+from typing import Dict, List, Optional
+from dataclasses import dataclass, field
+
+from model_backends import GEMINI, BackendConfig, ModelBackend, create_backend
+
+
+@dataclass
+class PoolConfig:
+    api_key: Optional[str] = None  # defaults to GEMINI_API_KEY
+    # The gRPC transport multiplexes every call over one HTTP/2 keep-alive channel
+    transport: str = "grpc"
+    # Gemini unless MODEL_BACKEND / MODEL_BACKEND_CONFIG select another backend
+    backend: BackendConfig = field(default_factory=BackendConfig.from_env)
+
+
+class ClientPool:
+    """
+    Process-wide pool both services draw their models from.
+
+    One backend model is kept per model name. For Gemini, genai is
+    configured once, on first use or warm_up(), and the SDK shares its
+    transport between models, so every service instance reuses the same
+    channel instead of paying connection setup and TLS handshakes per
+    instance. With the fake backend
+    (MODEL_BACKEND=fake) no network or API key is needed.
+    """
+
+    def __init__(self, config: Optional[PoolConfig] = None):
+        self.config = config or PoolConfig()
+        self._models: Dict[str, object] = {}
+        self._configured = False
+        self._lock = threading.Lock()
+
+    def configure(self):
+        """
+        Configure the Gemini SDK once for the process
+        """
+        with self._lock:
+            if self._configured:
+                return
+            import google.generativeai as genai
+            genai.configure(
+                api_key=self.config.api_key or os.getenv('GEMINI_API_KEY'),
+                transport=self.config.transport
+            )
+            self._configured = True
+
+    def model(self, model_name: str) -> ModelBackend:
+        """
+        Shared backend model for model_name. The SDK is configured when the
+        model is first used, not here.
+        """
+        with self._lock:
+            model = self._models.get(model_name)
+            if model is None:
+                model = self._models[model_name] = create_backend(model_name, self.config.backend, self.configure)
+            return model
+
+    def warm_up(self, model_names: Optional[List[str]] = None):
+        """
+        Configure the SDK and build the given (default: all known) models
+        ahead of the first request, e.g. from a worker's startup hook
+        """
+        if self.config.backend.backend == GEMINI:
+            self.configure()
+        for model_name in model_names or list(self._models):
+            warm_up = getattr(self.model(model_name), "warm_up", None)
+            if warm_up is not None:
+                warm_up()
+
+    def stats(self) -> Dict:
+        with self._lock:
+            models = sorted(self._models)
+        return {"models": models}
+
+
+_default_pool: Optional[ClientPool] = None
+_default_pool_lock = threading.Lock()
+
+
+def default_client_pool() -> ClientPool:
+    global _default_pool
+    with _default_pool_lock:
+        if _default_pool is None:
+            _default_pool = ClientPool()
+        return _default_pool
+
+
+def set_default_client_pool(pool: ClientPool):
+    """
+    Replace the process-wide pool, e.g. to change PoolConfig at startup
+    """
+    global _default_pool
+    with _default_pool_lock:
+        _default_pool = pool
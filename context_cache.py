@@ -0,0 +1,309 @@
+import datetime
+import hashlib
+import threading
+import time
+from typing import Dict, Optional, Tuple
+from dataclasses import dataclass, asdict
+
+from scheduler import status_code
+
+
+@dataclass(frozen=True)
+class CacheablePrompt:
+    """
+    A prompt split into a stable prefix shared across many requests and a
+    per-student suffix. str() gives the full prompt for uncached calls.
+    """
+    prefix_key: str
+    prefix: str
+    suffix: str
+
+    def __str__(self) -> str:
+        return self.prefix + self.suffix
+
+
+def prefix_key(name: str, prefix: str) -> str:
+    """
+    Stable key for a prefix; changes whenever the prefix text changes
+    """
+    return f"{name}:{hashlib.sha256(prefix.encode('utf-8')).hexdigest()[:16]}"
+
+
+def is_cache_miss(error: Exception) -> bool:
+    """
+    Whether a call on a cached model failed because its cached content is
+    gone: deleted or expired on the API (404, or a 400/403 naming the cached
+    content) or in LocalCachedContentStore (LookupError)
+    """
+    if isinstance(error, LookupError):
+        return True
+    code = status_code(error)
+    if code == 404:
+        return True
+    if code in (400, 403):
+        message = str(error).lower()
+        return ("cached content" in message or "cachedcontent" in message) and (
+            "expired" in message or "not found" in message or "does not exist" in message)
+    return False
+
+
+class GeminiCachedContentStore:
+    """
+    Creates and refreshes cached content on the Gemini API
+    """
+
+    # The API rejects cached content below this size for current Gemini models
+    min_prefix_tokens = 4096
+
+    def create(self, model_name: str, prefix: str, ttl: float):
+        import google.generativeai as genai
+        return genai.caching.CachedContent.create(
+            model=model_name,
+            system_instruction=prefix,
+            ttl=datetime.timedelta(seconds=ttl)
+        )
+
+    def refresh(self, cached, ttl: float):
+        cached.update(ttl=datetime.timedelta(seconds=ttl))
+
+    def expire_time(self, cached) -> float:
+        return cached.expire_time.timestamp()
+
+    def model_from_cache(self, cached, base_model):
+        import google.generativeai as genai
+        return genai.GenerativeModel.from_cached_content(cached)
+
+
+@dataclass
+class LocalCachedContent:
+    name: str
+    model_name: str
+    prefix: str
+    expire_time: float
+    deleted: bool = False
+
+
+class LocalCachedModel:
+    """
+    Model bound to LocalCachedContent: prepends the cached prefix and
+    delegates to the wrapped model, failing like the API once the cache is gone
+    """
+
+    def __init__(self, base_model, cached: LocalCachedContent, store: "LocalCachedContentStore"):
+        self.base_model = base_model
+        self.cached = cached
+        self.store = store
+
+    def _contents(self, contents) -> str:
+        if self.cached.deleted or self.cached.expire_time <= time.time():
+            raise LookupError(f"Cached content {self.cached.name} not found")
+        self.store.cached_prompt_chars += len(self.cached.prefix)
+        return self.cached.prefix + contents
+
+    def generate_content(self, contents, **kwargs):
+        return self.base_model.generate_content(self._contents(contents), **kwargs)
+
+    async def generate_content_async(self, contents, **kwargs):
+        return await self.base_model.generate_content_async(self._contents(contents), **kwargs)
+
+
+class LocalCachedContentStore:
+    """
+    In-process stand-in for Gemini context caching, for tests and benchmarks
+    """
+
+    def __init__(self, min_prefix_chars: int = 0):
+        self.min_prefix_chars = min_prefix_chars
+        self.contents: Dict[str, LocalCachedContent] = {}
+        self.cached_prompt_chars = 0
+        self._counter = 0
+
+    def create(self, model_name: str, prefix: str, ttl: float) -> LocalCachedContent:
+        if len(prefix) < self.min_prefix_chars:
+            raise ValueError("Cached content is below the minimum size")
+        self._counter += 1
+        cached = LocalCachedContent(f"cachedContents/local-{self._counter}", model_name, prefix, time.time() + ttl)
+        self.contents[cached.name] = cached
+        return cached
+
+    def refresh(self, cached: LocalCachedContent, ttl: float):
+        if cached.deleted:
+            raise LookupError(f"Cached content {cached.name} not found")
+        cached.expire_time = time.time() + ttl
+
+    def expire_time(self, cached: LocalCachedContent) -> float:
+        return cached.expire_time
+
+    def model_from_cache(self, cached: LocalCachedContent, base_model) -> LocalCachedModel:
+        return LocalCachedModel(base_model, cached, self)
+
+    def delete(self, name: str):
+        self.contents[name].deleted = True
+
+
+@dataclass
+class ContextCacheMetrics:
+    hits: int = 0
+    created: int = 0
+    refreshed: int = 0
+    creation_failures: int = 0
+    invalidations: int = 0
+    below_minimum: int = 0  # prefixes too short to cache, sent in full
+
+
+_STALE = object()
+
+
+@dataclass
+class _CachedPrefix:
+    cached: object
+    model: object
+    expires_at: float
+
+
+class ContextCacheManager:
+    """
+    Keeps model-side cached content for static prompt prefixes.
+
+    The first request for a prefix creates the cached content, entries are
+    refreshed when they are within refresh_margin seconds of expiring, and
+    model_for() returns None whenever no cache is available so callers fall
+    back to sending the full prompt: the prefix is below min_prefix_tokens,
+    creation failed (e.g. a model without caching support), or another
+    thread is still creating it.
+
+    min_prefix_tokens defaults to the store's own minimum: 4,096 tokens on
+    the Gemini API, none for LocalCachedContentStore. The analogy and
+    exercise prefixes in this repo are about 400-450 tokens, so against the
+    Gemini API they are always sent in full (counted as below_minimum); the
+    cache only pays off for prefixes past the API minimum.
+
+    Creating and refreshing are API calls; they run outside the manager's
+    lock, one at a time per prefix, and amodel_for() runs them in the
+    default executor so the event loop is never blocked.
+    """
+
+    def __init__(self, store=None, ttl: float = 3600, refresh_margin: float = 300,
+                 retry_after: float = 600, model_name: Optional[str] = None,
+                 min_prefix_tokens: Optional[int] = None):
+        self.store = store or GeminiCachedContentStore()
+        self.ttl = ttl
+        self.refresh_margin = refresh_margin
+        self.retry_after = retry_after
+        self.model_name = model_name
+        if min_prefix_tokens is None:
+            min_prefix_tokens = getattr(self.store, "min_prefix_tokens", 0)
+        self.min_prefix_tokens = min_prefix_tokens
+        self.metrics = ContextCacheMetrics()
+        # Keyed by (model name, prefix key): cached content is bound to one model
+        self._entries: Dict[Tuple[str, str], _CachedPrefix] = {}
+        self._failed_until: Dict[Tuple[str, str], float] = {}
+        # Held while a prefix is being created or refreshed
+        self._updating: Dict[Tuple[str, str], threading.Lock] = {}
+        self._lock = threading.Lock()
+
+    def model_for(self, prompt: CacheablePrompt, base_model):
+        """
+        Return a model bound to the cached prefix of prompt, or None to fall back
+        """
+        key = self._key(prompt, base_model)
+        model = self._lookup(key, prompt)
+        if model is not _STALE:
+            return model
+        return self._update(key, prompt, base_model)
+
+    async def amodel_for(self, prompt: CacheablePrompt, base_model):
+        """
+        Async counterpart of model_for; creating or refreshing runs in the executor
+        """
+        import asyncio
+        key = self._key(prompt, base_model)
+        model = self._lookup(key, prompt)
+        if model is not _STALE:
+            return model
+        return await asyncio.get_running_loop().run_in_executor(None, self._update, key, prompt, base_model)
+
+    def _key(self, prompt: CacheablePrompt, base_model) -> Tuple[str, str]:
+        return self.model_name or getattr(base_model, "model_name", None), prompt.prefix_key
+
+    def _lookup(self, key: Tuple[str, str], prompt: CacheablePrompt):
+        """
+        The cached model or None without any API call, or _STALE when the
+        prefix has to be created or refreshed first
+        """
+        # Same estimate as model_calls.prompt_tokens: about four characters per token
+        if len(prompt.prefix) // 4 < self.min_prefix_tokens:
+            with self._lock:
+                self.metrics.below_minimum += 1
+            return None
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry.expires_at - now > self.refresh_margin:
+                self.metrics.hits += 1
+                return entry.model
+            if entry is None and self._failed_until.get(key, 0) > now:
+                return None
+        return _STALE
+
+    def _update(self, key: Tuple[str, str], prompt: CacheablePrompt, base_model):
+        with self._lock:
+            updating = self._updating.setdefault(key, threading.Lock())
+        if not updating.acquire(blocking=False):
+            # Another thread is creating or refreshing this prefix; use the entry while it lasts
+            with self._lock:
+                entry = self._entries.get(key)
+                if entry is not None and entry.expires_at > time.time():
+                    self.metrics.hits += 1
+                    return entry.model
+            return None
+        try:
+            model = self._lookup(key, prompt)
+            if model is not _STALE:
+                return model
+            with self._lock:
+                entry = self._entries.get(key)
+            if entry is not None and entry.expires_at > time.time():
+                try:
+                    self.store.refresh(entry.cached, self.ttl)
+                    expires_at = self.store.expire_time(entry.cached)
+                except Exception:
+                    with self._lock:
+                        if self._entries.get(key) is entry:
+                            del self._entries[key]
+                else:
+                    with self._lock:
+                        entry.expires_at = expires_at
+                        self.metrics.refreshed += 1
+                        self.metrics.hits += 1
+                    return entry.model
+
+            try:
+                cached = self.store.create(key[0], prompt.prefix, self.ttl)
+                model = self.store.model_from_cache(cached, base_model)
+                expires_at = self.store.expire_time(cached)
+            except Exception:
+                with self._lock:
+                    self.metrics.creation_failures += 1
+                    self._failed_until[key] = time.time() + self.retry_after
+                return None
+
+            with self._lock:
+                self._entries[key] = _CachedPrefix(cached, model, expires_at)
+                self._failed_until.pop(key, None)
+                self.metrics.created += 1
+            return model
+        finally:
+            updating.release()
+
+    def invalidate(self, key: str):
+        """
+        Forget a cached prefix for every model, e.g. after the API reported it missing
+        """
+        with self._lock:
+            for entry_key in [entry_key for entry_key in self._entries if entry_key[1] == key]:
+                del self._entries[entry_key]
+                self.metrics.invalidations += 1
+
+    def stats(self) -> Dict:
+        return dict(asdict(self.metrics), entries=len(self._entries))
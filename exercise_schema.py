@@ -0,0 +1,116 @@
+import dataclasses
+import typing
+from typing import Any, Callable, Dict, List, Union
+
+JSON_TYPES = {
+    str: "string",
+    int: "integer",
+    float: "number",
+    bool: "boolean",
+}
+
+
+def schema_from_type(annotation) -> Dict:
+    """
+    Convert a type annotation into the OpenAPI-style schema dict accepted
+    by Gemini's response_schema
+    """
+    origin = typing.get_origin(annotation)
+    args = typing.get_args(annotation)
+
+    if origin is Union and type(None) in args:
+        inner = [arg for arg in args if arg is not type(None)]
+        schema = schema_from_type(inner[0])
+        schema["nullable"] = True
+        return schema
+    if origin in (list, List):
+        return {"type": "array", "items": schema_from_type(args[0] if args else str)}
+    if dataclasses.is_dataclass(annotation):
+        return schema_from_dataclass(annotation)
+    if annotation in JSON_TYPES:
+        return {"type": JSON_TYPES[annotation]}
+    raise TypeError(f"Unsupported type for response schema: {annotation!r}")
+
+
+def schema_from_dataclass(cls) -> Dict:
+    """
+    Object schema for a dataclass; fields without defaults are required
+    """
+    hints = typing.get_type_hints(cls)
+    properties = {}
+    required = []
+    for field in dataclasses.fields(cls):
+        properties[field.name] = schema_from_type(hints[field.name])
+        if field.default is dataclasses.MISSING and field.default_factory is dataclasses.MISSING:
+            required.append(field.name)
+    return {"type": "object", "properties": properties, "required": required}
+
+
+def compile_validator(schema: Dict) -> Callable[[Any], List[str]]:
+    """
+    Compile a schema into a validator function once, so validating each
+    response is just a walk of pre-built closures. The validator returns a
+    list of error messages, empty when the value is valid.
+    """
+    check = _compile(schema)
+
+    def validate(value) -> List[str]:
+        errors = []
+        check(value, "$", errors)
+        return errors
+
+    return validate
+
+
+def _compile(schema: Dict) -> Callable[[Any, str, List[str]], None]:
+    nullable = schema.get("nullable", False)
+    kind = schema.get("type")
+
+    if kind == "object":
+        properties = {name: _compile(sub) for name, sub in schema.get("properties", {}).items()}
+        required = schema.get("required", [])
+
+        def check_object(value, path, errors):
+            if not isinstance(value, dict):
+                errors.append(f"{path}: expected object")
+                return
+            for name in required:
+                if name not in value:
+                    errors.append(f"{path}.{name}: missing")
+            for name, check in properties.items():
+                if name in value:
+                    check(value[name], f"{path}.{name}", errors)
+        check = check_object
+
+    elif kind == "array":
+        item_check = _compile(schema.get("items", {}))
+
+        def check_array(value, path, errors):
+            if not isinstance(value, list):
+                errors.append(f"{path}: expected array")
+                return
+            for index, item in enumerate(value):
+                item_check(item, f"{path}[{index}]", errors)
+        check = check_array
+
+    else:
+        python_types = {
+            "string": (str,),
+            "integer": (int,),
+            "number": (int, float),
+            "boolean": (bool,),
+        }.get(kind, (object,))
+        reject_bool = kind in ("integer", "number")
+
+        def check_scalar(value, path, errors):
+            if not isinstance(value, python_types) or (reject_bool and isinstance(value, bool)):
+                errors.append(f"{path}: expected {kind}")
+        check = check_scalar
+
+    if not nullable:
+        return check
+
+    def check_nullable(value, path, errors):
+        if value is not None:
+            check(value, path, errors)
+    return check_nullable
@@ -0,0 +1,88 @@
+import json
+import re
+from typing import Dict, List
+
+EXERCISES_ARRAY = re.compile(r'"exercises"\s*:\s*\[')
+
+
+class IncrementalExerciseParser:
+    """
+    Incremental parser for the streamed exercises JSON.
+
+    Chunks are fed as they arrive; feed() returns every exercise object from
+    the "exercises" array that became syntactically complete in that chunk.
+    Anything before the array (markdown code fences, leading prose, the
+    opening brace) is skipped, and the stream is never re-scanned from the
+    start, so each character is examined once.
+    """
+
+    def __init__(self):
+        self.buffer = ""
+        self.pos = 0
+        self.in_array = False
+        self.done = False
+        self.depth = 0
+        self.in_string = False
+        self.escaped = False
+        self.object_start = -1
+        self.exercises: List[Dict] = []
+        self.errors = 0
+
+    def feed(self, chunk: str) -> List[Dict]:
+        if self.done:
+            return []
+        self.buffer += chunk
+
+        if not self.in_array:
+            match = EXERCISES_ARRAY.search(self.buffer)
+            if match is None:
+                # Keep only a tail long enough to hold a key split across chunks
+                self.buffer = self.buffer[-64:]
+                return []
+            self.in_array = True
+            self.buffer = self.buffer[match.end():]
+            self.pos = 0
+
+        completed = self._scan()
+        self.exercises.extend(completed)
+        return completed
+
+    def _scan(self) -> List[Dict]:
+        completed = []
+        buffer = self.buffer
+        i = self.pos
+        while i < len(buffer):
+            ch = buffer[i]
+            if self.in_string:
+                if self.escaped:
+                    self.escaped = False
+                elif ch == "\\":
+                    self.escaped = True
+                elif ch == '"':
+                    self.in_string = False
+            elif ch == '"':
+                self.in_string = True
+            elif ch in "{[":
+                if self.depth == 0 and ch == "{":
+                    self.object_start = i
+                self.depth += 1
+            elif ch in "}]":
+                if self.depth == 0 and ch == "]":
+                    self.done = True
+                    break
+                self.depth -= 1
+                if self.depth == 0 and ch == "}":
+                    try:
+                        completed.append(json.loads(buffer[self.object_start:i + 1]))
+                    except json.JSONDecodeError:
+                        self.errors += 1
+                    self.object_start = -1
+            i += 1
+
+        # Drop everything that can no longer be part of an unfinished object
+        keep_from = self.object_start if self.object_start != -1 else i
+        self.buffer = buffer[keep_from:]
+        self.pos = i - keep_from
+        if self.object_start != -1:
+            self.object_start = 0
+        return completed
@@ -0,0 +1,319 @@
+import asyncio
+import json
+import math
+import random
+import re
+import threading
+import time
+from typing import Callable, Dict, List, Optional, Sequence, Union
+from dataclasses import dataclass
+from collections import deque
+from contextlib import asynccontextmanager, contextmanager
+
+from scheduler import TokenBucket
+
+FAKE_ANALOGY = """1. **Simple Explanation**: Rain happens when tiny drops of water in the clouds join together and become too heavy to float.
+2. **Local Analogy**: Think of the village well bucket slowly filling during the monsoon until it is too heavy to hold.
+3. **Connection**: The clouds are like the bucket, and the water drops are like the rain that fills it.
+4. **Example**: When you see dark clouds over the fields before harvest, they are full of water drops ready to fall.
+5. **Summary**: Water rises as vapour, gathers in clouds, and falls back as rain when the drops grow heavy."""
+
+
+@dataclass
+class FakeUsageMetadata:
+    prompt_token_count: int
+    candidates_token_count: int
+    total_token_count: int
+
+
+@dataclass
+class FakeResponse:
+    text: str
+    usage_metadata: FakeUsageMetadata
+
+
+@dataclass
+class FakeCountTokensResponse:
+    total_tokens: int
+
+
+class FakeAPIError(Exception):
+    """
+    Injected or quota failure; code is the HTTP status, as on google.api_core errors
+    """
+
+    def __init__(self, code: int, message: str = "Injected error"):
+        super().__init__(f"{code} {message}")
+        self.code = code
+
+
+def count_tokens(text: str) -> int:
+    """
+    Rough token estimate (about four characters per token, like Gemini)
+    """
+    return max(1, len(text) // 4)
+
+
+def latency_distribution(kind: str = "fixed", seed: int = 0, **params) -> Callable[[], float]:
+    """
+    Seeded latency sampler, so a run with the same seed sees the same delays.
+
+    fixed: seconds
+    uniform: low, high
+    lognormal: median, sigma
+    heavy_tail: base, slow_rate, alpha - calls take about base, but a
+    slow_rate share are Pareto-distributed stragglers several times slower
+    """
+    rng = random.Random(seed)
+    if kind == "fixed":
+        seconds = params.get("seconds", 0.0)
+        return lambda: seconds
+    if kind == "uniform":
+        low, high = params.get("low", 0.0), params.get("high", 0.0)
+        return lambda: rng.uniform(low, high)
+    if kind == "lognormal":
+        mu, sigma = math.log(params.get("median", 0.1)), params.get("sigma", 0.5)
+        return lambda: rng.lognormvariate(mu, sigma)
+    if kind == "heavy_tail":
+        base, slow_rate, alpha = params.get("base", 0.1), params.get("slow_rate", 0.03), params.get("alpha", 1.5)
+
+        def latency() -> float:
+            jitter = rng.uniform(0.8, 1.2) * base
+            if rng.random() < slow_rate:
+                return jitter * (3 + rng.paretovariate(alpha))
+            return jitter
+        return latency
+    raise ValueError(f"Unknown latency distribution {kind!r}")
+
+
+def default_responder(prompt: str) -> str:
+    """
+    Produce a deterministic canned answer for each prompt the services build
+    """
+    if "JSON envelope" in prompt:
+        return json.dumps({
+            "detected_language": "Hindi",
+            "translated_question": "Why does it rain?",
+            "analogy": FAKE_ANALOGY
+        })
+    if "determine the language" in prompt:
+        return "Hindi"
+    if "to English:" in prompt:
+        return "Why does it rain?"
+    if prompt.lstrip().startswith("Translate the following English text"):
+        match = re.search(r'"(.*)"', prompt, re.DOTALL)
+        return match.group(1) if match else prompt
+    if "OUTPUT FORMAT" in prompt:
+        match = re.search(r"Generate (\d+) personalized", prompt)
+        count = int(match.group(1)) if match else 5
+        exercises = [
+            {
+                "id": i + 1,
+                "type": "multiple_choice",
+                "question": f"Practice question {i + 1}",
+                "options": ["1", "2", "3", "4"],
+                "correct_answer": "2",
+                "explanation": "Count the objects one by one.",
+                "difficulty": "beginner",
+                "learning_objective": "Basic operations",
+                "personalization_notes": "Uses pictures for a visual learner"
+            }
+            for i in range(count)
+        ]
+        return "```json\n" + json.dumps({"exercises": exercises}, indent=2) + "\n```"
+    return FAKE_ANALOGY
+
+
+class FakeGenerativeModel:
+    """
+    Local stand-in for genai.GenerativeModel used by benchmarks and load tests.
+
+    latency is either a fixed number of seconds or a callable returning one
+    (see latency_distribution), and per_token_latency adds a cost for every
+    generated token. canned maps prompt substrings to fixed answers and is
+    checked before responder.
+
+    Throughput limits: at most max_concurrency calls run at once (the rest
+    wait), and calls beyond requests_per_minute fail with a 429. The quota
+    is a token bucket refilled at requests_per_minute / 60 per second that
+    holds up to one second's worth (at least one request), so any rate,
+    not only multiples of 60, is enforced exactly over time.
+
+    Injected errors: a fraction error_rate of the admitted calls fail with a
+    code drawn from error_codes, using a generator seeded with seed.
+    """
+
+    def __init__(self, model_name: str = "fake-model",
+                 latency: Union[float, Callable[[], float]] = 0.0,
+                 per_token_latency: float = 0.0,
+                 responder: Optional[Callable[[str], str]] = None,
+                 canned: Optional[Dict[str, str]] = None,
+                 max_concurrency: Optional[int] = None,
+                 requests_per_minute: Optional[float] = None,
+                 error_rate: float = 0.0,
+                 error_codes: Sequence[int] = (500, 503),
+                 seed: int = 0):
+        self.model_name = model_name
+        self.latency = latency
+        self.per_token_latency = per_token_latency
+        self.responder = responder or default_responder
+        self.canned = canned or {}
+        self.max_concurrency = max_concurrency
+        self.requests_per_minute = requests_per_minute
+        self.error_rate = error_rate
+        self.error_codes = tuple(error_codes)
+        self.calls = 0
+        self.prompt_tokens = 0
+        self.output_tokens = 0
+        self.rejected = 0
+        self.injected_errors = 0
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.prompts = deque(maxlen=100)
+        self._quota = self._new_quota()
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self._slots = threading.Condition(self._lock)
+
+    def generate_content(self, contents, stream: bool = False, **kwargs):
+        self._admit()
+        response = self._respond(contents)
+        if stream:
+            return self._stream(response)
+        with self._slot():
+            time.sleep(self._delay(response))
+        return response
+
+    async def generate_content_async(self, contents, stream: bool = False, **kwargs):
+        self._admit()
+        response = self._respond(contents)
+        if stream:
+            return self._astream(response)
+        async with self._aslot():
+            await asyncio.sleep(self._delay(response))
+        return response
+
+    def count_tokens(self, contents) -> FakeCountTokensResponse:
+        return FakeCountTokensResponse(count_tokens(self._prompt_text(contents)))
+
+    async def count_tokens_async(self, contents) -> FakeCountTokensResponse:
+        return self.count_tokens(contents)
+
+    def _stream(self, response: FakeResponse):
+        # Time to first chunk is the base latency; each chunk then costs its tokens
+        with self._slot():
+            time.sleep(self._base_latency())
+            for chunk in self._chunks(response):
+                time.sleep(self.per_token_latency * chunk.usage_metadata.candidates_token_count)
+                yield chunk
+
+    async def _astream(self, response: FakeResponse):
+        async with self._aslot():
+            await asyncio.sleep(self._base_latency())
+            for chunk in self._chunks(response):
+                await asyncio.sleep(self.per_token_latency * chunk.usage_metadata.candidates_token_count)
+                yield chunk
+
+    def _chunks(self, response: FakeResponse, size: int = 64) -> List[FakeResponse]:
+        usage = response.usage_metadata
+        return [
+            FakeResponse(response.text[i:i + size], FakeUsageMetadata(usage.prompt_token_count, count_tokens(response.text[i:i + size]), 0))
+            for i in range(0, len(response.text), size)
+        ]
+
+    def reset(self):
+        with self._lock:
+            self.calls = 0
+            self.prompt_tokens = 0
+            self.output_tokens = 0
+            self.rejected = 0
+            self.injected_errors = 0
+            self.max_in_flight = 0
+            self.prompts.clear()
+            self._quota = self._new_quota()
+
+    def stats(self) -> Dict:
+        return {
+            "calls": self.calls,
+            "prompt_tokens": self.prompt_tokens,
+            "output_tokens": self.output_tokens,
+            "total_tokens": self.prompt_tokens + self.output_tokens,
+            "rejected": self.rejected,
+            "injected_errors": self.injected_errors,
+            "max_in_flight": self.max_in_flight
+        }
+
+    def _new_quota(self) -> Optional[TokenBucket]:
+        if self.requests_per_minute is None:
+            return None
+        rate = self.requests_per_minute / 60
+        return TokenBucket(rate, max(1.0, rate))
+
+    def _admit(self):
+        """
+        Apply the request quota and error injection before any work is done
+        """
+        with self._lock:
+            if self._quota is not None:
+                if self._quota.wait_time(1, time.monotonic()) > 0:
+                    self.rejected += 1
+                    raise FakeAPIError(429, "Resource has been exhausted")
+                self._quota.take(1)
+            if self.error_rate and self._rng.random() < self.error_rate:
+                self.injected_errors += 1
+                raise FakeAPIError(self._rng.choice(self.error_codes))
+
+    @contextmanager
+    def _slot(self):
+        with self._slots:
+            while self.max_concurrency is not None and self.in_flight >= self.max_concurrency:
+                self._slots.wait()
+            self._enter()
+        try:
+            yield
+        finally:
+            with self._slots:
+                self.in_flight -= 1
+                self._slots.notify()
+
+    @asynccontextmanager
+    async def _aslot(self):
+        # Polled rather than an asyncio.Semaphore so one model can serve several event loops
+        while True:
+            with self._lock:
+                if self.max_concurrency is None or self.in_flight < self.max_concurrency:
+                    self._enter()
+                    break
+            await asyncio.sleep(0.001)
+        try:
+            yield
+        finally:
+            with self._slots:
+                self.in_flight -= 1
+                self._slots.notify()
+
+    def _enter(self):
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+
+    def _prompt_text(self, contents) -> str:
+        return contents if isinstance(contents, str) else "".join(str(part) for part in contents)
+
+    def _respond(self, contents) -> FakeResponse:
+        prompt = self._prompt_text(contents)
+        text = next((answer for marker, answer in self.canned.items() if marker in prompt), None)
+        if text is None:
+            text = self.responder(prompt)
+        usage = FakeUsageMetadata(count_tokens(prompt), count_tokens(text), count_tokens(prompt) + count_tokens(text))
+        with self._lock:
+            self.calls += 1
+            self.prompt_tokens += usage.prompt_token_count
+            self.output_tokens += usage.candidates_token_count
+            self.prompts.append(prompt)
+        return FakeResponse(text, usage)
+
+    def _base_latency(self) -> float:
+        return self.latency() if callable(self.latency) else self.latency
+
+    def _delay(self, response: FakeResponse) -> float:
+        return self._base_latency() + self.per_token_latency * response.usage_metadata.candidates_token_count
@@ -1,35 +1,175 @@
-import google.generativeai as genai
 import json
-import os
-from typing import Dict, List, Optional
-from dataclasses import dataclass
+import time
+from typing import AsyncIterator, Dict, Iterator, List, Optional, Tuple
+from dataclasses import dataclass, field
 from datetime import datetime
 import re
-# Configure Gemini API
-genai.configure(api_key=os.getenv('GEMINI_API_KEY'))
+from analogy_stream import PREAMBLE, SectionStreamParser
+from client_pool import ClientPool, default_client_pool
+from context_cache import CacheablePrompt, ContextCacheManager, prefix_key
+from hedging import Hedger
+from language_detection import LanguageDetector
+from model_calls import ModelCaller, Prompt
+from model_routing import (
+    ANALOGY_CREATION, LANGUAGE_DETECTION, QUESTION_TRANSLATION, RESPONSE_TRANSLATION, STRONG,
+    ModelRouter, RoutedModelCaller
+)
+from request_decoding import DecodeError, Decoder, request_digest
+from response_cache import CacheBackend, grade_band, make_cache_key, normalize_text
+from scheduler import Priority, Scheduler, request_priority
+from semantic_cache import SemanticQuestionCache
+from single_flight import SingleFlight
+from tracing import record_cache, traced
+from translation_memory import TranslationMemory
 
-@dataclass
+# The analogy prompt is split into a prefix that only depends on the cultural key
+# (cacheable model-side) and a per-student suffix
+def analogy_prompt_prefix(regional_info: Dict) -> str:
+    """
+    The static prompt prefix for one cultural key's regional information
+    """
+    return f"""
+        You are an expert teacher who specializes in creating culturally relevant analogies for students. 
+        
+        REGIONAL/CULTURAL INFORMATION:
+        - Common local concepts: {', '.join(regional_info['common_concepts'])}
+        - Local occupations: {', '.join(regional_info['occupations'])}
+        - Local festivals: {', '.join(regional_info['festivals'])}
+        - Local food: {', '.join(regional_info['food'])}
+        
+        TASK:
+        Create a detailed, culturally relevant analogy that explains the concept in the student's question using:
+        1. Local and familiar concepts from the student's environment
+        2. Everyday experiences the student can relate to
+        3. Simple language appropriate for the student's grade
+        4. Step-by-step explanation building from familiar to unfamiliar
+        5. Examples from local culture, geography, or daily life
+        
+        STRUCTURE YOUR RESPONSE AS:
+        1. **Simple Explanation**: Start with a basic explanation in simple terms
+        2. **Local Analogy**: Provide a detailed analogy using familiar local concepts
+        3. **Connection**: Clearly connect the analogy back to the original concept
+        4. **Example**: Give a practical example from the student's local environment
+        5. **Summary**: Summarize the key learning points
+        
+        Make sure the analogy is:
+        - Culturally sensitive and appropriate
+        - Age-appropriate for the student's grade
+        - Easy to understand and remember
+        - Relevant to the student's daily life experience
+        """
+
+def _concept_key(familiar_concepts) -> tuple:
+    """
+    familiar_concepts normalized for dedup keys: case, spacing and order ignored
+    """
+    return tuple(sorted({concept.strip().lower() for concept in familiar_concepts}))
+
+@dataclass(slots=True)
 class StudentContext:
-    student_id: str
-    name: str
-    grade: int
-    region: str  # Geographic region/state/country
-    local_language: str  # Primary local language
-    cultural_context: str  # Rural/Urban/Tribal etc.
-    familiar_concepts: List[str]  # Local concepts student is familiar with
+    student_id: str = ''
+    name: str = ''
+    grade: int = 1
+    region: str = 'Rural India'  # Geographic region/state/country
+    local_language: str = 'Hindi'  # Primary local language
+    cultural_context: str = 'rural'  # Rural/Urban/Tribal etc.
+    familiar_concepts: List[str] = field(default_factory=list)  # Local concepts student is familiar with
 
-@dataclass
+@dataclass(slots=True)
 class AnalogyRequest:
     student_context: StudentContext
     question: str  # Student's question in local language or English
-    subject: str
-    topic: str
-    complexity_level: str  # simple, moderate, complex
-    preferred_language: str  # Language for response
+    subject: str = 'General'
+    topic: str = 'Basic Concepts'
+    complexity_level: str = 'simple'  # simple, moderate, complex
+    preferred_language: str = 'English'  # Language for response
+
+@dataclass(frozen=True, slots=True)
+class FrozenStudentContext:
+    """
+    Immutable, hashable StudentContext; familiar_concepts is a tuple
+    """
+    student_id: str = ''
+    name: str = ''
+    grade: int = 1
+    region: str = 'Rural India'
+    local_language: str = 'Hindi'
+    cultural_context: str = 'rural'
+    familiar_concepts: Tuple[str, ...] = ()
+
+    @classmethod
+    def from_context(cls, context: StudentContext) -> "FrozenStudentContext":
+        return cls(context.student_id, context.name, context.grade, context.region,
+                   context.local_language, context.cultural_context, tuple(context.familiar_concepts))
+
+@dataclass(frozen=True, slots=True)
+class FrozenAnalogyRequest:
+    """
+    Immutable, hashable AnalogyRequest, usable as a dict or cache key.
+    cache_key is the request_digest, computed once at construction, and
+    hashing uses it. The services accept it wherever they take an AnalogyRequest.
+    """
+    student_context: FrozenStudentContext
+    question: str
+    subject: str = 'General'
+    topic: str = 'Basic Concepts'
+    complexity_level: str = 'simple'
+    preferred_language: str = 'English'
+    cache_key: str = field(init=False, repr=False, compare=False)
+
+    def __post_init__(self):
+        object.__setattr__(self, "cache_key", request_digest(self))
+
+    def __hash__(self):
+        return hash(self.cache_key)
+
+    @classmethod
+    def from_request(cls, req: AnalogyRequest) -> "FrozenAnalogyRequest":
+        return cls(FrozenStudentContext.from_context(req.student_context), req.question, req.subject,
+                   req.topic, req.complexity_level, req.preferred_language)
+
+# Payload decoders compiled once at import; defaults above fill missing fields
+analogy_request_decoder = Decoder(AnalogyRequest)
+frozen_analogy_request_decoder = Decoder(FrozenAnalogyRequest)
 
 class LocalAnalogyService:
-    def __init__(self):
-        self.model = genai.GenerativeModel('gemini-2.0-flash')
+    def __init__(self, language_detector: Optional[LanguageDetector] = None, model=None, fused: bool = False,
+                 response_cache: Optional[CacheBackend] = None,
+                 translation_memory: Optional[TranslationMemory] = None,
+                 semantic_cache: Optional[SemanticQuestionCache] = None,
+                 context_cache: Optional[ContextCacheManager] = None,
+                 client_pool: Optional[ClientPool] = None,
+                 scheduler: Optional[Scheduler] = None,
+                 single_flight: Optional[SingleFlight] = None,
+                 hedger: Optional[Hedger] = None,
+                 router: Optional[ModelRouter] = None):
+        # Models come from the process-wide pool so every instance shares one transport.
+        # A router maps each pipeline step to a model tier; without one every step uses self.model
+        if router is None:
+            router = ModelRouter({STRONG: model or (client_pool or default_client_pool()).model('gemini-2.0-flash')})
+        self.router = router
+        self.model = router.models[router.default_tier]
+        # Static prompt prefixes are served from model-side cached content when configured
+        # (only past the backend's minimum size; at ~400 tokens these are below the Gemini API's 4,096);
+        # a shared scheduler applies rate limits, with student questions as interactive calls;
+        # a hedger duplicates slow analogy generations to cut the tail
+        self.routed_caller = RoutedModelCaller(router, {
+            tier: ModelCaller(tier_model, context_cache, scheduler, Priority.INTERACTIVE, hedger)
+            for tier, tier_model in router.models.items()
+        })
+        self.model_caller = self.routed_caller.callers[router.default_tier]
+        # Identical requests arriving while one is in flight share its generation
+        self.single_flight = single_flight
+        # Generated analogies keyed by question, cultural key, grade band and request options
+        self.response_cache = response_cache
+        # Previously seen translations in either direction
+        self.translation_memory = translation_memory
+        # Near-duplicate questions answered by embedding similarity
+        self.semantic_cache = semantic_cache
+        # Fused mode answers detect/translate/create in a single model call
+        self.fused = fused
+        # Local detector; the model is only asked when it is not confident
+        self.language_detector = language_detector or LanguageDetector(self.get_supported_languages())
         
         # Predefined cultural and regional contexts for better analogies
         self.regional_contexts = {
@@ -52,76 +192,434 @@ class LocalAnalogyService:
                 "food": ["forest produce", "traditional recipes", "wild vegetables"]
             }
         }
+        
+        # Render the static prompt prefix once per cultural key
+        self._analogy_prefixes = {}
+        for cultural_key, regional_info in self.regional_contexts.items():
+            prefix = analogy_prompt_prefix(regional_info)
+            self._analogy_prefixes[cultural_key] = (prefix_key(f"analogy:{cultural_key}", prefix), prefix)
     
+    @traced("analogy.generate")
     def generate_analogy(self, analogy_request: AnalogyRequest) -> Dict:
         """
         Generate culturally relevant analogies for complex concepts
         """
+        if self.single_flight is None:
+            return self._generate_analogy(analogy_request)
+        (source, result), shared = self.single_flight.do(
+            self._request_key(analogy_request),
+            lambda: (analogy_request, self._generate_analogy(analogy_request))
+        )
+        return self._personalize_result(result, analogy_request, source) if shared else result
+    
+    @traced("analogy.generate")
+    async def agenerate_analogy(self, analogy_request: AnalogyRequest) -> Dict:
+        """
+        Async counterpart of generate_analogy that never blocks the event loop
+        """
+        if self.single_flight is None:
+            return await self._agenerate_analogy(analogy_request)
+        async def lead():
+            return analogy_request, await self._agenerate_analogy(analogy_request)
+        
+        (source, result), shared = await self.single_flight.ado(self._request_key(analogy_request), lead)
+        return self._personalize_result(result, analogy_request, source) if shared else result
+    
+    def _generate_analogy(self, analogy_request: AnalogyRequest) -> Dict:
+        """
+        The full pipeline behind generate_analogy
+        """
+        try:
+            if self.fused:
+                detected_language, translated_question, final_response = self._generate_fused(analogy_request)
+            else:
+                # Detect and translate the question if needed
+                detected_language, translated_question = self._process_question(
+                    analogy_request.question, 
+                    analogy_request.preferred_language
+                )
+                
+                # Generate culturally relevant analogy
+                analogy_response = self._create_analogy(analogy_request, translated_question)
+                
+                # Translate response back to preferred language if needed
+                final_response = self._translate_response(
+                    analogy_response, 
+                    analogy_request.preferred_language,
+                    detected_language
+                )
+            
+            return self._build_result(analogy_request, detected_language, translated_question, final_response)
+            
+        except Exception as e:
+            return {
+                "success": False,
+                "error": str(e),
+                "student_id": analogy_request.student_context.student_id
+            }
+    
+    async def _agenerate_analogy(self, analogy_request: AnalogyRequest) -> Dict:
+        """
+        Async counterpart of _generate_analogy
+        """
+        try:
+            if self.fused:
+                detected_language, translated_question, final_response = await self._agenerate_fused(analogy_request)
+            else:
+                detected_language, translated_question = await self._aprocess_question(
+                    analogy_request.question,
+                    analogy_request.preferred_language
+                )
+                analogy_response = await self._acreate_analogy(analogy_request, translated_question)
+                final_response = await self._atranslate_response(
+                    analogy_response,
+                    analogy_request.preferred_language,
+                    detected_language
+                )
+            
+            return self._build_result(analogy_request, detected_language, translated_question, final_response)
+            
+        except Exception as e:
+            return {
+                "success": False,
+                "error": str(e),
+                "student_id": analogy_request.student_context.student_id
+            }
+    
+    def generate_analogy_stream(self, analogy_request: AnalogyRequest) -> Iterator[Dict]:
+        """
+        Streaming variant of generate_analogy yielding events as the model produces text:
+        
+        - {"event": "question", ...} once the question has been detected and translated
+        - {"event": "chunk", "text": ...} for every piece of analogy text
+        - {"event": "preamble", "text": ...} for any text the model writes before the first section
+        - {"event": "section", "section": ..., "text": ...} when one of the five sections is complete
+        - {"event": "done", "result": ...} with the same dict generate_analogy returns
+        - {"event": "error", ...} if the pipeline fails
+        
+        When the answer needs translating, the preamble and each English section are
+        translated (and streamed) as soon as they are complete instead of after the
+        whole analogy.
+        Fused mode does not apply to streaming.
+        """
         try:
-            # Detect and translate the question if needed
             detected_language, translated_question = self._process_question(
-                analogy_request.question, 
+                analogy_request.question,
                 analogy_request.preferred_language
             )
+            yield {"event": "question", "detected_language": detected_language, "translated_question": translated_question}
+            
+            translate_out = self._needs_response_translation(analogy_request.preferred_language, detected_language)
+            cached = self._lookup_cached_analogy(analogy_request, translated_question)
+            if cached is not None:
+                english_chunks = iter([cached])
+            else:
+                english_chunks = self._stream_content(self._build_analogy_prompt(analogy_request, translated_question))
             
-            # Generate culturally relevant analogy
-            analogy_response = self._create_analogy(analogy_request, translated_question)
+            parser = SectionStreamParser()
+            english_parts = []
+            final_parts = []
+            for chunk in english_chunks:
+                english_parts.append(chunk)
+                if not translate_out:
+                    yield {"event": "chunk", "text": chunk}
+                for name, text in parser.feed(chunk):
+                    yield from self._stream_section(name, text, translate_out, analogy_request.preferred_language, final_parts)
+            for name, text in parser.finish():
+                yield from self._stream_section(name, text, translate_out, analogy_request.preferred_language, final_parts)
             
-            # Translate response back to preferred language if needed
-            final_response = self._translate_response(
-                analogy_response, 
-                analogy_request.preferred_language,
-                detected_language
+            english_response = "".join(english_parts)
+            if cached is None:
+                self._store_analogy(analogy_request, translated_question, english_response)
+            final_response = "\n".join(final_parts) if translate_out else english_response
+            
+            yield {
+                "event": "done",
+                "result": self._build_result(analogy_request, detected_language, translated_question, final_response)
+            }
+            
+        except Exception as e:
+            yield {
+                "event": "error",
+                "success": False,
+                "error": str(e),
+                "student_id": analogy_request.student_context.student_id
+            }
+    
+    async def agenerate_analogy_stream(self, analogy_request: AnalogyRequest) -> AsyncIterator[Dict]:
+        """
+        Async generator counterpart of generate_analogy_stream
+        """
+        try:
+            detected_language, translated_question = await self._aprocess_question(
+                analogy_request.question,
+                analogy_request.preferred_language
             )
+            yield {"event": "question", "detected_language": detected_language, "translated_question": translated_question}
             
-            return {
-                "success": True,
-                "student_id": analogy_request.student_context.student_id,
-                "original_question": analogy_request.question,
-                "detected_language": detected_language,
-                "translated_question": translated_question,
-                "subject": analogy_request.subject,
-                "topic": analogy_request.topic,
-                "analogy": final_response,
-                "cultural_context": analogy_request.student_context.cultural_context,
-                "region": analogy_request.student_context.region,
-                "generated_at": datetime.now().isoformat()
+            translate_out = self._needs_response_translation(analogy_request.preferred_language, detected_language)
+            cached = self._lookup_cached_analogy(analogy_request, translated_question)
+            if cached is not None:
+                english_chunks = self._astream_cached(cached)
+            else:
+                english_chunks = self._astream_content(self._build_analogy_prompt(analogy_request, translated_question))
+            
+            parser = SectionStreamParser()
+            english_parts = []
+            final_parts = []
+            async for chunk in english_chunks:
+                english_parts.append(chunk)
+                if not translate_out:
+                    yield {"event": "chunk", "text": chunk}
+                for name, text in parser.feed(chunk):
+                    async for event in self._astream_section(name, text, translate_out, analogy_request.preferred_language, final_parts):
+                        yield event
+            for name, text in parser.finish():
+                async for event in self._astream_section(name, text, translate_out, analogy_request.preferred_language, final_parts):
+                    yield event
+            
+            english_response = "".join(english_parts)
+            if cached is None:
+                self._store_analogy(analogy_request, translated_question, english_response)
+            final_response = "\n".join(final_parts) if translate_out else english_response
+            
+            yield {
+                "event": "done",
+                "result": self._build_result(analogy_request, detected_language, translated_question, final_response)
             }
             
         except Exception as e:
-            return {
+            yield {
+                "event": "error",
                 "success": False,
                 "error": str(e),
                 "student_id": analogy_request.student_context.student_id
             }
     
+    def _stream_section(self, name: str, text: str, translate_out: bool, preferred_language: str,
+                        final_parts: List[str]) -> Iterator[Dict]:
+        """
+        Emit a completed section (or the preamble), streaming its translation first when needed
+        """
+        if translate_out:
+            translated_parts = []
+            prompt = self._build_response_translation_prompt(text, preferred_language)
+            for chunk in self._stream_translate(text, "English", preferred_language, prompt):
+                translated_parts.append(chunk)
+                yield {"event": "chunk", "text": chunk}
+            text = "".join(translated_parts).strip()
+            final_parts.append(text)
+        if name == PREAMBLE:
+            yield {"event": "preamble", "text": text}
+        else:
+            yield {"event": "section", "section": name, "text": text}
+    
+    async def _astream_section(self, name: str, text: str, translate_out: bool, preferred_language: str,
+                               final_parts: List[str]) -> AsyncIterator[Dict]:
+        """
+        Async counterpart of _stream_section
+        """
+        if translate_out:
+            translated_parts = []
+            prompt = self._build_response_translation_prompt(text, preferred_language)
+            async for chunk in self._astream_translate(text, "English", preferred_language, prompt):
+                translated_parts.append(chunk)
+                yield {"event": "chunk", "text": chunk}
+            text = "".join(translated_parts).strip()
+            final_parts.append(text)
+        if name == PREAMBLE:
+            yield {"event": "preamble", "text": text}
+        else:
+            yield {"event": "section", "section": name, "text": text}
+    
+    def generate_analogies_batch(self, requests: List[AnalogyRequest], max_workers: int = 8) -> Dict:
+        """
+        Generate analogies for a whole classroom, generating once per group of
+        equivalent requests and fanning the result out to every student
+        """
+        start = time.perf_counter()
+        groups = self._group_batch_requests(requests)
+        
+        def run_group(members: List[int]) -> tuple:
+            group_start = time.perf_counter()
+            with request_priority(Priority.BULK):
+                result = self.generate_analogy(requests[members[0]])
+            return result, time.perf_counter() - group_start
+        
+        from concurrent.futures import ThreadPoolExecutor
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            outcomes = list(executor.map(run_group, groups.values()))
+        
+        return self._fan_out_batch(requests, list(groups.values()), outcomes, time.perf_counter() - start)
+    
+    async def agenerate_analogies_batch(self, requests: List[AnalogyRequest], max_concurrency: int = 8) -> Dict:
+        """
+        Async counterpart of generate_analogies_batch
+        """
+        import asyncio
+        start = time.perf_counter()
+        groups = self._group_batch_requests(requests)
+        semaphore = asyncio.Semaphore(max_concurrency)
+        
+        async def run_group(members: List[int]) -> tuple:
+            async with semaphore:
+                group_start = time.perf_counter()
+                with request_priority(Priority.BULK):
+                    result = await self.agenerate_analogy(requests[members[0]])
+                return result, time.perf_counter() - group_start
+        
+        outcomes = await asyncio.gather(*(run_group(members) for members in groups.values()))
+        
+        return self._fan_out_batch(requests, list(groups.values()), outcomes, time.perf_counter() - start)
+    
+    def _batch_key(self, req: AnalogyRequest) -> tuple:
+        """
+        Requests with the same key receive the same generated analogy. The
+        prompt weaves familiar_concepts into the analogy, so they are part of
+        the key; the name is swapped per student in _fan_out_batch.
+        """
+        context = req.student_context
+        return (
+            self._get_cultural_key(context.cultural_context, context.region),
+            context.grade,
+            _concept_key(context.familiar_concepts),
+            req.subject.strip().lower(),
+            req.topic.strip().lower(),
+            req.complexity_level.strip().lower(),
+            req.preferred_language.strip().lower(),
+            " ".join(req.question.lower().split())
+        )
+    
+    def _group_batch_requests(self, requests: List[AnalogyRequest]) -> Dict[tuple, List[int]]:
+        groups = {}
+        for index, req in enumerate(requests):
+            groups.setdefault(self._batch_key(req), []).append(index)
+        return groups
+    
+    def _fan_out_batch(self, requests: List[AnalogyRequest], groups: List[List[int]],
+                       outcomes: List[tuple], elapsed: float) -> Dict:
+        """
+        Copy each group's result to its members and report dedup statistics
+        """
+        results = [None] * len(requests)
+        sequential_estimate = 0.0
+        for members, (result, duration) in zip(groups, outcomes):
+            sequential_estimate += duration * len(members)
+            for index in members:
+                results[index] = self._personalize_result(result, requests[index], requests[members[0]])
+        
+        return {
+            "results": results,
+            "batch_stats": {
+                "requests": len(requests),
+                "groups": len(groups),
+                "dedup_ratio": 1 - len(groups) / len(requests) if requests else 0.0,
+                "wall_clock_seconds": elapsed,
+                "sequential_estimate_seconds": sequential_estimate,
+                "saved_seconds": max(0.0, sequential_estimate - elapsed)
+            }
+        }
+    
+    def _request_key(self, req: AnalogyRequest) -> tuple:
+        """
+        Single-flight key. As in _batch_key, familiar_concepts are part of it
+        since the analogy is woven around them; the leader's name is swapped
+        for each coalesced caller's.
+        """
+        context = req.student_context
+        return make_cache_key(
+            req.question,
+            self._get_cultural_key(context.cultural_context, context.region),
+            context.grade,
+            req.subject,
+            req.topic,
+            req.complexity_level,
+            req.preferred_language
+        ), _concept_key(context.familiar_concepts)
+    
+    def _personalize_result(self, result: Dict, req: AnalogyRequest,
+                            source: Optional[AnalogyRequest] = None) -> Dict:
+        """
+        Copy of a result generated for an equivalent request, with this student's
+        details. When the request it was generated for is known, that student's
+        name in the analogy is replaced with this one's.
+        """
+        context = req.student_context
+        student_result = dict(result, student_id=context.student_id)
+        if result.get("success"):
+            student_result["cultural_context"] = context.cultural_context
+            student_result["region"] = context.region
+            student_result["original_question"] = req.question
+            source_name = source.student_context.name.strip() if source is not None else ""
+            name = context.name.strip()
+            if source_name and name and source_name != name:
+                student_result["analogy"] = re.sub(
+                    rf"\b{re.escape(source_name)}\b", lambda match: name, result["analogy"]
+                )
+        return student_result
+    
+    def _build_result(self, analogy_request: AnalogyRequest, detected_language: str,
+                      translated_question: str, final_response: str) -> Dict:
+        """
+        Assemble the response dict returned to the caller
+        """
+        return {
+            "success": True,
+            "student_id": analogy_request.student_context.student_id,
+            "original_question": analogy_request.question,
+            "detected_language": detected_language,
+            "translated_question": translated_question,
+            "subject": analogy_request.subject,
+            "topic": analogy_request.topic,
+            "analogy": final_response,
+            "cultural_context": analogy_request.student_context.cultural_context,
+            "region": analogy_request.student_context.region,
+            "generated_at": datetime.now().isoformat()
+        }
+    
+    def _generate_content(self, prompt: Prompt, step: str = ANALOGY_CREATION, **kwargs) -> str:
+        """
+        Single entry point for blocking model calls
+        """
+        return self.routed_caller.generate(step, prompt, **kwargs)
+    
+    async def _agenerate_content(self, prompt: Prompt, step: str = ANALOGY_CREATION, **kwargs) -> str:
+        """
+        Single entry point for async model calls
+        """
+        return await self.routed_caller.agenerate(step, prompt, **kwargs)
+    
+    def _stream_content(self, prompt: Prompt, step: str = ANALOGY_CREATION, **kwargs) -> Iterator[str]:
+        """
+        Single entry point for streamed blocking model calls
+        """
+        return self.routed_caller.stream(step, prompt, **kwargs)
+    
+    def _astream_content(self, prompt: Prompt, step: str = ANALOGY_CREATION, **kwargs) -> AsyncIterator[str]:
+        """
+        Single entry point for streamed async model calls
+        """
+        return self.routed_caller.astream(step, prompt, **kwargs)
+    
+    async def _astream_cached(self, text: str) -> AsyncIterator[str]:
+        yield text
+    
+    @traced("analogy.process_question")
     def _process_question(self, question: str, preferred_language: str) -> tuple:
         """
         Detect language and translate question to English for processing
         """
         try:
-            # Language detection prompt
-            detection_prompt = f"""
-            Analyze the following text and determine the language it's written in:
-            "{question}"
-            
-            Respond with just the language name (e.g., "Hindi", "Bengali", "Tamil", "English", etc.)
-            """
-            
-            detection_response = self.model.generate_content(detection_prompt)
-            detected_language = detection_response.text.strip()
+            detection = self.language_detector.detect(question)
+            if self.language_detector.is_confident(detection):
+                detected_language = detection.language
+            else:
+                detected_language = self._generate_content(self._build_detection_prompt(question), step=LANGUAGE_DETECTION).strip()
             
             # If not English, translate to English
             if detected_language.lower() != "english":
-                translation_prompt = f"""
-                Translate the following {detected_language} text to English:
-                "{question}"
-                
-                Provide only the English translation without any additional text.
-                """
-                
-                translation_response = self.model.generate_content(translation_prompt)
-                translated_question = translation_response.text.strip()
+                translation_prompt = self._build_question_translation_prompt(question, detected_language)
+                translated_question = self._translate(question, detected_language, "English", translation_prompt)
             else:
                 translated_question = question
             
@@ -131,19 +629,140 @@ class LocalAnalogyService:
             # Fallback: assume English
             return "English", question
     
+    @traced("analogy.process_question")
+    async def _aprocess_question(self, question: str, preferred_language: str) -> tuple:
+        """
+        Async counterpart of _process_question
+        """
+        try:
+            detection = self.language_detector.detect(question)
+            if self.language_detector.is_confident(detection):
+                detected_language = detection.language
+            else:
+                detected_language = (await self._agenerate_content(
+                    self._build_detection_prompt(question), step=LANGUAGE_DETECTION
+                )).strip()
+            
+            if detected_language.lower() != "english":
+                translation_prompt = self._build_question_translation_prompt(question, detected_language)
+                translated_question = await self._atranslate(question, detected_language, "English", translation_prompt)
+            else:
+                translated_question = question
+            
+            return detected_language, translated_question
+            
+        except Exception as e:
+            return "English", question
+    
+    def _build_detection_prompt(self, question: str) -> str:
+        # Language detection prompt
+        return f"""
+        Analyze the following text and determine the language it's written in:
+        "{question}"
+        
+        Respond with just the language name (e.g., "Hindi", "Bengali", "Tamil", "English", etc.)
+        """
+    
+    def _build_question_translation_prompt(self, question: str, detected_language: str) -> str:
+        return f"""
+        Translate the following {detected_language} text to English:
+        "{question}"
+        
+        Provide only the English translation without any additional text.
+        """
+    
+    @traced("analogy.create_analogy")
     def _create_analogy(self, req: AnalogyRequest, translated_question: str) -> str:
         """
         Create culturally relevant analogy based on student's context
         """
+        cached = self._lookup_cached_analogy(req, translated_question)
+        if cached is not None:
+            return cached
+        
+        analogy = self._generate_content(self._build_analogy_prompt(req, translated_question), hedge=True)
+        self._store_analogy(req, translated_question, analogy)
+        return analogy
+    
+    @traced("analogy.create_analogy")
+    async def _acreate_analogy(self, req: AnalogyRequest, translated_question: str) -> str:
+        """
+        Async counterpart of _create_analogy
+        """
+        cached = self._lookup_cached_analogy(req, translated_question)
+        if cached is not None:
+            return cached
+        
+        analogy = await self._agenerate_content(self._build_analogy_prompt(req, translated_question), hedge=True)
+        self._store_analogy(req, translated_question, analogy)
+        return analogy
+    
+    def _lookup_cached_analogy(self, req: AnalogyRequest, translated_question: str) -> Optional[str]:
+        """
+        Try the exact response cache, then the semantic near-duplicate cache
+        """
+        if self.response_cache is not None:
+            cached = self.response_cache.get(self._analogy_cache_key(req, translated_question))
+            record_cache("response", cached is not None)
+            if cached is not None:
+                return cached
+        
+        if self.semantic_cache is not None:
+            cached = self.semantic_cache.lookup(translated_question, self._semantic_scope(req))
+            record_cache("semantic", cached is not None)
+            if cached is not None:
+                if self.response_cache is not None:
+                    self.response_cache.set(self._analogy_cache_key(req, translated_question), cached)
+                return cached
+        
+        return None
+    
+    def _store_analogy(self, req: AnalogyRequest, translated_question: str, analogy: str):
+        if self.response_cache is not None:
+            self.response_cache.set(self._analogy_cache_key(req, translated_question), analogy)
+        if self.semantic_cache is not None:
+            self.semantic_cache.add(translated_question, self._semantic_scope(req), analogy)
+    
+    def _semantic_scope(self, req: AnalogyRequest) -> tuple:
+        """
+        Everything in _analogy_cache_key except the question, which is matched
+        by similarity; answers are English, like the response cache entries
+        """
+        context = req.student_context
+        return (
+            self._get_cultural_key(context.cultural_context, context.region),
+            grade_band(context.grade),
+            normalize_text(req.subject),
+            normalize_text(req.topic),
+            normalize_text(req.complexity_level)
+        )
+    
+    def _analogy_cache_key(self, req: AnalogyRequest, translated_question: str, language: str = "English") -> str:
+        """
+        Response cache key; _create_analogy always answers in English
+        """
+        context = req.student_context
+        return make_cache_key(
+            translated_question,
+            self._get_cultural_key(context.cultural_context, context.region),
+            context.grade,
+            req.subject,
+            req.topic,
+            req.complexity_level,
+            language
+        )
+    
+    def _build_analogy_prompt(self, req: AnalogyRequest, translated_question: str) -> CacheablePrompt:
+        """
+        Build the analogy prompt for the student's context and question
+        """
         context = req.student_context
         
-        # Get regional context
+        # Prefix is pre-rendered per cultural key at construction
         cultural_key = self._get_cultural_key(context.cultural_context, context.region)
-        regional_info = self.regional_contexts.get(cultural_key, self.regional_contexts["rural_india"])
-        
-        analogy_prompt = f"""
-        You are an expert teacher who specializes in creating culturally relevant analogies for students. 
+        key, prefix = self._analogy_prefixes.get(cultural_key, self._analogy_prefixes["rural_india"])
         
+        suffix = f"""
         STUDENT CONTEXT:
         - Name: {context.name}
         - Grade: {context.grade}
@@ -152,41 +771,166 @@ class LocalAnalogyService:
         - Cultural Context: {context.cultural_context}
         - Familiar Concepts: {', '.join(context.familiar_concepts)}
         
-        REGIONAL/CULTURAL INFORMATION:
-        - Common local concepts: {', '.join(regional_info['common_concepts'])}
-        - Local occupations: {', '.join(regional_info['occupations'])}
-        - Local festivals: {', '.join(regional_info['festivals'])}
-        - Local food: {', '.join(regional_info['food'])}
-        
         QUESTION TO EXPLAIN: "{translated_question}"
         SUBJECT: {req.subject}
         TOPIC: {req.topic}
         COMPLEXITY LEVEL: {req.complexity_level}
+        """
+        return CacheablePrompt(key, prefix, suffix)
+    
+    @traced("analogy.fused")
+    def _generate_fused(self, req: AnalogyRequest) -> tuple:
+        """
+        Detect, understand and answer the question with a single model call.
+        Answers in the same language as the chained pipeline and shares its
+        caches; falls back to the chained pipeline if the JSON envelope is unusable.
+        """
+        detected_language, translated_question = self._known_question(req.question)
+        if translated_question is not None:
+            cached = self._lookup_localized_analogy(req, detected_language, translated_question)
+            if cached is None:
+                cached = self._lookup_cached_analogy(req, translated_question)
+                if cached is not None:
+                    cached = self._translate_response(cached, req.preferred_language, detected_language)
+            if cached is not None:
+                return detected_language, translated_question, cached
         
-        TASK:
-        Create a detailed, culturally relevant analogy that explains the concept in the question using:
-        1. Local and familiar concepts from the student's environment
-        2. Everyday experiences the student can relate to
-        3. Simple language appropriate for grade {context.grade}
-        4. Step-by-step explanation building from familiar to unfamiliar
-        5. Examples from local culture, geography, or daily life
+        text = self._generate_content(
+            self._build_fused_prompt(req, detected_language),
+            generation_config={"response_mime_type": "application/json"}
+        )
+        envelope = self._parse_fused_envelope(text, detected_language, translated_question)
+        if envelope:
+            self._store_fused(req, *envelope)
+            return envelope
         
-        STRUCTURE YOUR RESPONSE AS:
-        1. **Simple Explanation**: Start with a basic explanation in simple terms
-        2. **Local Analogy**: Provide a detailed analogy using familiar local concepts
-        3. **Connection**: Clearly connect the analogy back to the original concept
-        4. **Example**: Give a practical example from the student's local environment
-        5. **Summary**: Summarize the key learning points
+        detected_language, translated_question = self._process_question(req.question, req.preferred_language)
+        analogy_response = self._create_analogy(req, translated_question)
+        return detected_language, translated_question, self._translate_response(
+            analogy_response, req.preferred_language, detected_language
+        )
+    
+    @traced("analogy.fused")
+    async def _agenerate_fused(self, req: AnalogyRequest) -> tuple:
+        """
+        Async counterpart of _generate_fused
+        """
+        detected_language, translated_question = self._known_question(req.question)
+        if translated_question is not None:
+            cached = self._lookup_localized_analogy(req, detected_language, translated_question)
+            if cached is None:
+                cached = self._lookup_cached_analogy(req, translated_question)
+                if cached is not None:
+                    cached = await self._atranslate_response(cached, req.preferred_language, detected_language)
+            if cached is not None:
+                return detected_language, translated_question, cached
         
-        Make sure the analogy is:
-        - Culturally sensitive and appropriate
-        - Age-appropriate for grade {context.grade}
-        - Easy to understand and remember
-        - Relevant to the student's daily life experience
+        text = await self._agenerate_content(
+            self._build_fused_prompt(req, detected_language),
+            generation_config={"response_mime_type": "application/json"}
+        )
+        envelope = self._parse_fused_envelope(text, detected_language, translated_question)
+        if envelope:
+            self._store_fused(req, *envelope)
+            return envelope
+        
+        detected_language, translated_question = await self._aprocess_question(req.question, req.preferred_language)
+        analogy_response = await self._acreate_analogy(req, translated_question)
+        return detected_language, translated_question, await self._atranslate_response(
+            analogy_response, req.preferred_language, detected_language
+        )
+    
+    def _known_question(self, question: str) -> tuple:
+        """
+        (detected_language, translated_question) as far as they are known without
+        a model call: from a confident local detection and the translation memory.
+        Unknown parts are None.
+        """
+        detection = self.language_detector.detect(question)
+        if not self.language_detector.is_confident(detection):
+            return None, None
+        detected_language = detection.language
+        if detected_language.lower() == "english":
+            return detected_language, question
+        if self.translation_memory is not None:
+            translated = self.translation_memory.lookup(question, detected_language, "English")
+            record_cache("translation_memory", translated is not None)
+            if translated is not None:
+                return detected_language, translated
+        return detected_language, None
+    
+    def _answer_language(self, preferred_language: str, detected_language: str) -> str:
+        """
+        Language the final analogy is in; the chained pipeline only translates
+        out of English when both the preferred and detected languages are non-English
         """
+        if self._needs_response_translation(preferred_language, detected_language):
+            return preferred_language
+        return "English"
+    
+    def _lookup_localized_analogy(self, req: AnalogyRequest, detected_language: str,
+                                  translated_question: str) -> Optional[str]:
+        """
+        Fused answers written directly in a non-English language, cached under that language
+        """
+        language = self._answer_language(req.preferred_language, detected_language)
+        if language == "English" or self.response_cache is None:
+            return None
+        cached = self.response_cache.get(self._analogy_cache_key(req, translated_question, language))
+        record_cache("response", cached is not None)
+        return cached
+    
+    def _store_fused(self, req: AnalogyRequest, detected_language: str, translated_question: str, analogy: str):
+        """
+        Cache a fused answer where the chained pipeline (English) or _lookup_localized_analogy
+        finds it, and the question's translation where _known_question does
+        """
+        if self.translation_memory is not None and detected_language.lower() != "english":
+            self.translation_memory.store(req.question, detected_language, "English", translated_question)
+        language = self._answer_language(req.preferred_language, detected_language)
+        if language == "English":
+            self._store_analogy(req, translated_question, analogy)
+        elif self.response_cache is not None:
+            self.response_cache.set(self._analogy_cache_key(req, translated_question, language), analogy)
+    
+    def _build_fused_prompt(self, req: AnalogyRequest, detected_language: Optional[str] = None) -> str:
+        if detected_language is not None:
+            answer_language = self._answer_language(req.preferred_language, detected_language)
+            language_rule = f"writing the analogy in {answer_language}"
+        elif req.preferred_language.lower() == "english":
+            answer_language = "English"
+            language_rule = "writing the analogy in English"
+        else:
+            answer_language = f"{req.preferred_language} or English"
+            language_rule = (f"writing the analogy in {req.preferred_language} if the question is not written "
+                             f"in English, and in English if it is")
+        return f"""
+        The student's question below may be written in any language, including romanized text.
+        Do all of the following in one pass:
+        1. Detect the language the question is written in.
+        2. Translate the question to English.
+        3. Answer it by following the teaching instructions below, {language_rule}.
+        
+        Respond with only a JSON envelope of the form:
+        {{"detected_language": "language name", "translated_question": "English translation", "analogy": "the full analogy in {answer_language}"}}
         
-        response = self.model.generate_content(analogy_prompt)
-        return response.text
+        TEACHING INSTRUCTIONS:
+        {str(self._build_analogy_prompt(req, req.question))}
+        """
+    
+    def _parse_fused_envelope(self, text: str, detected_language: Optional[str] = None,
+                              translated_question: Optional[str] = None) -> Optional[tuple]:
+        """
+        Extract (detected_language, translated_question, analogy) from the fused JSON envelope.
+        What _known_question already established wins over the model's, as in the chained pipeline.
+        """
+        try:
+            envelope = json.loads(text[text.find('{'):text.rfind('}') + 1])
+            return (detected_language or envelope['detected_language'],
+                    translated_question or envelope['translated_question'],
+                    envelope['analogy'])
+        except (json.JSONDecodeError, KeyError, TypeError):
+            return None
     
     def _get_cultural_key(self, cultural_context: str, region: str) -> str:
         """
@@ -202,28 +946,15 @@ class LocalAnalogyService:
         else:
             return "rural_india"
     
+    @traced("analogy.translate_response")
     def _translate_response(self, response: str, preferred_language: str, detected_language: str) -> str:
         """
         Translate the analogy response to the preferred language if needed
         """
         try:
-            if preferred_language.lower() != "english" and detected_language.lower() != "english":
-                translation_prompt = f"""
-                Translate the following English text to {preferred_language}, maintaining the structure and cultural references:
-                
-                "{response}"
-                
-                Make sure to:
-                1. Keep the educational structure intact
-                2. Maintain cultural references and analogies
-                3. Use appropriate language level for a grade school student
-                4. Preserve the key learning concepts
-                
-                Provide only the translated text.
-                """
-                
-                translation_response = self.model.generate_content(translation_prompt)
-                return translation_response.text.strip()
+            if self._needs_response_translation(preferred_language, detected_language):
+                translation_prompt = self._build_response_translation_prompt(response, preferred_language)
+                return self._translate(response, "English", preferred_language, translation_prompt)
             
             return response
             
@@ -231,6 +962,120 @@ class LocalAnalogyService:
             # Fallback: return original response
             return response
     
+    @traced("analogy.translate_response")
+    async def _atranslate_response(self, response: str, preferred_language: str, detected_language: str) -> str:
+        """
+        Async counterpart of _translate_response
+        """
+        try:
+            if self._needs_response_translation(preferred_language, detected_language):
+                translation_prompt = self._build_response_translation_prompt(response, preferred_language)
+                return await self._atranslate(response, "English", preferred_language, translation_prompt)
+            
+            return response
+            
+        except Exception as e:
+            return response
+    
+    def _translate(self, text: str, source_language: str, target_language: str, prompt: str) -> str:
+        """
+        Translate via the translation memory, asking the model only on a miss
+        """
+        if self.translation_memory is not None:
+            cached = self.translation_memory.lookup(text, source_language, target_language)
+            record_cache("translation_memory", cached is not None)
+            if cached is not None:
+                return cached
+        
+        translation = self._generate_content(prompt, step=self._translation_step(target_language)).strip()
+        if self.translation_memory is not None:
+            self.translation_memory.store(text, source_language, target_language, translation)
+        return translation
+    
+    async def _atranslate(self, text: str, source_language: str, target_language: str, prompt: str) -> str:
+        """
+        Async counterpart of _translate
+        """
+        if self.translation_memory is not None:
+            cached = self.translation_memory.lookup(text, source_language, target_language)
+            record_cache("translation_memory", cached is not None)
+            if cached is not None:
+                return cached
+        
+        translation = (await self._agenerate_content(prompt, step=self._translation_step(target_language))).strip()
+        if self.translation_memory is not None:
+            self.translation_memory.store(text, source_language, target_language, translation)
+        return translation
+    
+    def _stream_translate(self, text: str, source_language: str, target_language: str, prompt: str) -> Iterator[str]:
+        """
+        Streaming counterpart of _translate
+        """
+        if self.translation_memory is not None:
+            cached = self.translation_memory.lookup(text, source_language, target_language)
+            record_cache("translation_memory", cached is not None)
+            if cached is not None:
+                yield cached
+                return
+        
+        parts = []
+        for chunk in self._stream_content(prompt, step=self._translation_step(target_language)):
+            parts.append(chunk)
+            yield chunk
+        if self.translation_memory is not None:
+            self.translation_memory.store(text, source_language, target_language, "".join(parts).strip())
+    
+    async def _astream_translate(self, text: str, source_language: str, target_language: str,
+                                 prompt: str) -> AsyncIterator[str]:
+        """
+        Async counterpart of _stream_translate
+        """
+        if self.translation_memory is not None:
+            cached = self.translation_memory.lookup(text, source_language, target_language)
+            record_cache("translation_memory", cached is not None)
+            if cached is not None:
+                yield cached
+                return
+        
+        parts = []
+        async for chunk in self._astream_content(prompt, step=self._translation_step(target_language)):
+            parts.append(chunk)
+            yield chunk
+        if self.translation_memory is not None:
+            self.translation_memory.store(text, source_language, target_language, "".join(parts).strip())
+    
+    def _translation_step(self, target_language: str) -> str:
+        # Questions are translated into English, answers out of it
+        return QUESTION_TRANSLATION if target_language == "English" else RESPONSE_TRANSLATION
+    
+    def _needs_response_translation(self, preferred_language: str, detected_language: str) -> bool:
+        return preferred_language.lower() != "english" and detected_language.lower() != "english"
+    
+    def _build_response_translation_prompt(self, response: str, preferred_language: str) -> str:
+        return f"""
+        Translate the following English text to {preferred_language}, maintaining the structure and cultural references:
+        
+        "{response}"
+        
+        Make sure to:
+        1. Keep the educational structure intact
+        2. Maintain cultural references and analogies
+        3. Use appropriate language level for a grade school student
+        4. Preserve the key learning concepts
+        
+        Provide only the translated text.
+        """
+    
+    def warm_up(self):
+        """
+        Load and configure the model SDK for every tier before the first
+        request instead of during it
+        """
+        for model in self.router.models.values():
+            warm_up = getattr(model, "warm_up", None)
+            if warm_up is not None:
+                warm_up()
+    
     def get_supported_languages(self) -> List[str]:
         """
         Return list of supported languages for analogies
@@ -261,38 +1106,20 @@ def generate_local_analogy(data):
         "complexity_level": "simple|moderate|complex",
         "preferred_language": "string"
     }
+
+    Accepts the parsed payload or the raw JSON bytes. Returns an
+    AnalogyRequest, or an error dict naming every invalid field.
     """
-     
-    # Validate required fields
-    if not data or 'student_context' not in data or 'question' not in data:
+    try:
+        if isinstance(data, (bytes, bytearray, memoryview, str)):
+            return analogy_request_decoder.decode(data)
+        return analogy_request_decoder.convert(data)
+    except DecodeError as e:
         return {
-            "success": False, 
-            "error": "Student context and question are required"
+            "success": False,
+            "error": str(e),
+            "errors": e.errors
         }
-    
-    # Create student context
-    context_data = data['student_context']
-    student_context = StudentContext(
-        student_id=context_data.get('student_id', ''),
-        name=context_data.get('name', ''),
-        grade=context_data.get('grade', 1),
-        region=context_data.get('region', 'Rural India'),
-        local_language=context_data.get('local_language', 'Hindi'),
-        cultural_context=context_data.get('cultural_context', 'rural'),
-        familiar_concepts=context_data.get('familiar_concepts', [])
-    )
-    
-    # Create analogy request
-    analogy_request = AnalogyRequest(
-        student_context=student_context,
-        question=data.get('question', ''),
-        subject=data.get('subject', 'General'),
-        topic=data.get('topic', 'Basic Concepts'),
-        complexity_level=data.get('complexity_level', 'simple'),
-        preferred_language=data.get('preferred_language', 'English')
-    )
-    
-    return analogy_request
 
 if __name__ == '__main__':
     # Set your Gemini API key as an environment variable
@@ -0,0 +1,188 @@
+import contextvars
+import threading
+import time
+from typing import Any, Awaitable, Callable, Dict, Optional
+from dataclasses import dataclass, asdict
+from collections import deque
+
+
+@dataclass
+class HedgeMetrics:
+    calls: int = 0
+    hedged: int = 0  # duplicates fired
+    hedge_wins: int = 0  # duplicates that answered first
+    budget_denied: int = 0  # slow calls not hedged because the budget was spent
+    inline: int = 0  # sync calls run on the caller's thread, unhedgeable (budget spent or workers busy)
+
+    @property
+    def hedge_rate(self) -> float:
+        return self.hedged / self.calls if self.calls else 0.0
+
+    def to_dict(self) -> Dict:
+        return dict(asdict(self), hedge_rate=self.hedge_rate)
+
+
+class Hedger:
+    """
+    Hedged requests: when a call has not returned after the delay_percentile
+    of recently observed latencies, a duplicate is fired and whichever
+    answers first wins.
+
+    Hedges are capped at budget (a fraction of all calls, plus burst spare
+    hedges) so a slow backend is never hit with double the load. Until
+    min_samples latencies have been seen, initial_delay is used. The async
+    loser is cancelled; in threads the loser cannot be interrupted, so it is
+    cancelled if not yet started and otherwise left to finish, discarded.
+
+    A sync call only moves to the hedge workers when it could actually be
+    hedged: with the budget spent, or without two idle workers for the
+    primary and its duplicate, it runs on the caller's thread instead of
+    queueing behind the pool.
+    """
+
+    def __init__(self, delay_percentile: float = 95, initial_delay: float = 2.0,
+                 min_delay: float = 0.05, max_delay: float = 30.0, budget: float = 0.05,
+                 burst: int = 5, window: int = 500, min_samples: int = 20, max_workers: int = 32):
+        self.delay_percentile = delay_percentile
+        self.initial_delay = initial_delay
+        self.min_delay = min_delay
+        self.max_delay = max_delay
+        self.budget = budget
+        self.burst = burst
+        self.min_samples = min_samples
+        self.metrics = HedgeMetrics()
+        self.max_workers = max_workers
+        self._latencies = deque(maxlen=window)
+        self._lock = threading.Lock()
+        self._busy_workers = 0
+        from concurrent.futures import ThreadPoolExecutor
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="hedge")
+
+    def delay(self) -> float:
+        """
+        Seconds to wait before hedging a call
+        """
+        with self._lock:
+            if len(self._latencies) < self.min_samples:
+                return self.initial_delay
+            ordered = sorted(self._latencies)
+        index = min(len(ordered) - 1, int(len(ordered) * self.delay_percentile / 100))
+        return min(self.max_delay, max(self.min_delay, ordered[index]))
+
+    def call(self, fn: Callable[[], Any]) -> Any:
+        """
+        Run fn, hedging it with a duplicate if it is slow
+        """
+        from concurrent.futures import FIRST_COMPLETED, wait
+        self._count_call()
+        started = time.perf_counter()
+        delay = self.delay()
+        if not self._reserve_workers():
+            result = fn()
+            self._observe(time.perf_counter() - started)
+            return result
+
+        primary = self._submit(fn)
+        done, _ = wait([primary], timeout=delay)
+        if done or not self._spend_hedge():
+            self._release_worker()
+            result = primary.result()
+            self._observe(time.perf_counter() - started)
+            return result
+
+        backup = self._submit(fn)
+        pending = {primary, backup}
+        error = None
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                if future.exception() is None:
+                    for loser in pending:
+                        loser.cancel()
+                    self._finish_hedge(future is backup, started)
+                    return future.result()
+                error = error or future.exception()
+        raise error
+
+    async def acall(self, fn: Callable[[], Awaitable]) -> Any:
+        """
+        Async counterpart of call; fn returns an awaitable
+        """
+        import asyncio
+        self._count_call()
+        started = time.perf_counter()
+        primary = asyncio.ensure_future(fn())
+        pending = {primary}
+        # Cancelling the caller (or any error) must not leave a call running unowned
+        try:
+            done, _ = await asyncio.wait(pending, timeout=self.delay())
+            if done or not self._spend_hedge():
+                result = await primary
+                self._observe(time.perf_counter() - started)
+                return result
+
+            backup = asyncio.ensure_future(fn())
+            pending = {primary, backup}
+            error = None
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        self._finish_hedge(task is backup, started)
+                        return task.result()
+                    error = error or task.exception()
+            raise error
+        finally:
+            for task in pending:
+                if not task.done():
+                    task.cancel()
+
+    def stats(self) -> Dict:
+        return dict(self.metrics.to_dict(), delay=self.delay())
+
+    def _submit(self, fn: Callable[[], Any]):
+        # Keep context variables such as the scheduler priority in the worker thread
+        future = self._executor.submit(contextvars.copy_context().run, fn)
+        future.add_done_callback(self._release_worker)
+        return future
+
+    def _reserve_workers(self) -> bool:
+        """
+        Claim workers for the primary and a possible duplicate, if the call
+        could be hedged at all; otherwise it runs on the caller's thread
+        """
+        with self._lock:
+            if self.metrics.hedged >= self.budget * self.metrics.calls + self.burst:
+                self.metrics.inline += 1
+                return False
+            if self._busy_workers + 2 > self.max_workers:
+                self.metrics.inline += 1
+                return False
+            self._busy_workers += 2
+            return True
+
+    def _release_worker(self, future=None):
+        with self._lock:
+            self._busy_workers -= 1
+
+    def _count_call(self):
+        with self._lock:
+            self.metrics.calls += 1
+
+    def _spend_hedge(self) -> bool:
+        with self._lock:
+            if self.metrics.hedged >= self.budget * self.metrics.calls + self.burst:
+                self.metrics.budget_denied += 1
+                return False
+            self.metrics.hedged += 1
+            return True
+
+    def _finish_hedge(self, backup_won: bool, started: float):
+        with self._lock:
+            if backup_won:
+                self.metrics.hedge_wins += 1
+        self._observe(time.perf_counter() - started)
+
+    def _observe(self, latency: float):
+        with self._lock:
+            self._latencies.append(latency)
@@ -0,0 +1,108 @@
+import json
+from typing import Any, List, Tuple
+
+CLOSERS = {"{": "}", "[": "]"}
+
+
+def _next_significant(text: str, i: int) -> str:
+    while i < len(text) and text[i] in " \t\r\n":
+        i += 1
+    return text[i] if i < len(text) else ""
+
+
+def repair_json(text: str) -> str:
+    """
+    Best-effort fix of the ways model output breaks JSON: surrounding code
+    fences or prose, trailing commas, unescaped quotes and raw newlines
+    inside strings, and output truncated mid-value. A truncated response is
+    cut back to the last complete element, so a half-written exercise is
+    dropped rather than guessed at, and the open containers are closed.
+
+    A quote inside a string counts as closing it only when the next
+    significant character is structural (, : } ] or the end of the text);
+    any other quote is escaped.
+    """
+    starts = [i for i in (text.find("{"), text.find("[")) if i != -1]
+    if not starts:
+        return text
+    i = min(starts)
+
+    out: List[str] = []
+    stack: List[str] = []
+    in_string = False
+    escaped = False
+    # (output length, open containers) after each complete element
+    safe_point: Tuple[int, List[str]] = (0, [])
+
+    while i < len(text):
+        ch = text[i]
+        if in_string:
+            if escaped:
+                escaped = False
+                out.append(ch)
+            elif ch == "\\":
+                escaped = True
+                out.append(ch)
+            elif ch == '"':
+                if _next_significant(text, i + 1) in (",", ":", "}", "]", ""):
+                    in_string = False
+                    out.append(ch)
+                else:
+                    out.append('\\"')
+            elif ch == "\n":
+                out.append("\\n")
+            elif ch in "\r\t":
+                out.append("\\r" if ch == "\r" else "\\t")
+            else:
+                out.append(ch)
+        elif ch == '"':
+            in_string = True
+            out.append(ch)
+        elif ch in "{[":
+            stack.append(ch)
+            out.append(ch)
+            if ch == "[":
+                safe_point = (len(out), list(stack))
+        elif ch in "}]":
+            if not stack:
+                break
+            # Drop a trailing comma before the closer
+            while out and out[-1] in (" ", "\t", "\r", "\n"):
+                out.pop()
+            if out and out[-1] == ",":
+                out.pop()
+            # Close what is actually open, even if the model mismatched it
+            out.append(CLOSERS[stack.pop()])
+            if not stack:
+                return "".join(out)
+            safe_point = (len(out), list(stack))
+        else:
+            out.append(ch)
+        i += 1
+
+    # Truncated: cut back to the last complete element and close what is open
+    length, open_containers = safe_point
+    repaired = "".join(out[:length]).rstrip().rstrip(",")
+    return repaired + "".join(CLOSERS[c] for c in reversed(open_containers))
+
+
+def strip_wrapping(text: str) -> str:
+    """
+    The text from the first opening to the last closing bracket, dropping
+    code fences and prose around well-formed JSON
+    """
+    starts = [i for i in (text.find("{"), text.find("[")) if i != -1]
+    end = max(text.rfind("}"), text.rfind("]")) + 1
+    return text[min(starts):end] if starts and end else text
+
+
+def loads_tolerant(text: str) -> Tuple[Any, bool]:
+    """
+    json.loads that falls back to repair_json; returns the value and whether
+    a repair was needed (unwrapping a code fence does not count). Raises
+    json.JSONDecodeError when even the repaired text does not parse.
+    """
+    try:
+        return json.loads(strip_wrapping(text)), False
+    except json.JSONDecodeError:
+        return json.loads(repair_json(text)), True
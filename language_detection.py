@@ -0,0 +1,250 @@
+import math
+import re
+import unicodedata
+from typing import Dict, List, Optional, Tuple
+from dataclasses import dataclass
+from collections import Counter
+
+# Unicode blocks for the Indic scripts we support
+SCRIPT_RANGES = [
+    ("Devanagari", 0x0900, 0x097F),
+    ("Bengali", 0x0980, 0x09FF),
+    ("Gurmukhi", 0x0A00, 0x0A7F),
+    ("Gujarati", 0x0A80, 0x0AFF),
+    ("Odia", 0x0B00, 0x0B7F),
+    ("Tamil", 0x0B80, 0x0BFF),
+    ("Telugu", 0x0C00, 0x0C7F),
+    ("Kannada", 0x0C80, 0x0CFF),
+    ("Malayalam", 0x0D00, 0x0D7F),
+]
+
+# Scripts that map to exactly one supported language
+SCRIPT_LANGUAGES = {
+    "Gurmukhi": "Punjabi",
+    "Gujarati": "Gujarati",
+    "Odia": "Odia",
+    "Tamil": "Tamil",
+    "Telugu": "Telugu",
+    "Kannada": "Kannada",
+    "Malayalam": "Malayalam",
+}
+
+# Devanagari is shared by Hindi and Marathi
+HINDI_MARKERS = {"है", "हैं", "क्या", "क्यों", "नहीं", "और", "में", "की", "का", "के", "होती", "होता", "कैसे", "मुझे"}
+MARATHI_MARKERS = {"आहे", "आहेत", "नाही", "आणि", "काय", "कसा", "कसे", "कशी", "मला", "आम्ही", "तुम्ही", "होतो", "पाऊस"}
+MARATHI_LETTERS = {"ळ"}
+
+# Bengali script is shared by Bengali and Assamese
+ASSAMESE_LETTERS = {"ৰ", "ৱ"}
+
+# Seed corpora for the romanized Hindi vs English character n-gram model
+ROMANIZED_HINDI_CORPUS = [
+    "ye barish kyu hoti hai",
+    "barish kyun hoti hai",
+    "mujhe samajh nahi aaya",
+    "ye kaise kaam karta hai",
+    "suraj garam kyu hota hai",
+    "paani neeche kyun behta hai",
+    "aasman neela kyon dikhta hai",
+    "pedh paudhe khana kaise banate hain",
+    "chand raat ko kyu chamakta hai",
+    "bijli kahan se aati hai",
+    "hawa kaise chalti hai",
+    "kya aap mujhe samjha sakte ho",
+    "iska matlab kya hai",
+    "hum saans kyu lete hain",
+    "dharti gol kyu hai",
+    "bhukamp kyun aata hai",
+    "khet mein fasal kaise ugti hai",
+    "mera sawal ye hai ki",
+    "ghar mein roshni kaise aati hai",
+    "nadi ka paani kahan jata hai",
+    "ek aur ek kitne hote hain",
+    "ganit ke sawal kaise hal karein",
+    "yeh cheez kis se bani hai",
+    "baadal kaise bante hain",
+    "thand mein saans se dhuaan kyu nikalta hai",
+    "bataiye ki ye kyun hota hai",
+    "main school jata hoon",
+    "hamare gaon mein kuan hai",
+]
+
+ENGLISH_CORPUS = [
+    "why does it rain",
+    "why is the sky blue",
+    "how do plants make their food",
+    "what is photosynthesis",
+    "how does electricity work",
+    "why does the moon shine at night",
+    "where does the river water go",
+    "what is the meaning of this",
+    "why do we breathe",
+    "why is the earth round",
+    "what causes an earthquake",
+    "how do crops grow in the field",
+    "can you explain this to me",
+    "how do clouds form",
+    "what are fractions and how do we add them",
+    "why does water flow downhill",
+    "how does the heart pump blood",
+    "what is the difference between weather and climate",
+    "why do objects fall to the ground",
+    "how does a seed become a tree",
+    "what happens when water boils",
+    "why do we have day and night",
+    "explain the water cycle",
+    "how many legs does an insect have",
+    "why does iron rust",
+    "what is gravity",
+    "tell me about the solar system",
+    "i do not understand this question",
+]
+
+# Very frequent romanized Hindi function words, used as a lexical prior
+ROMANIZED_HINDI_WORDS = {
+    "hai", "hain", "kya", "kyu", "kyun", "kyon", "kaise", "kaisa", "nahi", "nahin",
+    "mein", "ye", "yeh", "wo", "woh", "hota", "hoti", "hote", "kaun", "kab", "kahan",
+    "aur", "ko", "bhi", "tha", "thi", "mujhe", "hum", "aap", "kitne", "kitna", "ki", "ke",
+}
+
+
+@dataclass
+class LanguageDetection:
+    language: str
+    confidence: float
+    script: str
+    romanized: bool = False
+
+
+class CharNgramModel:
+    """
+    Smoothed character n-gram language model over padded lowercase words
+    """
+
+    def __init__(self, corpus: List[str], n: int = 3, k: float = 0.5):
+        self.n = n
+        self.k = k
+        self.counts = Counter()
+        self.context_counts = Counter()
+        alphabet = set()
+        for sentence in corpus:
+            for gram in self._ngrams(sentence):
+                self.counts[gram] += 1
+                self.context_counts[gram[:-1]] += 1
+                alphabet.add(gram[-1])
+        self.vocab_size = len(alphabet) + 1
+
+    def _ngrams(self, text: str):
+        for word in re.findall(r"[a-z]+", text.lower()):
+            padded = " " * (self.n - 1) + word + " "
+            for i in range(len(padded) - self.n + 1):
+                yield padded[i:i + self.n]
+
+    def log_likelihood(self, text: str) -> Tuple[float, int]:
+        """
+        Return the total log probability of text and the number of n-grams scored
+        """
+        total = 0.0
+        count = 0
+        for gram in self._ngrams(text):
+            numerator = self.counts[gram] + self.k
+            denominator = self.context_counts[gram[:-1]] + self.k * self.vocab_size
+            total += math.log(numerator / denominator)
+            count += 1
+        return total, count
+
+
+class LanguageDetector:
+    """
+    Offline language detector based on Unicode script ranges and a
+    character n-gram model for romanized Hindi
+    """
+
+    def __init__(self, supported_languages: Optional[List[str]] = None, confidence_threshold: float = 0.8):
+        self.supported_languages = supported_languages
+        self.confidence_threshold = confidence_threshold
+        self.hindi_model = CharNgramModel(ROMANIZED_HINDI_CORPUS)
+        self.english_model = CharNgramModel(ENGLISH_CORPUS)
+
+    def detect(self, text: str) -> LanguageDetection:
+        """
+        Detect the language of text without any network calls
+        """
+        script_counts = self._count_scripts(text)
+        letters = sum(script_counts.values())
+        if letters == 0:
+            return LanguageDetection("English", 0.0, "Unknown")
+
+        script, script_letters = max(script_counts.items(), key=lambda item: item[1])
+        purity = script_letters / letters
+
+        if script == "Latin":
+            language, confidence = self._detect_latin(text)
+            detection = LanguageDetection(language, confidence * purity, script, romanized=language != "English")
+        elif script == "Devanagari":
+            language, confidence = self._detect_devanagari(text)
+            detection = LanguageDetection(language, confidence * purity, script)
+        elif script == "Bengali":
+            language = "Assamese" if any(ch in ASSAMESE_LETTERS for ch in text) else "Bengali"
+            detection = LanguageDetection(language, 0.9 * purity, script)
+        elif script in SCRIPT_LANGUAGES:
+            detection = LanguageDetection(SCRIPT_LANGUAGES[script], purity, script)
+        else:
+            detection = LanguageDetection("English", 0.0, script)
+
+        if self.supported_languages and detection.language not in self.supported_languages:
+            detection.confidence = 0.0
+        return detection
+
+    def is_confident(self, detection: LanguageDetection) -> bool:
+        """
+        Whether a detection is reliable enough to skip the LLM fallback
+        """
+        return detection.confidence >= self.confidence_threshold
+
+    def _count_scripts(self, text: str) -> Dict[str, int]:
+        counts = Counter()
+        for ch in text:
+            if not unicodedata.category(ch).startswith(("L", "M")):
+                continue
+            code = ord(ch)
+            if code < 0x0250:
+                counts["Latin"] += 1
+                continue
+            for script, start, end in SCRIPT_RANGES:
+                if start <= code <= end:
+                    counts[script] += 1
+                    break
+            else:
+                counts["Other"] += 1
+        return counts
+
+    def _detect_devanagari(self, text: str) -> Tuple[str, float]:
+        words = set(re.findall(r"[ऀ-ॿ]+", text))
+        hindi_score = len(words & HINDI_MARKERS)
+        marathi_score = len(words & MARATHI_MARKERS) + sum(1 for ch in text if ch in MARATHI_LETTERS)
+        if marathi_score > hindi_score:
+            return "Marathi", 0.9 if hindi_score == 0 else 0.7
+        if hindi_score > 0:
+            return "Hindi", 0.95 if marathi_score == 0 else 0.7
+        # No lexical markers either way: Hindi is by far the most common, but
+        # unmarked Marathi looks the same, so stay below the threshold and let the model decide
+        return "Hindi", 0.6
+
+    def _detect_latin(self, text: str) -> Tuple[str, float]:
+        hindi_ll, count = self.hindi_model.log_likelihood(text)
+        english_ll, _ = self.english_model.log_likelihood(text)
+        if count == 0:
+            return "English", 0.0
+
+        words = re.findall(r"[a-z]+", text.lower())
+        hindi_words = sum(1 for word in words if word in ROMANIZED_HINDI_WORDS)
+
+        # Per n-gram log-likelihood ratio plus a lexical prior for function words
+        score = (hindi_ll - english_ll) / count * 4.0 + 2.0 * hindi_words / max(len(words), 1)
+        # Short inputs carry less evidence
+        score *= min(1.0, count / 12.0)
+        p_hindi = 1.0 / (1.0 + math.exp(-score))
+        if p_hindi >= 0.5:
+            return "Hindi", p_hindi
+        return "English", 1.0 - p_hindi
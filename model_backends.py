@@ -0,0 +1,142 @@
+import json
+import os
+import threading
+from typing import Callable, Dict, List, Optional, Protocol, runtime_checkable
+from dataclasses import dataclass, field, fields
+
+GEMINI = "gemini"
+FAKE = "fake"
+
+# MODEL_BACKEND picks the backend; MODEL_BACKEND_CONFIG points at a JSON BackendConfig
+BACKEND_ENV = "MODEL_BACKEND"
+BACKEND_CONFIG_ENV = "MODEL_BACKEND_CONFIG"
+
+
+@runtime_checkable
+class ModelBackend(Protocol):
+    """
+    The model surface the services call, which is genai.GenerativeModel's.
+
+    Responses have .text and .usage_metadata. With stream=True,
+    generate_content returns an iterator of response chunks and
+    generate_content_async an async iterator. count_tokens returns an object
+    with total_tokens.
+    """
+    model_name: str
+
+    def generate_content(self, contents, stream: bool = False, **kwargs): ...
+
+    async def generate_content_async(self, contents, stream: bool = False, **kwargs): ...
+
+    def count_tokens(self, contents): ...
+
+    async def count_tokens_async(self, contents): ...
+
+
+class GeminiBackend:
+    """
+    Gemini API backend.
+
+    google.generativeai is imported, and the SDK configured through
+    configure, on the first call or on warm_up(), not at construction, so
+    building services stays cheap at cold start.
+    """
+
+    def __init__(self, model_name: str, configure: Optional[Callable[[], None]] = None):
+        # The SDK's own naming: bare names are resolved under models/
+        self.model_name = model_name if "/" in model_name else f"models/{model_name}"
+        self._configure = configure
+        self._model = None
+        self._lock = threading.Lock()
+
+    def warm_up(self):
+        """
+        Import and configure the SDK and build the model now rather than on the first request
+        """
+        self._get_model()
+
+    def generate_content(self, contents, stream: bool = False, **kwargs):
+        return self._get_model().generate_content(contents, stream=stream, **kwargs)
+
+    async def generate_content_async(self, contents, stream: bool = False, **kwargs):
+        return await self._get_model().generate_content_async(contents, stream=stream, **kwargs)
+
+    def count_tokens(self, contents):
+        return self._get_model().count_tokens(contents)
+
+    async def count_tokens_async(self, contents):
+        return await self._get_model().count_tokens_async(contents)
+
+    def _get_model(self):
+        model = self._model
+        if model is None:
+            with self._lock:
+                if self._model is None:
+                    if self._configure is not None:
+                        self._configure()
+                    import google.generativeai as genai
+                    self._model = genai.GenerativeModel(self.model_name)
+                model = self._model
+        return model
+
+
+@dataclass
+class BackendConfig:
+    """
+    Which backend serves model calls. Every field but backend configures the
+    fake; latency holds latency_distribution arguments, e.g.
+    {"kind": "lognormal", "median": 0.4, "sigma": 0.6}.
+    """
+    backend: str = GEMINI
+    latency: Dict = field(default_factory=dict)
+    per_token_latency: float = 0.0
+    max_concurrency: Optional[int] = None
+    requests_per_minute: Optional[float] = None
+    error_rate: float = 0.0
+    error_codes: List[int] = field(default_factory=lambda: [500, 503])
+    canned: Dict[str, str] = field(default_factory=dict)
+    seed: int = 0
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> "BackendConfig":
+        known = {f.name for f in fields(cls)}
+        unknown = set(data) - known
+        if unknown:
+            raise ValueError(f"Unknown backend config keys: {', '.join(sorted(unknown))}")
+        return cls(**data)
+
+    @classmethod
+    def from_env(cls) -> "BackendConfig":
+        path = os.getenv(BACKEND_CONFIG_ENV)
+        data = {}
+        if path:
+            with open(path, encoding="utf-8") as f:
+                data = json.load(f)
+        if os.getenv(BACKEND_ENV):
+            data["backend"] = os.getenv(BACKEND_ENV)
+        return cls.from_dict(data)
+
+
+def create_backend(model_name: str, config: Optional[BackendConfig] = None,
+                   configure: Optional[Callable[[], None]] = None) -> ModelBackend:
+    """
+    Build the configured backend for model_name; configure sets up the
+    Gemini SDK and runs before the first Gemini call
+    """
+    config = config or BackendConfig()
+    if config.backend == GEMINI:
+        return GeminiBackend(model_name, configure)
+    if config.backend == FAKE:
+        from fake_model import FakeGenerativeModel, latency_distribution
+        return FakeGenerativeModel(
+            model_name=model_name,
+            latency=latency_distribution(seed=config.seed, **config.latency) if config.latency else 0.0,
+            per_token_latency=config.per_token_latency,
+            canned=config.canned,
+            max_concurrency=config.max_concurrency,
+            requests_per_minute=config.requests_per_minute,
+            error_rate=config.error_rate,
+            error_codes=config.error_codes,
+            seed=config.seed
+        )
+    raise ValueError(f"Unknown model backend {config.backend!r}")
@@ -0,0 +1,254 @@
+from typing import AsyncIterator, Iterator, Optional, Tuple, Union
+from dataclasses import dataclass
+
+from context_cache import CacheablePrompt, ContextCacheManager, is_cache_miss
+from hedging import Hedger
+from scheduler import Priority, Scheduler, current_priority
+from tracing import record_cache
+
+Prompt = Union[str, CacheablePrompt]
+
+
+def prompt_tokens(prompt: Prompt) -> int:
+    """
+    Rough token count of a prompt (about four characters per token)
+    """
+    if isinstance(prompt, CacheablePrompt):
+        return (len(prompt.prefix) + len(prompt.suffix)) // 4
+    return len(prompt) // 4
+
+
+@dataclass
+class CallUsage:
+    """
+    What one generate/stream call cost: model calls made (a hedged call that
+    fired a duplicate made two) and the tokens the responses reported, None
+    when they reported none. A duplicate sent the same prompt, so it counts
+    its input tokens; only the answer that was used counts output tokens.
+    """
+    calls: int = 0
+    input_tokens: Optional[int] = None
+    output_tokens: Optional[int] = None
+
+    def add_response(self, response):
+        usage = getattr(response, "usage_metadata", None)
+        prompt_count = getattr(usage, "prompt_token_count", None)
+        output_count = getattr(usage, "candidates_token_count", None)
+        if isinstance(prompt_count, int) and prompt_count:
+            self.input_tokens = prompt_count * max(1, self.calls)
+        if isinstance(output_count, int) and output_count:
+            self.output_tokens = output_count
+
+    def add_stream_end(self, chunk):
+        # The last chunk of a Gemini stream reports the totals for the whole response
+        usage = getattr(chunk, "usage_metadata", None)
+        prompt_count = getattr(usage, "prompt_token_count", None)
+        total_count = getattr(usage, "total_token_count", None)
+        if isinstance(prompt_count, int) and prompt_count:
+            self.input_tokens = prompt_count
+            if isinstance(total_count, int) and total_count > prompt_count:
+                self.output_tokens = total_count - prompt_count
+
+
+class ModelCaller:
+    """
+    Every model call a service makes goes through here, so both services
+    share one implementation of context caching, scheduling and fallback.
+
+    Prompts are plain strings or CacheablePrompts. A CacheablePrompt is sent
+    as just its suffix to a model bound to the cached prefix when a context
+    cache is configured and available, and as the full text otherwise.
+
+    With a scheduler, each call waits for admission under the model's rate
+    limits at the current priority (request_priority(), else this caller's
+    default) and rate-limited calls are retried by the scheduler. With a
+    hedger, calls made with hedge=True are duplicated when slow; each
+    duplicate goes through the scheduler like any other call.
+    """
+
+    def __init__(self, model, context_cache: Optional[ContextCacheManager] = None,
+                 scheduler: Optional[Scheduler] = None, priority: Priority = Priority.INTERACTIVE,
+                 hedger: Optional[Hedger] = None):
+        self.model = model
+        self.context_cache = context_cache
+        self.scheduler = scheduler
+        self.hedger = hedger
+        self.priority = priority
+        self.model_name = getattr(model, "model_name", "default")
+
+    def generate(self, prompt: Prompt, hedge: bool = False, usage: Optional[CallUsage] = None, **kwargs) -> str:
+        """
+        hedge marks calls worth a duplicate request when slow (needs a hedger);
+        usage, when given, is filled in with the calls and tokens this took
+        """
+        usage = usage if usage is not None else CallUsage()
+        attempts = []
+
+        def attempt():
+            attempts.append(None)
+            return self._scheduled_generate(prompt, **kwargs)
+
+        if hedge and self.hedger is not None:
+            response = self.hedger.call(attempt)
+        else:
+            response = attempt()
+        usage.calls += len(attempts)
+        usage.add_response(response)
+        return response.text
+
+    async def agenerate(self, prompt: Prompt, hedge: bool = False, usage: Optional[CallUsage] = None,
+                        **kwargs) -> str:
+        usage = usage if usage is not None else CallUsage()
+        attempts = []
+
+        def attempt():
+            attempts.append(None)
+            return self._ascheduled_generate(prompt, **kwargs)
+
+        if hedge and self.hedger is not None:
+            response = await self.hedger.acall(attempt)
+        else:
+            response = await attempt()
+        usage.calls += len(attempts)
+        usage.add_response(response)
+        return response.text
+
+    def stream(self, prompt: Prompt, usage: Optional[CallUsage] = None, **kwargs) -> Iterator[str]:
+        if self.scheduler is None:
+            first, chunks = self._open_stream(prompt, **kwargs)
+        else:
+            # Only opening the stream is scheduled and retried; nothing has been yielded yet
+            first, chunks = self.scheduler.call(self.model_name, prompt_tokens(prompt),
+                                                lambda: self._open_stream(prompt, **kwargs), self._priority())
+        if usage is not None:
+            usage.calls += 1
+        if first is None:
+            return
+        last = first
+        yield first.text
+        for chunk in chunks:
+            last = chunk
+            yield chunk.text
+        if usage is not None:
+            usage.add_stream_end(last)
+
+    async def astream(self, prompt: Prompt, usage: Optional[CallUsage] = None, **kwargs) -> AsyncIterator[str]:
+        if self.scheduler is None:
+            first, chunks = await self._aopen_stream(prompt, **kwargs)
+        else:
+            first, chunks = await self.scheduler.acall(self.model_name, prompt_tokens(prompt),
+                                                       lambda: self._aopen_stream(prompt, **kwargs), self._priority())
+        if usage is not None:
+            usage.calls += 1
+        if first is None:
+            return
+        last = first
+        yield first.text
+        async for chunk in chunks:
+            last = chunk
+            yield chunk.text
+        if usage is not None:
+            usage.add_stream_end(last)
+
+    def _scheduled_generate(self, prompt: Prompt, **kwargs):
+        if self.scheduler is None:
+            return self._generate(prompt, **kwargs)
+        return self.scheduler.call(self.model_name, prompt_tokens(prompt),
+                                   lambda: self._generate(prompt, **kwargs), self._priority())
+
+    async def _ascheduled_generate(self, prompt: Prompt, **kwargs):
+        if self.scheduler is None:
+            return await self._agenerate(prompt, **kwargs)
+        return await self.scheduler.acall(self.model_name, prompt_tokens(prompt),
+                                          lambda: self._agenerate(prompt, **kwargs), self._priority())
+
+    def _generate(self, prompt: Prompt, **kwargs):
+        model, contents = self._resolve(prompt)
+        try:
+            return model.generate_content(contents, **kwargs)
+        except Exception as e:
+            if not self._should_fall_back(model, e):
+                raise
+            self._invalidate(prompt)
+            return self.model.generate_content(str(prompt), **kwargs)
+
+    async def _agenerate(self, prompt: Prompt, **kwargs):
+        model, contents = await self._aresolve(prompt)
+        try:
+            return await model.generate_content_async(contents, **kwargs)
+        except Exception as e:
+            if not self._should_fall_back(model, e):
+                raise
+            self._invalidate(prompt)
+            return await self.model.generate_content_async(str(prompt), **kwargs)
+
+    def _open_stream(self, prompt: Prompt, **kwargs) -> Tuple[object, Iterator]:
+        """
+        Start a stream and read its first chunk
+        """
+        model, contents = self._resolve(prompt)
+        try:
+            chunks = iter(model.generate_content(contents, stream=True, **kwargs))
+            first = next(chunks, None)
+        except Exception as e:
+            if not self._should_fall_back(model, e):
+                raise
+            # Only safe to fall back before anything has been yielded
+            self._invalidate(prompt)
+            chunks = iter(self.model.generate_content(str(prompt), stream=True, **kwargs))
+            first = next(chunks, None)
+        return first, chunks
+
+    async def _aopen_stream(self, prompt: Prompt, **kwargs) -> Tuple[object, AsyncIterator]:
+        model, contents = await self._aresolve(prompt)
+        try:
+            response = await model.generate_content_async(contents, stream=True, **kwargs)
+            chunks = response.__aiter__()
+            first = await anext(chunks, None)
+        except Exception as e:
+            if not self._should_fall_back(model, e):
+                raise
+            self._invalidate(prompt)
+            response = await self.model.generate_content_async(str(prompt), stream=True, **kwargs)
+            chunks = response.__aiter__()
+            first = await anext(chunks, None)
+        return first, chunks
+
+    def _priority(self) -> Priority:
+        priority = current_priority()
+        return self.priority if priority is None else priority
+
+    def _should_fall_back(self, model, error: Exception) -> bool:
+        # Only a missing or expired cache is worth resending the full prompt for;
+        # anything else (rate limits, bad requests, outages) would fail again
+        return model is not self.model and is_cache_miss(error)
+
+    def _resolve(self, prompt: Prompt) -> Tuple[object, str]:
+        """
+        Pick the model and contents to send for a prompt
+        """
+        if isinstance(prompt, CacheablePrompt):
+            if self.context_cache is not None:
+                cached_model = self.context_cache.model_for(prompt, self.model)
+                record_cache("context", cached_model is not None)
+                if cached_model is not None:
+                    return cached_model, prompt.suffix
+            return self.model, str(prompt)
+        return self.model, prompt
+
+    async def _aresolve(self, prompt: Prompt) -> Tuple[object, str]:
+        """
+        Async counterpart of _resolve; creating the cached content does not block the loop
+        """
+        if isinstance(prompt, CacheablePrompt):
+            if self.context_cache is not None:
+                cached_model = await self.context_cache.amodel_for(prompt, self.model)
+                record_cache("context", cached_model is not None)
+                if cached_model is not None:
+                    return cached_model, prompt.suffix
+            return self.model, str(prompt)
+        return self.model, prompt
+
+    def _invalidate(self, prompt: CacheablePrompt):
+        # The cached content vanished (expired or deleted); resend the full prompt
+        self.context_cache.invalidate(prompt.prefix_key)
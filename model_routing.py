@@ -0,0 +1,183 @@
+import threading
+import time
+from typing import AsyncIterator, Dict, Iterator, Optional
+from dataclasses import dataclass, asdict
+
+from model_calls import CallUsage, ModelCaller, Prompt, prompt_tokens
+from tracing import record_model_call, span
+
+FAST = "fast"
+STRONG = "strong"
+
+# Pipeline steps
+LANGUAGE_DETECTION = "language_detection"
+QUESTION_TRANSLATION = "question_translation"
+ANALOGY_CREATION = "analogy_creation"
+RESPONSE_TRANSLATION = "response_translation"
+EXERCISE_GENERATION = "exercise_generation"
+JSON_REPAIR = "json_repair"
+
+# Trivial steps run on the fast tier; content is written by the strong tier.
+# JSON repair regenerates whole exercises, so it stays on the strong tier.
+DEFAULT_STEP_TIERS = {
+    LANGUAGE_DETECTION: FAST,
+    QUESTION_TRANSLATION: FAST,
+    ANALOGY_CREATION: STRONG,
+    RESPONSE_TRANSLATION: FAST,
+    EXERCISE_GENERATION: STRONG,
+    JSON_REPAIR: STRONG,
+}
+
+
+@dataclass
+class ModelPrice:
+    """
+    USD per million tokens
+    """
+    input_per_million: float = 0.0
+    output_per_million: float = 0.0
+
+    def cost(self, input_tokens: int, output_tokens: int) -> float:
+        return (input_tokens * self.input_per_million + output_tokens * self.output_per_million) / 1_000_000
+
+
+@dataclass
+class StepMetrics:
+    calls: int = 0
+    model_calls: int = 0  # calls sent to the model, including hedged duplicates
+    seconds: float = 0.0
+    input_tokens: int = 0
+    output_tokens: int = 0
+    cost: float = 0.0
+
+    def to_dict(self) -> Dict:
+        return dict(asdict(self), mean_ms=self.seconds / self.calls * 1000 if self.calls else 0.0)
+
+
+class ModelRouter:
+    """
+    Maps each pipeline step to a model tier and accounts latency and cost per step.
+
+    models maps tier names to models; steps whose tier has no model (and
+    steps not in step_tiers) use default_tier, so a router with a single
+    model reproduces the one-model-for-everything behaviour. Token counts
+    are the responses' usage_metadata, or the same four-characters-per-token
+    estimate the scheduler uses when a response reports none.
+    """
+
+    def __init__(self, models: Dict[str, object], step_tiers: Optional[Dict[str, str]] = None,
+                 default_tier: str = STRONG, prices: Optional[Dict[str, ModelPrice]] = None):
+        if default_tier not in models:
+            raise ValueError(f"No model configured for the default tier {default_tier!r}")
+        self.models = models
+        self.step_tiers = dict(DEFAULT_STEP_TIERS, **(step_tiers or {}))
+        self.default_tier = default_tier
+        self.prices = prices or {}
+        self._steps: Dict[str, StepMetrics] = {}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_model_names(cls, model_names: Dict[str, str], client_pool=None, **kwargs) -> "ModelRouter":
+        """
+        Build a router from tier -> model name, e.g. {"fast": "gemini-2.0-flash-lite",
+        "strong": "gemini-2.0-flash"}, with models shared through the client pool
+        """
+        from client_pool import default_client_pool
+        pool = client_pool or default_client_pool()
+        return cls({tier: pool.model(name) for tier, name in model_names.items()}, **kwargs)
+
+    def tier_for(self, step: str) -> str:
+        tier = self.step_tiers.get(step, self.default_tier)
+        return tier if tier in self.models else self.default_tier
+
+    def model_for(self, step: str):
+        return self.models[self.tier_for(step)]
+
+    def record(self, step: str, seconds: float, input_tokens: int, output_tokens: int, model_calls: int = 1):
+        price = self.prices.get(self.tier_for(step))
+        with self._lock:
+            metrics = self._steps.get(step)
+            if metrics is None:
+                metrics = self._steps[step] = StepMetrics()
+            metrics.calls += 1
+            metrics.model_calls += model_calls
+            metrics.seconds += seconds
+            metrics.input_tokens += input_tokens
+            metrics.output_tokens += output_tokens
+            if price is not None:
+                metrics.cost += price.cost(input_tokens, output_tokens)
+
+    def stats(self) -> Dict:
+        with self._lock:
+            steps = {step: dict(metrics.to_dict(), tier=self.tier_for(step)) for step, metrics in self._steps.items()}
+        return {
+            "steps": steps,
+            "total_cost": sum(step["cost"] for step in steps.values()),
+            "total_seconds": sum(step["seconds"] for step in steps.values())
+        }
+
+
+class RoutedModelCaller:
+    """
+    Sends each call to the ModelCaller of its step's tier and records it with
+    the router, inside a model-call span carrying step, tier and token counts
+    """
+
+    def __init__(self, router: ModelRouter, callers: Dict[str, ModelCaller]):
+        self.router = router
+        self.callers = callers
+
+    def generate(self, step: str, prompt: Prompt, **kwargs) -> str:
+        caller, attributes = self._route(step)
+        with span("model.generate", attributes) as model_span:
+            started = time.perf_counter()
+            usage = CallUsage()
+            text = caller.generate(prompt, usage=usage, **kwargs)
+            self._record(model_span, step, caller, time.perf_counter() - started, prompt, len(text), usage)
+        return text
+
+    async def agenerate(self, step: str, prompt: Prompt, **kwargs) -> str:
+        caller, attributes = self._route(step)
+        with span("model.generate", attributes) as model_span:
+            started = time.perf_counter()
+            usage = CallUsage()
+            text = await caller.agenerate(prompt, usage=usage, **kwargs)
+            self._record(model_span, step, caller, time.perf_counter() - started, prompt, len(text), usage)
+        return text
+
+    def stream(self, step: str, prompt: Prompt, **kwargs) -> Iterator[str]:
+        caller, attributes = self._route(step)
+        # Not activated: the generator suspends at every yield
+        with span("model.stream", attributes, activate=False) as model_span:
+            started = time.perf_counter()
+            usage = CallUsage()
+            output_chars = 0
+            for chunk in caller.stream(prompt, usage=usage, **kwargs):
+                output_chars += len(chunk)
+                yield chunk
+            self._record(model_span, step, caller, time.perf_counter() - started, prompt, output_chars, usage)
+
+    async def astream(self, step: str, prompt: Prompt, **kwargs) -> AsyncIterator[str]:
+        caller, attributes = self._route(step)
+        with span("model.stream", attributes, activate=False) as model_span:
+            started = time.perf_counter()
+            usage = CallUsage()
+            output_chars = 0
+            async for chunk in caller.astream(prompt, usage=usage, **kwargs):
+                output_chars += len(chunk)
+                yield chunk
+            self._record(model_span, step, caller, time.perf_counter() - started, prompt, output_chars, usage)
+
+    def _route(self, step: str):
+        tier = self.router.tier_for(step)
+        caller = self.callers[tier]
+        return caller, {"llm.step": step, "llm.tier": tier, "llm.model": caller.model_name}
+
+    def _record(self, model_span, step: str, caller: ModelCaller, seconds: float, prompt: Prompt,
+                output_chars: int, usage: CallUsage):
+        # Reported usage where the responses carried it, else the four-characters-per-token estimate
+        calls = max(1, usage.calls)
+        input_tokens = usage.input_tokens if usage.input_tokens is not None else prompt_tokens(prompt) * calls
+        output_tokens = usage.output_tokens if usage.output_tokens is not None else output_chars // 4
+        self.router.record(step, seconds, input_tokens, output_tokens, model_calls=calls)
+        record_model_call(model_span, step, caller.model_name, input_tokens, output_tokens)
@@ -1,38 +1,203 @@
-from flask import Flask, request, jsonify
-import google.generativeai as genai
 import json
-import os
-from typing import Dict, List, Optional
-from dataclasses import dataclass
+import time
+from typing import AsyncIterator, Dict, Iterator, List, Optional, Tuple
+from dataclasses import dataclass, asdict, field
 from datetime import datetime
+from client_pool import ClientPool, default_client_pool
+from context_cache import CacheablePrompt, ContextCacheManager, prefix_key
+from exercise_schema import compile_validator, schema_from_dataclass
+from exercise_stream_parser import IncrementalExerciseParser
+from hedging import Hedger
+from json_repair import loads_tolerant
+from model_calls import ModelCaller, Prompt
+from model_routing import EXERCISE_GENERATION, JSON_REPAIR, STRONG, ModelRouter, RoutedModelCaller
+from request_decoding import DecodeError, Decoder, request_digest
+from scheduler import Priority, Scheduler
+from tracing import traced
 
-# Configure Gemini API
-genai.configure(api_key=os.getenv('GEMINI_API_KEY'))
+# The static instructions and output schema form a prefix shared by every
+# request (cacheable model-side); the student profile goes in the suffix
+EXERCISE_PROMPT_PREFIX = """
+        You are an expert educational content creator who generates personalized practice exercises for students.
 
-@dataclass
+        PERSONALIZATION GUIDELINES:
+        1. Target the student's identified weaknesses while building on their strengths
+        2. Adapt to their learning style:
+           - Visual: Include diagrams, charts, or visual elements
+           - Auditory: Include sound-based or rhythm-based elements
+           - Kinesthetic: Include hands-on or movement-based activities
+           - Reading/Writing: Focus on text-based exercises
+        3. Use appropriate complexity for their learning level
+        4. If language preference is not English, provide translations or explanations in their preferred language
+        5. Create scaffolded exercises that gradually increase in difficulty
+
+        OUTPUT FORMAT:
+        Provide the response as a JSON object with the following structure:
+        {
+            "exercises": [
+                {
+                    "id": 1,
+                    "type": "exercise_type",
+                    "question": "exercise question/prompt",
+                    "options": ["option1", "option2", "option3", "option4"] (for multiple choice),
+                    "correct_answer": "correct answer or explanation",
+                    "explanation": "detailed explanation of the solution",
+                    "difficulty": "beginner/intermediate/advanced",
+                    "learning_objective": "what this exercise aims to teach",
+                    "personalization_notes": "how this addresses student's specific needs"
+                }
+            ]
+        }
+
+        Generate exercises that are engaging, age-appropriate, and specifically designed to help the student described below overcome their weaknesses while leveraging their learning style.
+        """
+
+EXERCISE_PROMPT_PREFIX_KEY = prefix_key("exercises", EXERCISE_PROMPT_PREFIX)
+
+@dataclass(slots=True)
 class StudentProfile:
-    student_id: str
-    name: str
-    grade: int
-    learning_level: str  # beginner, intermediate, advanced
-    learning_style: str  # visual, auditory, kinesthetic, reading_writing
-    weaknesses: List[str]  # List of subject areas/topics where student struggles
-    strengths: List[str]   # List of subject areas/topics where student excels
-    language_preference: str  # Primary language for instruction
+    student_id: str = ''
+    name: str = ''
+    grade: int = 1
+    learning_level: str = 'beginner'  # beginner, intermediate, advanced
+    learning_style: str = 'visual'  # visual, auditory, kinesthetic, reading_writing
+    weaknesses: List[str] = field(default_factory=list)  # List of subject areas/topics where student struggles
+    strengths: List[str] = field(default_factory=list)   # List of subject areas/topics where student excels
+    language_preference: str = 'English'  # Primary language for instruction
 
-@dataclass
+@dataclass(slots=True)
 class ExerciseRequest:
     student_profile: StudentProfile
-    subject: str
-    topic: str
-    difficulty_level: str
-    exercise_count: int
-    exercise_types: List[str]  # multiple_choice, short_answer, problem_solving, etc.
+    subject: str = 'Mathematics'
+    topic: str = 'Basic Operations'
+    difficulty_level: str = 'beginner'
+    exercise_count: int = 5
+    exercise_types: List[str] = field(default_factory=lambda: ['multiple_choice'])  # multiple_choice, short_answer, problem_solving, etc.
+
+@dataclass(frozen=True, slots=True)
+class FrozenStudentProfile:
+    """
+    Immutable, hashable StudentProfile; weaknesses and strengths are tuples
+    """
+    student_id: str = ''
+    name: str = ''
+    grade: int = 1
+    learning_level: str = 'beginner'
+    learning_style: str = 'visual'
+    weaknesses: Tuple[str, ...] = ()
+    strengths: Tuple[str, ...] = ()
+    language_preference: str = 'English'
+
+    @classmethod
+    def from_profile(cls, profile: StudentProfile) -> "FrozenStudentProfile":
+        return cls(profile.student_id, profile.name, profile.grade, profile.learning_level,
+                   profile.learning_style, tuple(profile.weaknesses), tuple(profile.strengths),
+                   profile.language_preference)
+
+@dataclass(frozen=True, slots=True)
+class FrozenExerciseRequest:
+    """
+    Immutable, hashable ExerciseRequest, usable as a dict or cache key.
+    cache_key is the request_digest, computed once at construction, and
+    hashing uses it. The services accept it wherever they take an ExerciseRequest.
+    """
+    student_profile: FrozenStudentProfile
+    subject: str = 'Mathematics'
+    topic: str = 'Basic Operations'
+    difficulty_level: str = 'beginner'
+    exercise_count: int = 5
+    exercise_types: Tuple[str, ...] = ('multiple_choice',)
+    cache_key: str = field(init=False, repr=False, compare=False)
+
+    def __post_init__(self):
+        object.__setattr__(self, "cache_key", request_digest(self))
+
+    def __hash__(self):
+        return hash(self.cache_key)
+
+    @classmethod
+    def from_request(cls, req: ExerciseRequest) -> "FrozenExerciseRequest":
+        return cls(FrozenStudentProfile.from_profile(req.student_profile), req.subject, req.topic,
+                   req.difficulty_level, req.exercise_count, tuple(req.exercise_types))
+
+# Payload decoders compiled once at import; defaults above fill missing fields
+exercise_request_decoder = Decoder(ExerciseRequest)
+frozen_exercise_request_decoder = Decoder(FrozenExerciseRequest)
+
+@dataclass
+class Exercise:
+    id: int
+    type: str
+    question: str
+    correct_answer: str
+    explanation: str
+    difficulty: str  # beginner, intermediate, advanced
+    learning_objective: str
+    personalization_notes: str
+    options: Optional[List[str]] = None  # multiple choice only
+
+# Response schema derived from Exercise, and its validator compiled once at import
+EXERCISE_SCHEMA = schema_from_dataclass(Exercise)
+EXERCISES_RESPONSE_SCHEMA = {
+    "type": "object",
+    "properties": {"exercises": {"type": "array", "items": EXERCISE_SCHEMA}},
+    "required": ["exercises"]
+}
+STRUCTURED_GENERATION_CONFIG = {
+    "response_mime_type": "application/json",
+    "response_schema": EXERCISES_RESPONSE_SCHEMA
+}
+validate_exercise = compile_validator(EXERCISE_SCHEMA)
+
+@dataclass
+class RepairMetrics:
+    responses: int = 0
+    needed_repair: int = 0  # malformed JSON, or exercises missing or failing validation
+    repaired: int = 0  # every exercise valid after repair
+    repaired_locally: int = 0  # fixed by the JSON fixer alone, no model call
+    regeneration_calls: int = 0
+    regenerated_items: int = 0
+    unrepaired_items: int = 0
+    best_effort_items: int = 0  # still invalid after retries, kept with defaults for non-essential fields
+    latency_saved: float = 0.0  # seconds, against regenerating the whole set each time
+
+    @property
+    def repair_rate(self) -> float:
+        return self.repaired / self.needed_repair if self.needed_repair else 0.0
+
+    def to_dict(self) -> Dict:
+        return dict(asdict(self), repair_rate=self.repair_rate)
 
 class PersonalizedExerciseService:
-    def __init__(self):
-        self.model = genai.GenerativeModel('gemini-pro')
+    def __init__(self, model=None, context_cache: Optional[ContextCacheManager] = None,
+                 structured_output: bool = False, max_item_retries: int = 1,
+                 client_pool: Optional[ClientPool] = None,
+                 scheduler: Optional[Scheduler] = None,
+                 hedger: Optional[Hedger] = None,
+                 router: Optional[ModelRouter] = None):
+        # Models come from the process-wide pool so every instance shares one transport.
+        # A router maps each pipeline step to a model tier; without one every step uses self.model
+        if router is None:
+            router = ModelRouter({STRONG: model or (client_pool or default_client_pool()).model('gemini-pro')})
+        self.router = router
+        self.model = router.models[router.default_tier]
+        # The static prompt prefix is served from model-side cached content when configured
+        # (only past the backend's minimum size; at ~450 tokens it is below the Gemini API's 4,096);
+        # worksheets are bulk work for a shared scheduler, behind interactive questions;
+        # a hedger duplicates slow full-set generations
+        self.routed_caller = RoutedModelCaller(router, {
+            tier: ModelCaller(tier_model, context_cache, scheduler, Priority.BULK, hedger)
+            for tier, tier_model in router.models.items()
+        })
+        self.model_caller = self.routed_caller.callers[router.default_tier]
+        # Structured output constrains the model to EXERCISES_RESPONSE_SCHEMA; exercises
+        # that still fail validation are regenerated individually, never the whole set
+        self.structured_output = structured_output
+        self.max_item_retries = max_item_retries
+        self._generation_kwargs = {"generation_config": STRUCTURED_GENERATION_CONFIG} if structured_output else {}
+        self.repair_metrics = RepairMetrics()
         
+    @traced("exercises.generate")
     def generate_exercises(self, exercise_request: ExerciseRequest) -> Dict:
         """
         Generate personalized practice exercises based on student profile and requirements
@@ -42,24 +207,42 @@ class PersonalizedExerciseService:
             prompt = self._create_exercise_prompt(exercise_request)
             
             # Generate exercises using Gemini
-            response = self.model.generate_content(prompt)
+            started = time.perf_counter()
+            response_text = self._generate_content(prompt, hedge=True, **self._generation_kwargs)
+            elapsed = time.perf_counter() - started
+            
+            # Parse the response, repairing malformed JSON and regenerating only broken exercises
+            exercises, repaired = self._load_exercises(response_text, exercise_request)
+            exercises = self._retry_failing_items(exercise_request, exercises, elapsed, repaired)
+            if not exercises and not self.structured_output:
+                exercises = self._create_fallback_exercises(response_text, exercise_request)
             
-            # Parse and structure the response
-            exercises = self._parse_exercises_response(response.text, exercise_request)
+            return self._build_result(exercise_request, exercises)
             
+        except Exception as e:
             return {
-                "success": True,
-                "student_id": exercise_request.student_profile.student_id,
-                "subject": exercise_request.subject,
-                "topic": exercise_request.topic,
-                "exercises": exercises,
-                "generated_at": datetime.now().isoformat(),
-                "personalization_factors": {
-                    "learning_level": exercise_request.student_profile.learning_level,
-                    "learning_style": exercise_request.student_profile.learning_style,
-                    "targeted_weaknesses": exercise_request.student_profile.weaknesses
-                }
+                "success": False,
+                "error": str(e),
+                "student_id": exercise_request.student_profile.student_id
             }
+    
+    @traced("exercises.generate")
+    async def agenerate_exercises(self, exercise_request: ExerciseRequest) -> Dict:
+        """
+        Async counterpart of generate_exercises that never blocks the event loop
+        """
+        try:
+            prompt = self._create_exercise_prompt(exercise_request)
+            started = time.perf_counter()
+            response_text = await self._agenerate_content(prompt, hedge=True, **self._generation_kwargs)
+            elapsed = time.perf_counter() - started
+            
+            exercises, repaired = self._load_exercises(response_text, exercise_request)
+            exercises = await self._aretry_failing_items(exercise_request, exercises, elapsed, repaired)
+            if not exercises and not self.structured_output:
+                exercises = self._create_fallback_exercises(response_text, exercise_request)
+            
+            return self._build_result(exercise_request, exercises)
             
         except Exception as e:
             return {
@@ -68,14 +251,173 @@ class PersonalizedExerciseService:
                 "student_id": exercise_request.student_profile.student_id
             }
     
-    def _create_exercise_prompt(self, req: ExerciseRequest) -> str:
+    def generate_exercises_stream(self, exercise_request: ExerciseRequest) -> Iterator[Dict]:
+        """
+        Streaming variant of generate_exercises yielding events:
+        
+        - {"event": "exercise", "exercise": ...} as soon as each exercise object is complete
+        - {"event": "done", "result": ...} with the same dict generate_exercises returns
+        - {"event": "error", ...} if generation fails
+        
+        Exercises that fail validation are held back and their regenerated
+        replacements are yielded after the stream ends. Streamed exercises
+        carry the ids of the final result, and none beyond exercise_count is sent.
+        """
+        try:
+            prompt = self._create_exercise_prompt(exercise_request)
+            parser = IncrementalExerciseParser()
+            parts = []
+            started = time.perf_counter()
+            for chunk in self._stream_content(prompt, **self._generation_kwargs):
+                parts.append(chunk)
+                first_index = len(parser.exercises)
+                for offset, exercise in enumerate(parser.feed(chunk)):
+                    streamed = self._streamable(exercise, first_index + offset, exercise_request)
+                    if streamed is not None:
+                        yield {"event": "exercise", "exercise": streamed}
+            elapsed = time.perf_counter() - started
+            
+            exercises, repaired = self._load_streamed(parser, "".join(parts), exercise_request)
+            failing = set(self._failing_indices(exercises))
+            exercises = self._retry_failing_items(exercise_request, exercises, elapsed, repaired)
+            if not exercises and not self.structured_output:
+                # Nothing usable even after repair; fall back to the plain-text parser
+                exercises = self._create_fallback_exercises("".join(parts), exercise_request)
+            for exercise in exercises:
+                if exercise["id"] - 1 in failing:
+                    yield {"event": "exercise", "exercise": exercise}
+            
+            yield {"event": "done", "result": self._build_result(exercise_request, exercises)}
+            
+        except Exception as e:
+            yield {
+                "event": "error",
+                "success": False,
+                "error": str(e),
+                "student_id": exercise_request.student_profile.student_id
+            }
+    
+    async def agenerate_exercises_stream(self, exercise_request: ExerciseRequest) -> AsyncIterator[Dict]:
+        """
+        Async generator counterpart of generate_exercises_stream
+        """
+        try:
+            prompt = self._create_exercise_prompt(exercise_request)
+            parser = IncrementalExerciseParser()
+            parts = []
+            started = time.perf_counter()
+            async for chunk in self._astream_content(prompt, **self._generation_kwargs):
+                parts.append(chunk)
+                first_index = len(parser.exercises)
+                for offset, exercise in enumerate(parser.feed(chunk)):
+                    streamed = self._streamable(exercise, first_index + offset, exercise_request)
+                    if streamed is not None:
+                        yield {"event": "exercise", "exercise": streamed}
+            elapsed = time.perf_counter() - started
+            
+            exercises, repaired = self._load_streamed(parser, "".join(parts), exercise_request)
+            failing = set(self._failing_indices(exercises))
+            exercises = await self._aretry_failing_items(exercise_request, exercises, elapsed, repaired)
+            if not exercises and not self.structured_output:
+                exercises = self._create_fallback_exercises("".join(parts), exercise_request)
+            for exercise in exercises:
+                if exercise["id"] - 1 in failing:
+                    yield {"event": "exercise", "exercise": exercise}
+            
+            yield {"event": "done", "result": self._build_result(exercise_request, exercises)}
+            
+        except Exception as e:
+            yield {
+                "event": "error",
+                "success": False,
+                "error": str(e),
+                "student_id": exercise_request.student_profile.student_id
+            }
+    
+    def warm_up(self):
+        """
+        Load and configure the model SDK for every tier before the first
+        request instead of during it
+        """
+        for model in self.router.models.values():
+            warm_up = getattr(model, "warm_up", None)
+            if warm_up is not None:
+                warm_up()
+    
+    def repair_stats(self) -> Dict:
+        return self.repair_metrics.to_dict()
+    
+    def _build_result(self, exercise_request: ExerciseRequest, exercises: List[Dict]) -> Dict:
+        """
+        Assemble the response dict returned to the caller
+        """
+        return {
+            "success": True,
+            "student_id": exercise_request.student_profile.student_id,
+            "subject": exercise_request.subject,
+            "topic": exercise_request.topic,
+            "exercises": exercises,
+            "generated_at": datetime.now().isoformat(),
+            "personalization_factors": {
+                "learning_level": exercise_request.student_profile.learning_level,
+                "learning_style": exercise_request.student_profile.learning_style,
+                "targeted_weaknesses": list(exercise_request.student_profile.weaknesses)
+            }
+        }
+    
+    def _generate_content(self, prompt: Prompt, step: str = EXERCISE_GENERATION, **kwargs) -> str:
+        """
+        Single entry point for blocking model calls
+        """
+        return self.routed_caller.generate(step, prompt, **kwargs)
+    
+    async def _agenerate_content(self, prompt: Prompt, step: str = EXERCISE_GENERATION, **kwargs) -> str:
+        """
+        Single entry point for async model calls
+        """
+        return await self.routed_caller.agenerate(step, prompt, **kwargs)
+    
+    def _stream_content(self, prompt: Prompt, step: str = EXERCISE_GENERATION, **kwargs) -> Iterator[str]:
+        """
+        Single entry point for streamed blocking model calls
+        """
+        return self.routed_caller.stream(step, prompt, **kwargs)
+    
+    def _astream_content(self, prompt: Prompt, step: str = EXERCISE_GENERATION, **kwargs) -> AsyncIterator[str]:
+        """
+        Single entry point for streamed async model calls
+        """
+        return self.routed_caller.astream(step, prompt, **kwargs)
+    
+    @traced("exercises.build_prompt")
+    def _create_exercise_prompt(self, req: ExerciseRequest) -> CacheablePrompt:
         """
         Create a detailed prompt for Gemini to generate personalized exercises
         """
+        suffix = self._render_exercise_suffix(req, req.exercise_count)
+        return CacheablePrompt(EXERCISE_PROMPT_PREFIX_KEY, EXERCISE_PROMPT_PREFIX, suffix)
+    
+    def _create_regeneration_prompt(self, req: ExerciseRequest, exercises: List[Optional[Dict]],
+                                    indices: List[int]) -> CacheablePrompt:
+        """
+        Prompt for regenerating only the exercises at the given indices; it shares
+        the cacheable prefix with the full prompt
+        """
+        existing = [exercise.get("question", "") for exercise in exercises
+                    if isinstance(exercise, dict) and not validate_exercise(exercise)]
+        ids = ', '.join(str(index + 1) for index in indices)
+        # Appended to the suffix when only some exercises of a set need regenerating
+        suffix = self._render_exercise_suffix(req, len(indices)) + f"""
+        These exercises replace ids {ids} of an existing set; use exactly those ids, in that order.
+        Do not repeat any of these existing questions: {json.dumps(existing, ensure_ascii=False)}
+        """
+        return CacheablePrompt(EXERCISE_PROMPT_PREFIX_KEY, EXERCISE_PROMPT_PREFIX, suffix)
+    
+    def _render_exercise_suffix(self, req: ExerciseRequest, exercise_count: int) -> str:
         student = req.student_profile
         
-        prompt = f"""
-        You are an expert educational content creator. Generate {req.exercise_count} personalized practice exercises for a student with the following profile:
+        return f"""
+        Generate {exercise_count} personalized practice exercises for a student with the following profile:
 
         STUDENT PROFILE:
         - Name: {student.name}
@@ -91,61 +433,174 @@ class PersonalizedExerciseService:
         - Topic: {req.topic}
         - Difficulty Level: {req.difficulty_level}
         - Exercise Types: {', '.join(req.exercise_types)}
-
-        PERSONALIZATION GUIDELINES:
-        1. Target the student's identified weaknesses while building on their strengths
-        2. Adapt to their learning style:
-           - Visual: Include diagrams, charts, or visual elements
-           - Auditory: Include sound-based or rhythm-based elements
-           - Kinesthetic: Include hands-on or movement-based activities
-           - Reading/Writing: Focus on text-based exercises
-        3. Use appropriate complexity for their learning level
-        4. If language preference is not English, provide translations or explanations in their preferred language
-        5. Create scaffolded exercises that gradually increase in difficulty
-
-        OUTPUT FORMAT:
-        Provide the response as a JSON object with the following structure:
-        {{
-            "exercises": [
-                {{
-                    "id": 1,
-                    "type": "exercise_type",
-                    "question": "exercise question/prompt",
-                    "options": ["option1", "option2", "option3", "option4"] (for multiple choice),
-                    "correct_answer": "correct answer or explanation",
-                    "explanation": "detailed explanation of the solution",
-                    "difficulty": "beginner/intermediate/advanced",
-                    "learning_objective": "what this exercise aims to teach",
-                    "personalization_notes": "how this addresses student's specific needs"
-                }}
-            ]
-        }}
-
-        Generate exercises that are engaging, age-appropriate, and specifically designed to help this student overcome their weaknesses while leveraging their learning style.
         """
-        
-        return prompt
     
-    def _parse_exercises_response(self, response_text: str, req: ExerciseRequest) -> List[Dict]:
+    @traced("exercises.parse")
+    def _load_exercises(self, response_text: str, req: ExerciseRequest) -> Tuple[List[Optional[Dict]], bool]:
+        """
+        Load the response into exactly req.exercise_count slots, None marking
+        any exercise that is missing; also reports whether the JSON needed repair
+        """
+        exercises, repaired = self._extract_exercises(response_text)
+        return self._pad_exercises(exercises, req), repaired
+    
+    def _load_streamed(self, parser: IncrementalExerciseParser, response_text: str,
+                       req: ExerciseRequest) -> Tuple[List[Optional[Dict]], bool]:
+        """
+        Slots for a streamed response: the objects the incremental parser
+        completed, or a repaired parse of the full text when it found none
+        """
+        if parser.exercises:
+            return self._pad_exercises(parser.exercises, req), parser.errors > 0 or not parser.done
+        return self._load_exercises(response_text, req)
+    
+    def _extract_exercises(self, response_text: str) -> Tuple[List, bool]:
         """
-        Parse the Gemini response and extract structured exercise data
+        The "exercises" list of a JSON response ([] when there is none) and
+        whether the JSON had to be repaired locally first
         """
         try:
-            # Try to extract JSON from the response
-            start_idx = response_text.find('{')
-            end_idx = response_text.rfind('}') + 1
-            
-            if start_idx != -1 and end_idx != 0:
-                json_str = response_text[start_idx:end_idx]
-                parsed_data = json.loads(json_str)
-                return parsed_data.get('exercises', [])
-            else:
-                # Fallback: create structured exercises from plain text
-                return self._create_fallback_exercises(response_text, req)
-                
+            parsed, repaired = loads_tolerant(response_text)
         except json.JSONDecodeError:
-            # Fallback parsing if JSON parsing fails
-            return self._create_fallback_exercises(response_text, req)
+            return [], True
+        
+        exercises = parsed.get('exercises', []) if isinstance(parsed, dict) else []
+        return (exercises, repaired) if isinstance(exercises, list) else ([], True)
+    
+    def _pad_exercises(self, exercises: List, req: ExerciseRequest) -> List[Optional[Dict]]:
+        exercises = list(exercises[:req.exercise_count])
+        return exercises + [None] * (req.exercise_count - len(exercises))
+    
+    def _streamable(self, exercise, index: int, req: ExerciseRequest) -> Optional[Dict]:
+        """
+        The streamed copy of the exercise in slot index, numbered as in the final
+        result; None when it is past exercise_count or held back for repair
+        """
+        if index >= req.exercise_count or not isinstance(exercise, dict) or validate_exercise(exercise):
+            return None
+        return dict(exercise, id=index + 1)
+    
+    def _failing_indices(self, exercises: List[Optional[Dict]]) -> List[int]:
+        return [index for index, exercise in enumerate(exercises)
+                if exercise is None or validate_exercise(exercise)]
+    
+    @traced("exercises.repair")
+    def _retry_failing_items(self, req: ExerciseRequest, exercises: List[Optional[Dict]],
+                             full_call_seconds: float, repaired: bool) -> List[Dict]:
+        """
+        Regenerate only the exercises that are missing or fail validation
+        (malformed JSON has already been repaired locally as far as possible),
+        up to max_item_retries times, and return the valid exercises.
+        
+        full_call_seconds is how long the call for the whole set took; the
+        difference to each targeted call is recorded as latency saved.
+        """
+        failing = self._failing_indices(exercises)
+        needed_repair = self._record_response(repaired, failing, full_call_seconds)
+        for _ in range(self.max_item_retries):
+            if not failing:
+                break
+            prompt = self._create_regeneration_prompt(req, exercises, failing)
+            started = time.perf_counter()
+            response_text = self._generate_content(prompt, step=JSON_REPAIR, **self._generation_kwargs)
+            self._record_regeneration(failing, full_call_seconds, time.perf_counter() - started)
+            self._merge_regenerated(exercises, failing, response_text)
+            failing = self._failing_indices(exercises)
+        return self._finish_repair(req, exercises, needed_repair, failing)
+    
+    @traced("exercises.repair")
+    async def _aretry_failing_items(self, req: ExerciseRequest, exercises: List[Optional[Dict]],
+                                    full_call_seconds: float, repaired: bool) -> List[Dict]:
+        """
+        Async counterpart of _retry_failing_items
+        """
+        failing = self._failing_indices(exercises)
+        needed_repair = self._record_response(repaired, failing, full_call_seconds)
+        for _ in range(self.max_item_retries):
+            if not failing:
+                break
+            prompt = self._create_regeneration_prompt(req, exercises, failing)
+            started = time.perf_counter()
+            response_text = await self._agenerate_content(prompt, step=JSON_REPAIR, **self._generation_kwargs)
+            self._record_regeneration(failing, full_call_seconds, time.perf_counter() - started)
+            self._merge_regenerated(exercises, failing, response_text)
+            failing = self._failing_indices(exercises)
+        return self._finish_repair(req, exercises, needed_repair, failing)
+    
+    def _record_response(self, repaired: bool, failing: List[int], full_call_seconds: float) -> bool:
+        """
+        Count a parsed response; returns whether it needed any repair
+        """
+        metrics = self.repair_metrics
+        metrics.responses += 1
+        if not repaired and not failing:
+            return False
+        metrics.needed_repair += 1
+        if not failing:
+            # The local fixer alone avoided regenerating the whole set
+            metrics.repaired_locally += 1
+            metrics.latency_saved += full_call_seconds
+        return True
+    
+    def _record_regeneration(self, indices: List[int], full_call_seconds: float, seconds: float):
+        metrics = self.repair_metrics
+        metrics.regeneration_calls += 1
+        metrics.regenerated_items += len(indices)
+        metrics.latency_saved += max(0.0, full_call_seconds - seconds)
+    
+    def _finish_repair(self, req: ExerciseRequest, exercises: List[Optional[Dict]], needed_repair: bool,
+                       failing: List[int]) -> List[Dict]:
+        if failing and not self.structured_output:
+            # Keep exercises that only lack non-essential fields instead of shrinking the set
+            for index in failing:
+                best_effort = self._best_effort_exercise(exercises[index], req, index)
+                if best_effort is not None:
+                    exercises[index] = best_effort
+                    self.repair_metrics.best_effort_items += 1
+            failing = self._failing_indices(exercises)
+        if needed_repair:
+            if failing:
+                self.repair_metrics.unrepaired_items += len(failing)
+            else:
+                self.repair_metrics.repaired += 1
+        return self._valid_exercises(exercises)
+    
+    def _best_effort_exercise(self, exercise, req: ExerciseRequest, index: int) -> Optional[Dict]:
+        """
+        The exercise with defaults filled in for missing or null non-essential
+        fields; None when it has no question and answer, or is still invalid
+        """
+        if not isinstance(exercise, dict) or not exercise.get("question") or not exercise.get("correct_answer"):
+            return None
+        filled = self._default_exercise(req, index)
+        filled.update((key, value) for key, value in exercise.items() if value is not None)
+        filled["id"] = index + 1
+        return None if validate_exercise(filled) else filled
+    
+    def _default_exercise(self, req: ExerciseRequest, index: int) -> Dict:
+        return {
+            "id": index + 1,
+            "type": req.exercise_types[0] if req.exercise_types else "short_answer",
+            "question": "",
+            "correct_answer": "Answer will be provided by teacher",
+            "explanation": "Detailed explanation will be provided",
+            "difficulty": req.difficulty_level,
+            "learning_objective": f"Practice {req.topic} concepts",
+            "personalization_notes": f"Adapted for {req.student_profile.learning_style} learning style"
+        }
+    
+    def _merge_regenerated(self, exercises: List[Optional[Dict]], indices: List[int], response_text: str):
+        """
+        Put regenerated exercises back into their slots, in the order requested
+        """
+        replacements, _ = self._extract_exercises(response_text)
+        replacements = [exercise for exercise in replacements if isinstance(exercise, dict)]
+        for index, replacement in zip(indices, replacements):
+            exercises[index] = dict(replacement, id=index + 1)
+    
+    def _valid_exercises(self, exercises: List[Optional[Dict]]) -> List[Dict]:
+        return [dict(exercise, id=index + 1) for index, exercise in enumerate(exercises)
+                if exercise is not None and not validate_exercise(exercise)]
     
     def _create_fallback_exercises(self, text: str, req: ExerciseRequest) -> List[Dict]:
         """
@@ -162,22 +617,14 @@ class PersonalizedExerciseService:
             line = line.strip()
             if line and exercise_count < req.exercise_count:
                 if not current_exercise:
-                    current_exercise = {
-                        "id": exercise_count + 1,
-                        "type": req.exercise_types[0] if req.exercise_types else "short_answer",
-                        "question": line,
-                        "correct_answer": "Answer will be provided by teacher",
-                        "explanation": "Detailed explanation will be provided",
-                        "difficulty": req.difficulty_level,
-                        "learning_objective": f"Practice {req.topic} concepts",
-                        "personalization_notes": f"Adapted for {req.student_profile.learning_style} learning style"
-                    }
+                    current_exercise = dict(self._default_exercise(req, exercise_count), question=line)
                     exercises.append(current_exercise)
                     current_exercise = {}
                     exercise_count += 1
         
         return exercises
 
+
 # # Flask API endpoints
 # app = Flask(__name__)
 
@@ -204,41 +651,21 @@ def generate_personalized_exercises(data):
         "exercise_count": int,
         "exercise_types": ["multiple_choice", "short_answer", "problem_solving"]
     }
+
+    Accepts the parsed payload or the raw JSON bytes. Returns an
+    ExerciseRequest, or an error dict naming every invalid field.
     """
     try:
         # data = request.get_json()
-        
-        # Validate required fields
-        if not data or 'student_profile' not in data:
-            return jsonify({"success": False, "error": "Student profile is required"}), 400
-        
-        # Create student profile
-        profile_data = data['student_profile']
-        student_profile = StudentProfile(
-            student_id=profile_data.get('student_id', ''),
-            name=profile_data.get('name', ''),
-            grade=profile_data.get('grade', 1),
-            learning_level=profile_data.get('learning_level', 'beginner'),
-            learning_style=profile_data.get('learning_style', 'visual'),
-            weaknesses=profile_data.get('weaknesses', []),
-            strengths=profile_data.get('strengths', []),
-            language_preference=profile_data.get('language_preference', 'English')
-        )
-        
-        # Create exercise request
-        exercise_request = ExerciseRequest(
-            student_profile=student_profile,
-            subject=data.get('subject', 'Mathematics'),
-            topic=data.get('topic', 'Basic Operations'),
-            difficulty_level=data.get('difficulty_level', 'beginner'),
-            exercise_count=data.get('exercise_count', 5),
-            exercise_types=data.get('exercise_types', ['multiple_choice'])
-        )
-            
-        return exercise_request
-        
-    except Exception as e:
-        return jsonify({"success": False, "error": str(e)}), 500
+        if isinstance(data, (bytes, bytearray, memoryview, str)):
+            return exercise_request_decoder.decode(data)
+        return exercise_request_decoder.convert(data)
+    except DecodeError as e:
+        return {
+            "success": False,
+            "error": str(e),
+            "errors": e.errors
+        }
 
 # @app.route('/health', methods=['GET'])
 # def health_check():
@@ -246,12 +673,12 @@ def generate_personalized_exercises(data):
 #     return jsonify({"status": "healthy", "service": "personalized_exercises"})
 def generate_synthetic_data():
     student_profile = StudentProfile(
-        student_id=1234,
+        student_id='1234',
         name='GURU',
         grade=5,
         learning_level='beginner',
         learning_style='visual',
-        weaknesses='focus',
+        weaknesses=['focus'],
         strengths=['visualization','creativity'],
         language_preference='Hindi'
     )
@@ -269,11 +696,31 @@ def generate_synthetic_data():
     return exercise_request
 
 
-exercise_service = PersonalizedExerciseService()
+_exercise_service: Optional[PersonalizedExerciseService] = None
+
+
+def get_exercise_service() -> PersonalizedExerciseService:
+    """
+    The module's shared service, built on first use rather than at import
+    """
+    global _exercise_service
+    if _exercise_service is None:
+        _exercise_service = PersonalizedExerciseService()
+    return _exercise_service
+
+
+def __getattr__(name):
+    # exercise_service used to be built at import time; keep the name working
+    if name == "exercise_service":
+        return get_exercise_service()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
 if __name__ == '__main__':
     # Set your Gemini API key as an environment variable
     # export GEMINI_API_KEY="your_api_key_here"
     # app.run(host='0.0.0.0', port=5001, debug=True)
-    data = generate_synthetic_data()
-    exercise_request = generate_personalized_exercises(data)
-    result = exercise_service(exercise_request)
\ No newline at end of file
+    exercise_request = generate_synthetic_data()
+    exercise_service = get_exercise_service()
+    result = exercise_service.generate_exercises(exercise_request)
+    print(result)
\ No newline at end of file
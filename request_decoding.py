@@ -0,0 +1,240 @@
+import dataclasses
+import hashlib
+import json
+import operator
+import typing
+from typing import Any, Callable, Dict, List, Tuple, Union
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+_MISSING = object()
+
+SCALAR_TYPES = {
+    str: "string",
+    int: "integer",
+    float: "number",
+    bool: "boolean",
+}
+
+
+class DecodeError(ValueError):
+    """
+    A payload that does not match the request type; errors holds one
+    message per problem, each prefixed with the JSON path ($.a.b[2])
+    """
+
+    def __init__(self, errors: List[str]):
+        super().__init__("; ".join(errors))
+        self.errors = errors
+
+
+class Decoder:
+    """
+    Validating decoder from JSON into a request type, compiled once per type.
+
+    The type's hints (dataclasses, List, Tuple[T, ...], Optional and JSON
+    scalars) are turned into a tree of closures at construction, so
+    decoding a payload is one walk that checks each value and builds the
+    dataclasses as it goes. Missing fields take the dataclass defaults,
+    unknown fields are ignored, and every mismatch is reported with its path.
+    """
+
+    def __init__(self, annotation):
+        self.type = annotation
+        self._convert = _compile(annotation)
+
+    def decode(self, body: Union[bytes, bytearray, memoryview, str]):
+        """
+        Parse JSON bytes (or text) and convert them into the request type
+        """
+        try:
+            value = orjson.loads(body) if orjson is not None else json.loads(body)
+        except ValueError as e:
+            raise DecodeError([f"$: invalid JSON ({e})"])
+        return self.convert(value)
+
+    def convert(self, value: Any):
+        """
+        Convert already-parsed JSON (dicts, lists, scalars) into the request type
+        """
+        errors = []
+        result = self._convert(value, "$", None, errors)
+        if errors:
+            raise DecodeError(errors)
+        return result
+
+
+def _location(parent: str, key) -> str:
+    if key is None:
+        return parent
+    if isinstance(key, int):
+        return f"{parent}[{key}]"
+    return f"{parent}.{key}"
+
+
+def _json_type(value) -> str:
+    if value is None:
+        return "null"
+    if isinstance(value, dict):
+        return "object"
+    if isinstance(value, list):
+        return "array"
+    return SCALAR_TYPES.get(type(value), type(value).__name__)
+
+
+# Converters take (value, parent path, key, errors) and build the path string only on error
+Converter = Callable[[Any, str, Any, List[str]], Any]
+
+
+def _compile(annotation) -> Converter:
+    origin = typing.get_origin(annotation)
+    args = typing.get_args(annotation)
+
+    if origin is Union and type(None) in args:
+        inner = [arg for arg in args if arg is not type(None)]
+        convert = _compile(inner[0])
+
+        def convert_optional(value, parent, key, errors):
+            return None if value is None else convert(value, parent, key, errors)
+        return convert_optional
+
+    if origin in (list, List):
+        return _compile_list(args[0] if args else Any)
+
+    if origin in (tuple, Tuple) and len(args) == 2 and args[1] is Ellipsis:
+        convert_list = _compile_list(args[0])
+
+        def convert_tuple(value, parent, key, errors):
+            items = convert_list(value, parent, key, errors)
+            return None if items is None else tuple(items)
+        return convert_tuple
+
+    if dataclasses.is_dataclass(annotation):
+        return _compile_dataclass(annotation)
+
+    if annotation is Any:
+        return lambda value, parent, key, errors: value
+
+    if annotation is float:
+        def convert_float(value, parent, key, errors):
+            kind = type(value)
+            if kind is float:
+                return value
+            if kind is int:
+                return float(value)
+            errors.append(f"{_location(parent, key)}: expected number, got {_json_type(value)}")
+        return convert_float
+
+    if annotation in SCALAR_TYPES:
+        expected = SCALAR_TYPES[annotation]
+
+        # Exact type checks: JSON true is not an integer, 1 is not a string
+        def convert_scalar(value, parent, key, errors):
+            if type(value) is annotation:
+                return value
+            errors.append(f"{_location(parent, key)}: expected {expected}, got {_json_type(value)}")
+        return convert_scalar
+
+    raise TypeError(f"Unsupported type for request decoding: {annotation!r}")
+
+
+def _compile_list(item_type) -> Converter:
+    if item_type in SCALAR_TYPES and item_type is not float:
+        expected = SCALAR_TYPES[item_type]
+
+        # Lists of strings are the common case; check them without a call per item
+        def convert_scalar_list(value, parent, key, errors):
+            if type(value) is not list:
+                errors.append(f"{_location(parent, key)}: expected array, got {_json_type(value)}")
+                return None
+            for item in value:
+                if type(item) is not item_type:
+                    break
+            else:
+                return value
+            path = _location(parent, key)
+            for index, item in enumerate(value):
+                if type(item) is not item_type:
+                    errors.append(f"{path}[{index}]: expected {expected}, got {_json_type(item)}")
+            return None
+        return convert_scalar_list
+
+    convert_item = _compile(item_type)
+
+    def convert_list(value, parent, key, errors):
+        if type(value) is not list:
+            errors.append(f"{_location(parent, key)}: expected array, got {_json_type(value)}")
+            return None
+        path = _location(parent, key)
+        return [convert_item(item, path, index, errors) for index, item in enumerate(value)]
+    return convert_list
+
+
+def _compile_dataclass(cls) -> Converter:
+    hints = typing.get_type_hints(cls)
+    specs = []
+    for field in dataclasses.fields(cls):
+        if not field.init:
+            continue
+        factory = None if field.default_factory is dataclasses.MISSING else field.default_factory
+        default = _MISSING if field.default is dataclasses.MISSING else field.default
+        annotation = hints[field.name]
+        # Exact-type scalars are checked inline, without a converter call
+        exact = annotation if annotation in SCALAR_TYPES and annotation is not float else _MISSING
+        specs.append((field.name, exact, _compile(annotation), default, factory))
+
+    def convert_dataclass(value, parent, key, errors):
+        if type(value) is not dict:
+            errors.append(f"{_location(parent, key)}: expected object, got {_json_type(value)}")
+            return None
+        failed = len(errors)
+        values = []
+        for name, exact, convert, default, factory in specs:
+            item = value.get(name, _MISSING)
+            if item is not _MISSING:
+                if type(item) is exact:
+                    values.append(item)
+                else:
+                    values.append(convert(item, _location(parent, key), name, errors))
+            elif factory is not None:
+                values.append(factory())
+            elif default is not _MISSING:
+                values.append(default)
+            else:
+                errors.append(f"{_location(parent, key)}.{name}: missing required field")
+        if len(errors) > failed:
+            return None
+        return cls(*values)
+    return convert_dataclass
+
+
+def request_digest(request) -> str:
+    """
+    Stable content digest of a request dataclass: the same across processes
+    and runs, so it can key shared caches. Fields with compare=False are left out.
+    """
+    encoded = json.dumps(_canonical(request), ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+    return hashlib.sha256(encoded).hexdigest()[:16]
+
+
+# Per dataclass: its name and a getter for the fields that go into the digest
+_digest_fields: Dict[type, Tuple[str, Callable]] = {}
+_PLAIN = {str, int, float, bool, type(None)}
+
+
+def _canonical(value):
+    cls = type(value)
+    spec = _digest_fields.get(cls)
+    if spec is None:
+        if cls is list or cls is tuple:
+            return [item if type(item) in _PLAIN else _canonical(item) for item in value]
+        if not dataclasses.is_dataclass(cls):
+            return value
+        names = [f.name for f in dataclasses.fields(cls) if f.compare]
+        getter = operator.attrgetter(*names) if len(names) > 1 else (lambda obj: (getattr(obj, names[0]),))
+        spec = _digest_fields[cls] = (cls.__name__, getter)
+    name, getter = spec
+    return [name] + [item if type(item) in _PLAIN else _canonical(item) for item in getter(value)]
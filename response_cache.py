@@ -0,0 +1,393 @@
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from abc import ABC, abstractmethod
+from typing import Any, Dict, Optional
+from dataclasses import dataclass, asdict
+from collections import OrderedDict
+
+# Grade bands share cached answers; explanations rarely differ within a band
+GRADE_BANDS = [(1, 2), (3, 5), (6, 8), (9, 10), (11, 12)]
+
+
+def grade_band(grade: int) -> str:
+    """
+    Map a grade to its band label, e.g. 4 -> "3-5"
+    """
+    try:
+        grade = int(grade)
+    except (TypeError, ValueError):
+        return str(grade)
+    for low, high in GRADE_BANDS:
+        if low <= grade <= high:
+            return f"{low}-{high}"
+    return str(grade)
+
+
+def normalize_text(text: str) -> str:
+    return " ".join(str(text).lower().split())
+
+
+def make_cache_key(question: str, cultural_key: str, grade: int, subject: str,
+                   topic: str, complexity_level: str, language: str) -> str:
+    """
+    Content-addressed key for a generated analogy
+    """
+    parts = [
+        normalize_text(question),
+        cultural_key,
+        grade_band(grade),
+        normalize_text(subject),
+        normalize_text(topic),
+        normalize_text(complexity_level),
+        normalize_text(language)
+    ]
+    return hashlib.sha256("\x1f".join(parts).encode("utf-8")).hexdigest()
+
+
+@dataclass
+class CacheMetrics:
+    hits: int = 0
+    misses: int = 0
+    sets: int = 0
+    evictions: int = 0
+    expirations: int = 0
+
+    @property
+    def hit_rate(self) -> float:
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+    def to_dict(self) -> Dict:
+        return dict(asdict(self), hit_rate=self.hit_rate)
+
+
+class CacheBackend(ABC):
+    """
+    Base class for response cache backends. Values are stored JSON-encoded,
+    so anything json.dumps accepts can be cached.
+    """
+
+    def __init__(self, default_ttl: Optional[float] = None):
+        self.default_ttl = default_ttl
+        self.metrics = CacheMetrics()
+        self._metrics_lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[Any]:
+        raw = self._get(key)
+        with self._metrics_lock:
+            if raw is None:
+                self.metrics.misses += 1
+            else:
+                self.metrics.hits += 1
+        return None if raw is None else json.loads(raw)
+
+    def set(self, key: str, value: Any, ttl: Optional[float] = None):
+        ttl = self.default_ttl if ttl is None else ttl
+        self._set(key, json.dumps(value), ttl)
+        with self._metrics_lock:
+            self.metrics.sets += 1
+
+    @abstractmethod
+    def delete(self, key: str):
+        ...
+
+    @abstractmethod
+    def clear(self):
+        ...
+
+    @abstractmethod
+    def __len__(self) -> int:
+        ...
+
+    def stats(self) -> Dict:
+        return dict(self.metrics.to_dict(), size=len(self))
+
+    @abstractmethod
+    def _get(self, key: str) -> Optional[str]:
+        ...
+
+    @abstractmethod
+    def _set(self, key: str, raw: str, ttl: Optional[float]):
+        ...
+
+
+class InMemoryLRUCache(CacheBackend):
+    """
+    Process-local LRU cache with optional per-entry TTL
+    """
+
+    def __init__(self, max_entries: int = 10000, default_ttl: Optional[float] = None):
+        super().__init__(default_ttl)
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _get(self, key: str) -> Optional[str]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            raw, expires_at = entry
+            if expires_at is not None and expires_at <= time.time():
+                del self._entries[key]
+                self.metrics.expirations += 1
+                return None
+            self._entries.move_to_end(key)
+            return raw
+
+    def _set(self, key: str, raw: str, ttl: Optional[float]):
+        expires_at = time.time() + ttl if ttl else None
+        with self._lock:
+            self._entries[key] = (raw, expires_at)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.metrics.evictions += 1
+
+    def delete(self, key: str):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+class SQLiteCache(CacheBackend):
+    """
+    On-disk cache in a single SQLite file, evicting least recently used rows
+    """
+
+    def __init__(self, path: str = "analogy_cache.sqlite3", max_entries: int = 100000,
+                 default_ttl: Optional[float] = None):
+        super().__init__(default_ttl)
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS cache ("
+            "key TEXT PRIMARY KEY, value TEXT NOT NULL, expires_at REAL, accessed_at REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS cache_accessed_at ON cache (accessed_at)")
+        self._conn.commit()
+
+    def _get(self, key: str) -> Optional[str]:
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute("SELECT value, expires_at FROM cache WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                return None
+            raw, expires_at = row
+            if expires_at is not None and expires_at <= now:
+                self._conn.execute("DELETE FROM cache WHERE key = ?", (key,))
+                self._conn.commit()
+                self.metrics.expirations += 1
+                return None
+            self._conn.execute("UPDATE cache SET accessed_at = ? WHERE key = ?", (now, key))
+            self._conn.commit()
+            return raw
+
+    def _set(self, key: str, raw: str, ttl: Optional[float]):
+        now = time.time()
+        expires_at = now + ttl if ttl else None
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO cache (key, value, expires_at, accessed_at) VALUES (?, ?, ?, ?)",
+                (key, raw, expires_at, now)
+            )
+            overflow = self._conn.execute("SELECT COUNT(*) FROM cache").fetchone()[0] - self.max_entries
+            if overflow > 0:
+                self._conn.execute(
+                    "DELETE FROM cache WHERE key IN (SELECT key FROM cache ORDER BY accessed_at LIMIT ?)",
+                    (overflow,)
+                )
+                self.metrics.evictions += overflow
+            self._conn.commit()
+
+    def delete(self, key: str):
+        with self._lock:
+            self._conn.execute("DELETE FROM cache WHERE key = ?", (key,))
+            self._conn.commit()
+
+    def clear(self):
+        with self._lock:
+            self._conn.execute("DELETE FROM cache")
+            self._conn.commit()
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM cache").fetchone()[0]
+
+    def close(self):
+        self._conn.close()
+
+
+class RedisCache(CacheBackend):
+    """
+    Cache stored in Redis (or anything speaking the redis-py client API).
+
+    TTLs use native key expiry. When max_entries is set, a sorted set of
+    access times under "<prefix>lru" bounds the number of cached keys, and
+    one of expiry times under "<prefix>expiry" lets keys Redis already
+    expired be dropped from it before anything live is evicted.
+    """
+
+    def __init__(self, client=None, url: str = "redis://localhost:6379/0", prefix: str = "sahyogi:analogy:",
+                 max_entries: Optional[int] = None, default_ttl: Optional[float] = None):
+        super().__init__(default_ttl)
+        if client is None:
+            import redis
+            client = redis.Redis.from_url(url)
+        self.client = client
+        self.prefix = prefix
+        self.max_entries = max_entries
+        self._lru_key = prefix + "lru"
+        self._expiry_key = prefix + "expiry"
+
+    def _get(self, key: str) -> Optional[str]:
+        raw = self.client.get(self.prefix + key)
+        if raw is None:
+            return None
+        if self.max_entries:
+            self.client.zadd(self._lru_key, {key: time.time()})
+        return raw.decode("utf-8") if isinstance(raw, bytes) else raw
+
+    def _set(self, key: str, raw: str, ttl: Optional[float]):
+        # Millisecond expiry: ex=int(ttl) would turn sub-second TTLs into an invalid ex=0
+        self.client.set(self.prefix + key, raw, px=max(1, int(ttl * 1000)) if ttl else None)
+        if self.max_entries:
+            now = time.time()
+            self.client.zadd(self._lru_key, {key: now})
+            if ttl:
+                self.client.zadd(self._expiry_key, {key: now + ttl})
+            else:
+                self.client.zrem(self._expiry_key, key)
+            overflow = self.client.zcard(self._lru_key) - self.max_entries
+            if overflow > 0:
+                overflow -= self._prune_expired(now)
+            if overflow > 0:
+                for member, _ in self.client.zpopmin(self._lru_key, overflow):
+                    member = member.decode("utf-8") if isinstance(member, bytes) else member
+                    self.client.delete(self.prefix + member)
+                    self.client.zrem(self._expiry_key, member)
+                    with self._metrics_lock:
+                        self.metrics.evictions += 1
+
+    def _prune_expired(self, now: float) -> int:
+        """
+        Drop keys whose TTL has passed from the LRU set; returns how many were dropped
+        """
+        expired = self.client.zrangebyscore(self._expiry_key, "-inf", now)
+        if not expired:
+            return 0
+        self.client.zrem(self._lru_key, *expired)
+        self.client.zrem(self._expiry_key, *expired)
+        with self._metrics_lock:
+            self.metrics.expirations += len(expired)
+        return len(expired)
+
+    def delete(self, key: str):
+        self.client.delete(self.prefix + key)
+        if self.max_entries:
+            self.client.zrem(self._lru_key, key)
+            self.client.zrem(self._expiry_key, key)
+
+    def clear(self):
+        keys = list(self.client.scan_iter(match=self.prefix + "*"))
+        if keys:
+            self.client.delete(*keys)
+
+    def __len__(self) -> int:
+        internal = {self._lru_key, self._expiry_key}
+        return sum(1 for key in self.client.scan_iter(match=self.prefix + "*")
+                   if (key.decode("utf-8") if isinstance(key, bytes) else key) not in internal)
+
+
+class LocalRedisStandIn:
+    """
+    In-process stand-in implementing the subset of the redis-py client API
+    used by RedisCache, for tests and benchmarks without a Redis server
+    """
+
+    def __init__(self):
+        self._values = {}
+        self._expiry = {}
+        self._zsets = {}
+        self._lock = threading.Lock()
+
+    def _key(self, key) -> str:
+        return key.decode("utf-8") if isinstance(key, bytes) else key
+
+    def _alive(self, key: str) -> bool:
+        expires_at = self._expiry.get(key)
+        if expires_at is not None and expires_at <= time.time():
+            self._values.pop(key, None)
+            self._expiry.pop(key, None)
+            return False
+        return key in self._values
+
+    def get(self, key: str) -> Optional[bytes]:
+        key = self._key(key)
+        with self._lock:
+            return self._values[key] if self._alive(key) else None
+
+    def set(self, key: str, value, ex: Optional[int] = None, px: Optional[int] = None) -> bool:
+        key = self._key(key)
+        with self._lock:
+            self._values[key] = value.encode("utf-8") if isinstance(value, str) else value
+            if ex or px:
+                self._expiry[key] = time.time() + (ex if ex else px / 1000)
+            else:
+                self._expiry.pop(key, None)
+        return True
+
+    def delete(self, *keys: str) -> int:
+        removed = 0
+        with self._lock:
+            for key in map(self._key, keys):
+                removed += (self._values.pop(key, None) is not None) + (self._zsets.pop(key, None) is not None)
+                self._expiry.pop(key, None)
+        return removed
+
+    def zadd(self, key: str, mapping: Dict[str, float]) -> int:
+        with self._lock:
+            zset = self._zsets.setdefault(key, {})
+            added = sum(1 for member in mapping if member not in zset)
+            zset.update(mapping)
+            return added
+
+    def zcard(self, key: str) -> int:
+        return len(self._zsets.get(key, {}))
+
+    def zrem(self, key: str, *members: str) -> int:
+        with self._lock:
+            zset = self._zsets.get(key, {})
+            return sum(1 for member in map(self._key, members) if zset.pop(member, None) is not None)
+
+    def zrangebyscore(self, key: str, min, max):
+        low, high = float(min), float(max)
+        with self._lock:
+            zset = self._zsets.get(key, {})
+            members = sorted((score, member) for member, score in zset.items() if low <= score <= high)
+            return [member.encode("utf-8") for _, member in members]
+
+    def zpopmin(self, key: str, count: int = 1):
+        with self._lock:
+            zset = self._zsets.get(key, {})
+            popped = sorted(zset.items(), key=lambda item: item[1])[:count]
+            for member, _ in popped:
+                del zset[member]
+            return [(member.encode("utf-8"), score) for member, score in popped]
+
+    def scan_iter(self, match: str = "*"):
+        prefix = match.rstrip("*")
+        with self._lock:
+            keys = [key for key in list(self._values) + list(self._zsets) if key.startswith(prefix)]
+        return iter([key.encode("utf-8") for key in keys if key in self._zsets or self._alive(key)])
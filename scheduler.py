@@ -0,0 +1,341 @@
+import heapq
+import itertools
+import random
+import statistics
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from enum import IntEnum
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
+from dataclasses import dataclass, field
+from collections import deque
+
+from tracing import record_retry
+
+
+class Priority(IntEnum):
+    INTERACTIVE = 0  # a student waiting on an answer
+    BULK = 1  # worksheets and classroom batches
+
+
+_priority: ContextVar[Optional[Priority]] = ContextVar("scheduler_priority", default=None)
+
+
+@contextmanager
+def request_priority(priority: Priority):
+    """
+    Run the model calls made inside the block with the given priority
+    """
+    token = _priority.set(priority)
+    try:
+        yield
+    finally:
+        _priority.reset(token)
+
+
+def current_priority() -> Optional[Priority]:
+    return _priority.get()
+
+
+def status_code(error: Exception) -> Optional[int]:
+    """
+    HTTP status of an API error, for google.api_core exceptions
+    (ResourceExhausted is 429) as well as plain HTTP client errors
+    """
+    for attribute in ("code", "status_code", "status"):
+        value = getattr(error, attribute, None)
+        if isinstance(value, int):
+            return int(value)
+    return None
+
+
+@dataclass
+class RateLimits:
+    requests_per_minute: float = 60
+    tokens_per_minute: float = 1_000_000
+    # Reserved per call on top of the prompt, corrected once usage is known
+    expected_output_tokens: int = 512
+
+
+class TokenBucket:
+    """
+    Refills continuously at rate units per second up to capacity
+    """
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+
+    def _refill(self, now: float):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self, amount: float, now: float) -> float:
+        """
+        Seconds until amount can be taken (amounts above capacity wait for a full bucket)
+        """
+        self._refill(now)
+        amount = min(amount, self.capacity)
+        return 0.0 if self.tokens >= amount else (amount - self.tokens) / self.rate
+
+    def take(self, amount: float):
+        self.tokens -= min(amount, self.capacity)
+
+    def give_back(self, amount: float):
+        self.tokens = min(self.capacity, self.tokens + amount)
+
+
+class _ModelState:
+    def __init__(self, limits: RateLimits):
+        self.limits = limits
+        self.rate_factor = 1.0
+        self.requests = TokenBucket(limits.requests_per_minute / 60, limits.requests_per_minute)
+        self.tokens = TokenBucket(limits.tokens_per_minute / 60, limits.tokens_per_minute)
+        self.queue: List[Tuple[int, int]] = []
+
+    def apply_rate_factor(self, factor: float):
+        self.rate_factor = factor
+        self.requests.rate = self.limits.requests_per_minute / 60 * factor
+        self.tokens.rate = self.limits.tokens_per_minute / 60 * factor
+
+
+@dataclass
+class SchedulerMetrics:
+    admitted: int = 0
+    throttled: int = 0  # 429 responses
+    retries: int = 0
+    max_queue_depth: int = 0
+    waits: Dict[str, deque] = field(default_factory=lambda: {p.name: deque(maxlen=1000) for p in Priority})
+
+
+class Scheduler:
+    """
+    Shared admission control for model calls.
+
+    Each model has token buckets for requests/min and tokens/min. Callers
+    queue per model in priority order (interactive before bulk, FIFO within
+    a class) and are admitted once they reach the head of the queue and both
+    buckets allow. Rates adapt AIMD-style: a 429 multiplies them by
+    decrease_factor and empties the request bucket, every success adds
+    increase_step back up to the configured limits. 429s and 503s are retried
+    with full-jitter exponential backoff, going through admission again.
+
+    Works from threads and from asyncio; async waiters poll briefly rather
+    than block the event loop.
+    """
+
+    RETRYABLE = (429, 503)
+
+    def __init__(self, limits: Optional[Dict[str, RateLimits]] = None,
+                 default_limits: Optional[RateLimits] = None,
+                 max_retries: int = 4, base_backoff: float = 0.5, max_backoff: float = 30.0,
+                 decrease_factor: float = 0.5, increase_step: float = 0.05,
+                 min_rate_factor: float = 0.05, poll_interval: float = 0.01,
+                 rng: Optional[random.Random] = None):
+        self.limits = limits or {}
+        self.default_limits = default_limits or RateLimits()
+        self.max_retries = max_retries
+        self.base_backoff = base_backoff
+        self.max_backoff = max_backoff
+        self.decrease_factor = decrease_factor
+        self.increase_step = increase_step
+        self.min_rate_factor = min_rate_factor
+        self.poll_interval = poll_interval
+        self.rng = rng or random.Random()
+        self.metrics = SchedulerMetrics()
+        self._models: Dict[str, _ModelState] = {}
+        self._sequence = itertools.count()
+        self._lock = threading.Lock()
+        self._ready = threading.Condition(self._lock)
+
+    def call(self, model_name: str, prompt_tokens: int, fn: Callable, priority: Optional[Priority] = None):
+        """
+        Run fn once admitted, retrying rate-limited and unavailable errors
+        """
+        tokens = self._reservation(model_name, prompt_tokens)
+        for attempt in range(self.max_retries + 1):
+            self.acquire(model_name, tokens, priority)
+            try:
+                result = fn()
+            except Exception as e:
+                if not self._should_retry(model_name, e, attempt):
+                    raise
+                record_retry(model_name, status_code(e))
+                time.sleep(self._backoff(attempt))
+                continue
+            self._succeeded(model_name, tokens, result)
+            return result
+
+    async def acall(self, model_name: str, prompt_tokens: int, fn: Callable[[], Awaitable],
+                    priority: Optional[Priority] = None):
+        """
+        Async counterpart of call; fn returns an awaitable
+        """
+        # Imported here rather than at module level: asyncio is already loaded
+        # whenever this runs, and importing it costs the sync paths' cold start
+        import asyncio
+        tokens = self._reservation(model_name, prompt_tokens)
+        for attempt in range(self.max_retries + 1):
+            await self.aacquire(model_name, tokens, priority)
+            try:
+                result = await fn()
+            except Exception as e:
+                if not self._should_retry(model_name, e, attempt):
+                    raise
+                record_retry(model_name, status_code(e))
+                await asyncio.sleep(self._backoff(attempt))
+                continue
+            self._succeeded(model_name, tokens, result)
+            return result
+
+    def acquire(self, model_name: str, tokens: int, priority: Optional[Priority] = None) -> float:
+        """
+        Block until a call of roughly tokens tokens may be sent; returns seconds waited
+        """
+        state, ticket, started = self._enqueue(model_name, priority)
+        try:
+            with self._ready:
+                while True:
+                    delay = self._try_admit(state, ticket, tokens)
+                    if delay is None:
+                        break
+                    self._ready.wait(timeout=delay)
+        except BaseException:
+            self._dequeue(state, ticket)
+            raise
+        return self._admitted(ticket, started)
+
+    async def aacquire(self, model_name: str, tokens: int, priority: Optional[Priority] = None) -> float:
+        """
+        Async counterpart of acquire
+        """
+        import asyncio
+        state, ticket, started = self._enqueue(model_name, priority)
+        try:
+            while True:
+                with self._ready:
+                    delay = self._try_admit(state, ticket, tokens)
+                if delay is None:
+                    break
+                await asyncio.sleep(min(delay, self.poll_interval))
+        except BaseException:
+            # Cancelled while queued; never leave a dead ticket at the head
+            self._dequeue(state, ticket)
+            raise
+        return self._admitted(ticket, started)
+
+    def queue_depth(self) -> Dict[str, int]:
+        with self._lock:
+            depth = {p.name: 0 for p in Priority}
+            for state in self._models.values():
+                for priority, _ in state.queue:
+                    depth[Priority(priority).name] += 1
+            return depth
+
+    def stats(self) -> Dict:
+        depth = self.queue_depth()
+        with self._lock:
+            waits = {
+                name: {
+                    "count": len(samples),
+                    "mean_ms": statistics.mean(samples) * 1000 if samples else 0.0,
+                    "p95_ms": sorted(samples)[int(len(samples) * 0.95) - 1] * 1000 if samples else 0.0
+                }
+                for name, samples in self.metrics.waits.items()
+            }
+            return {
+                "admitted": self.metrics.admitted,
+                "throttled": self.metrics.throttled,
+                "retries": self.metrics.retries,
+                "queue_depth": depth,
+                "max_queue_depth": self.metrics.max_queue_depth,
+                "wait": waits,
+                "rate_factor": {name: state.rate_factor for name, state in self._models.items()}
+            }
+
+    def _reservation(self, model_name: str, prompt_tokens: int) -> int:
+        return prompt_tokens + self.limits.get(model_name, self.default_limits).expected_output_tokens
+
+    def _state(self, model_name: str) -> _ModelState:
+        state = self._models.get(model_name)
+        if state is None:
+            state = self._models[model_name] = _ModelState(self.limits.get(model_name, self.default_limits))
+        return state
+
+    def _enqueue(self, model_name: str, priority: Optional[Priority]) -> Tuple[_ModelState, Tuple[int, int], float]:
+        if priority is None:
+            priority = current_priority()
+        if priority is None:
+            priority = Priority.INTERACTIVE
+        with self._lock:
+            state = self._state(model_name)
+            ticket = (int(priority), next(self._sequence))
+            heapq.heappush(state.queue, ticket)
+            depth = sum(len(s.queue) for s in self._models.values())
+            self.metrics.max_queue_depth = max(self.metrics.max_queue_depth, depth)
+        return state, ticket, time.monotonic()
+
+    def _dequeue(self, state: _ModelState, ticket: Tuple[int, int]):
+        with self._ready:
+            if ticket in state.queue:
+                state.queue.remove(ticket)
+                heapq.heapify(state.queue)
+                self._ready.notify_all()
+
+    def _try_admit(self, state: _ModelState, ticket: Tuple[int, int], tokens: int) -> Optional[float]:
+        """
+        Admit ticket and return None, or return how long to wait before trying
+        again. Called with the lock held.
+        """
+        if state.queue[0] != ticket:
+            return self.poll_interval
+        now = time.monotonic()
+        delay = max(state.requests.wait_time(1, now), state.tokens.wait_time(tokens, now))
+        if delay > 0:
+            return delay
+        state.requests.take(1)
+        state.tokens.take(tokens)
+        heapq.heappop(state.queue)
+        self._ready.notify_all()
+        return None
+
+    def _admitted(self, ticket: Tuple[int, int], started: float) -> float:
+        waited = time.monotonic() - started
+        with self._lock:
+            self.metrics.admitted += 1
+            self.metrics.waits[Priority(ticket[0]).name].append(waited)
+        return waited
+
+    def _succeeded(self, model_name: str, tokens: int, result):
+        with self._lock:
+            state = self._models[model_name]
+            if state.rate_factor < 1.0:
+                state.apply_rate_factor(min(1.0, state.rate_factor + self.increase_step))
+            # Settle the token reservation against actual usage when the response reports it
+            usage = getattr(result, "usage_metadata", None)
+            used = getattr(usage, "total_token_count", None)
+            if isinstance(used, int) and used:
+                if used < tokens:
+                    state.tokens.give_back(tokens - used)
+                else:
+                    state.tokens.take(used - tokens)
+
+    def _should_retry(self, model_name: str, error: Exception, attempt: int) -> bool:
+        code = status_code(error)
+        with self._lock:
+            if code == 429:
+                self.metrics.throttled += 1
+                state = self._models[model_name]
+                state.apply_rate_factor(max(self.min_rate_factor, state.rate_factor * self.decrease_factor))
+                state.requests.tokens = min(state.requests.tokens, 0.0)
+            if code not in self.RETRYABLE or attempt >= self.max_retries:
+                return False
+            self.metrics.retries += 1
+            return True
+
+    def _backoff(self, attempt: int) -> float:
+        # Full jitter keeps retries from many callers from arriving together
+        return self.rng.uniform(0, min(self.max_backoff, self.base_backoff * 2 ** attempt))
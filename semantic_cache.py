@@ -0,0 +1,165 @@
+import hashlib
+import threading
+from typing import Any, Callable, Dict, Hashable, List, Optional, Sequence, Tuple
+from dataclasses import dataclass, asdict
+
+# Imported on first use, so importing the services does not pay for numpy
+np = None
+
+
+def _require_numpy():
+    global np
+    if np is None:
+        try:
+            import numpy
+        except ImportError:
+            raise ImportError("The semantic question cache requires numpy: pip install numpy") from None
+        np = numpy
+
+
+class HashingVectorizer:
+    """
+    Cheap embedding fallback: signed feature hashing of character n-grams,
+    L2-normalized so a dot product is the cosine similarity
+    """
+
+    def __init__(self, dim: int = 384, ngram_range: Tuple[int, int] = (3, 5)):
+        _require_numpy()
+        self.dim = dim
+        self.ngram_range = ngram_range
+
+    def embed(self, texts: Sequence[str]):
+        vectors = np.zeros((len(texts), self.dim), dtype=np.float32)
+        for row, text in enumerate(texts):
+            padded = f" {' '.join(text.lower().split())} "
+            for n in range(self.ngram_range[0], self.ngram_range[1] + 1):
+                for i in range(len(padded) - n + 1):
+                    digest = hashlib.blake2b(padded[i:i + n].encode("utf-8"), digest_size=8).digest()
+                    bucket = int.from_bytes(digest[:4], "little") % self.dim
+                    vectors[row, bucket] += 1.0 if digest[4] & 1 else -1.0
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        return vectors / np.maximum(norms, 1e-12)
+
+
+class SentenceTransformerEmbedder:
+    """
+    Local multilingual embedding model via sentence-transformers
+    """
+
+    def __init__(self, model_name: str = "sentence-transformers/paraphrase-multilingual-MiniLM-L12-v2"):
+        _require_numpy()
+        from sentence_transformers import SentenceTransformer
+        self.model = SentenceTransformer(model_name)
+        self.dim = self.model.get_sentence_embedding_dimension()
+
+    def embed(self, texts: Sequence[str]):
+        return np.asarray(self.model.encode(list(texts), normalize_embeddings=True), dtype=np.float32)
+
+
+class BruteForceIndex:
+    """
+    Exact nearest-neighbour index over unit vectors held in one NumPy matrix.
+
+    Anything with the same add/add_many/search/__len__ interface (for example
+    an approximate index such as FAISS or HNSW) can be used instead via
+    SemanticQuestionCache(index_factory=...).
+    """
+
+    def __init__(self, dim: int, initial_capacity: int = 1024):
+        _require_numpy()
+        self.dim = dim
+        self._vectors = np.empty((initial_capacity, dim), dtype=np.float32)
+        self._payloads: List[Any] = []
+
+    def add(self, vector, payload: Any):
+        self.add_many(np.asarray(vector, dtype=np.float32).reshape(1, self.dim), [payload])
+
+    def add_many(self, vectors, payloads: List[Any]):
+        count = len(self._payloads)
+        needed = count + len(payloads)
+        if needed > len(self._vectors):
+            capacity = max(needed, 2 * len(self._vectors))
+            grown = np.empty((capacity, self.dim), dtype=np.float32)
+            grown[:count] = self._vectors[:count]
+            self._vectors = grown
+        self._vectors[count:needed] = vectors
+        self._payloads.extend(payloads)
+
+    def search(self, vector, k: int = 1) -> List[Tuple[float, Any]]:
+        count = len(self._payloads)
+        if count == 0:
+            return []
+        scores = self._vectors[:count] @ np.asarray(vector, dtype=np.float32)
+        k = min(k, count)
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        return [(float(scores[i]), self._payloads[i]) for i in top]
+
+    def __len__(self) -> int:
+        return len(self._payloads)
+
+
+@dataclass
+class SemanticCacheMetrics:
+    hits: int = 0
+    misses: int = 0
+    entries: int = 0
+
+    @property
+    def hit_rate(self) -> float:
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+    def to_dict(self) -> Dict:
+        return dict(asdict(self), hit_rate=self.hit_rate)
+
+
+class SemanticQuestionCache:
+    """
+    Looks up previously answered questions by embedding similarity.
+
+    Each scope (for example cultural key, grade band and the request's
+    subject, topic and complexity) has its own index, so answers are never
+    shared across student contexts or request options.
+    """
+
+    def __init__(self, embedder=None, threshold: float = 0.85,
+                 index_factory: Optional[Callable[[int], Any]] = None):
+        self.embedder = embedder or HashingVectorizer()
+        self.threshold = threshold
+        self.index_factory = index_factory or BruteForceIndex
+        self.metrics = SemanticCacheMetrics()
+        self._indexes: Dict[Hashable, Any] = {}
+        self._lock = threading.Lock()
+
+    def lookup(self, question: str, scope: Hashable) -> Optional[Any]:
+        """
+        Return the stored answer of the most similar question above the threshold
+        """
+        with self._lock:
+            index = self._indexes.get(scope)
+            if index is None or len(index) == 0:
+                self.metrics.misses += 1
+                return None
+
+        # Embedding is the expensive part and needs no shared state
+        vector = self.embedder.embed([question])[0]
+        with self._lock:
+            matches = index.search(vector, k=1)
+            if matches and matches[0][0] >= self.threshold:
+                self.metrics.hits += 1
+                return matches[0][1]
+            self.metrics.misses += 1
+        return None
+
+    def add(self, question: str, scope: Hashable, answer: Any):
+        vector = self.embedder.embed([question])[0]
+        with self._lock:
+            index = self._indexes.get(scope)
+            if index is None:
+                index = self._indexes[scope] = self.index_factory(self.embedder.dim)
+            index.add(vector, answer)
+            self.metrics.entries += 1
+
+    def stats(self) -> Dict:
+        return dict(self.metrics.to_dict(), scopes=len(self._indexes))
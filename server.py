@@ -0,0 +1,362 @@
+"""
+ASGI service exposing the analogy and exercise pipelines.
+
+    POST /analogy    AnalogyRequest JSON -> analogy result
+    POST /exercises  ExerciseRequest JSON -> exercises
+    GET  /health     200 while serving, 503 while draining
+    GET  /metrics    Prometheus text format
+
+Run it with uvicorn (pip install uvicorn), which the entry point wraps:
+
+    SERVER_WORKERS=4 SERVER_MAX_CONCURRENCY=256 python server.py
+    uvicorn server:app --workers 4
+"""
+import asyncio
+import json
+import os
+import time
+from typing import List, Optional, Tuple
+from dataclasses import dataclass
+
+from generate_analogy import LocalAnalogyService, analogy_request_decoder
+from personalized_exercise import PersonalizedExerciseService, exercise_request_decoder
+from request_decoding import DecodeError, Decoder
+from tracing import MetricsRegistry, render_metrics
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+def dumps(value) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(value)
+    return json.dumps(value, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+@dataclass
+class ServerConfig:
+    host: str = "0.0.0.0"
+    port: int = 8000
+    workers: int = 1
+    # Requests being processed per worker; beyond this new requests get a 503
+    max_concurrency: int = 256
+    max_body_bytes: int = 64 * 1024
+    # Seconds shutdown waits for in-flight requests (and their model calls)
+    drain_timeout: float = 30.0
+    warm_up: bool = True
+
+    @classmethod
+    def from_env(cls) -> "ServerConfig":
+        """
+        Read SERVER_HOST, SERVER_PORT, SERVER_WORKERS, SERVER_MAX_CONCURRENCY,
+        SERVER_MAX_BODY_BYTES, SERVER_DRAIN_TIMEOUT and SERVER_WARM_UP
+        """
+        defaults = cls()
+        return cls(
+            host=os.getenv("SERVER_HOST", defaults.host),
+            port=int(os.getenv("SERVER_PORT", defaults.port)),
+            workers=int(os.getenv("SERVER_WORKERS", defaults.workers)),
+            max_concurrency=int(os.getenv("SERVER_MAX_CONCURRENCY", defaults.max_concurrency)),
+            max_body_bytes=int(os.getenv("SERVER_MAX_BODY_BYTES", defaults.max_body_bytes)),
+            drain_timeout=float(os.getenv("SERVER_DRAIN_TIMEOUT", defaults.drain_timeout)),
+            warm_up=os.getenv("SERVER_WARM_UP", "1") not in ("0", "false", "no")
+        )
+
+
+# Service attributes whose stats() /metrics exports, besides each model caller's
+# scheduler, hedger and context cache
+COMPONENT_ATTRIBUTES = [
+    ("response_cache", "response_cache"),
+    ("single_flight", "single_flight"),
+    ("translation_memory", "translation_memory"),
+    ("semantic_cache", "semantic_cache"),
+]
+
+# Label for the keys of nested stats, e.g. the scheduler's queue depth per priority
+STATS_LABELS = {"queue_depth": "priority", "wait": "priority", "rate_factor": "model"}
+
+
+def _flatten_stats(stats: dict, prefix: str = "", labels: Optional[dict] = None):
+    """
+    (name, value, labels) for every number in a stats() dict; nested dicts
+    become labels (STATS_LABELS names them) or name suffixes
+    """
+    labels = labels or {}
+    for key, value in stats.items():
+        if isinstance(value, bool):
+            value = int(value)
+        if isinstance(value, (int, float)):
+            yield prefix + key, value, labels
+        elif isinstance(value, dict):
+            label = STATS_LABELS.get(key)
+            if label is None:
+                yield from _flatten_stats(value, f"{prefix}{key}_", labels)
+                continue
+            for item, nested in value.items():
+                item_labels = dict(labels, **{label: str(item)})
+                if isinstance(nested, dict):
+                    yield from _flatten_stats(nested, f"{prefix}{key}_", item_labels)
+                elif isinstance(nested, (int, float)):
+                    yield prefix + key, nested, item_labels
+
+
+class HTTPError(Exception):
+    def __init__(self, status: int, message: str, headers: Optional[List[Tuple[bytes, bytes]]] = None,
+                 errors: Optional[List[str]] = None):
+        super().__init__(message)
+        self.status = status
+        self.headers = headers or []
+        self.errors = errors
+
+
+class ServiceApp:
+    """
+    The ASGI application. Services are built on lifespan startup (or first
+    request), not at import, so importing this module stays cheap for
+    uvicorn's workers. Shutdown stops accepting model requests and waits
+    up to drain_timeout for in-flight ones to finish.
+    """
+
+    def __init__(self, config: Optional[ServerConfig] = None,
+                 analogy_service: Optional[LocalAnalogyService] = None,
+                 exercise_service: Optional[PersonalizedExerciseService] = None):
+        self.config = config or ServerConfig()
+        self.analogy_service = analogy_service
+        self.exercise_service = exercise_service
+        self.metrics = MetricsRegistry()
+        self.in_flight = 0
+        self.draining = False
+        self._idle: Optional[asyncio.Event] = None
+        self._routes = {
+            ("POST", "/analogy"): self._analogy,
+            ("POST", "/exercises"): self._exercises,
+            ("GET", "/health"): self._health,
+            ("GET", "/metrics"): self._metrics,
+        }
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "lifespan":
+            await self._lifespan(receive, send)
+        elif scope["type"] == "http":
+            await self._http(scope, receive, send)
+
+    def startup(self):
+        if self.analogy_service is None:
+            self.analogy_service = LocalAnalogyService()
+        if self.exercise_service is None:
+            self.exercise_service = PersonalizedExerciseService()
+        if self.config.warm_up:
+            self.analogy_service.warm_up()
+            self.exercise_service.warm_up()
+
+    async def drain(self):
+        """
+        Refuse new model requests and wait for in-flight ones, up to drain_timeout
+        """
+        self.draining = True
+        if self.in_flight:
+            try:
+                await asyncio.wait_for(self._idle_event().wait(), self.config.drain_timeout)
+            except asyncio.TimeoutError:
+                pass
+
+    async def _lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message["type"] == "lifespan.startup":
+                try:
+                    # Warm-up imports the SDK and may touch the network; keep it off the loop
+                    await asyncio.get_running_loop().run_in_executor(None, self.startup)
+                except Exception as e:
+                    await send({"type": "lifespan.startup.failed", "message": str(e)})
+                    return
+                await send({"type": "lifespan.startup.complete"})
+            elif message["type"] == "lifespan.shutdown":
+                await self.drain()
+                await send({"type": "lifespan.shutdown.complete"})
+                return
+
+    async def _http(self, scope, receive, send):
+        method, path = scope["method"], scope["path"]
+        handler = self._routes.get((method, path))
+        started = time.perf_counter()
+        try:
+            if handler is None:
+                allowed = [m for m, p in self._routes if p == path]
+                raise HTTPError(405 if allowed else 404, "Method not allowed" if allowed else "Not found")
+            status, body, headers = await handler(scope, receive)
+        except HTTPError as e:
+            error = {"success": False, "error": str(e)}
+            if e.errors:
+                error["errors"] = e.errors
+            status, body, headers = e.status, dumps(error), e.headers
+        except Exception as e:
+            status, body, headers = 500, dumps({"success": False, "error": str(e)}), []
+        headers = headers or [(b"content-type", b"application/json")]
+        await send({"type": "http.response.start", "status": status,
+                    "headers": headers + [(b"content-length", str(len(body)).encode())]})
+        await send({"type": "http.response.body", "body": body})
+
+        route = path if handler is not None else "other"
+        self.metrics.inc("sahyogi_http_requests_total", help="HTTP requests by route and status",
+                         route=route, status=str(status))
+        self.metrics.observe("sahyogi_http_request_duration_seconds", time.perf_counter() - started,
+                             help="HTTP request latency", route=route)
+
+    async def _analogy(self, scope, receive):
+        analogy_request = await self._read_request(scope, receive, analogy_request_decoder)
+        async with self._admit():
+            await self._ensure_started()
+            result = await self.analogy_service.agenerate_analogy(analogy_request)
+        return 200 if result["success"] else 500, dumps(result), None
+
+    async def _exercises(self, scope, receive):
+        exercise_request = await self._read_request(scope, receive, exercise_request_decoder)
+        async with self._admit():
+            await self._ensure_started()
+            result = await self.exercise_service.agenerate_exercises(exercise_request)
+        return 200 if result["success"] else 500, dumps(result), None
+
+    async def _health(self, scope, receive):
+        status = "draining" if self.draining else "healthy"
+        body = dumps({"status": status, "in_flight": self.in_flight})
+        return 503 if self.draining else 200, body, None
+
+    async def _metrics(self, scope, receive):
+        self.metrics.set("sahyogi_http_in_flight", self.in_flight, help="Model requests being processed")
+        self._export_component_stats()
+        body = (self.metrics.render() + render_metrics()).encode("utf-8")
+        return 200, body, [(b"content-type", b"text/plain; version=0.0.4; charset=utf-8")]
+
+    def _export_component_stats(self):
+        """
+        Publish the stats() of the services' schedulers, hedgers, caches and
+        single-flight groups as gauges, labelled by the service using them
+        ("shared" when both do)
+        """
+        for kind, component, service in self._components():
+            for name, value, labels in _flatten_stats(component.stats()):
+                self.metrics.set(f"sahyogi_{kind}_{name}", value, help=f"{kind} stats: {name}", service=service, **labels)
+
+    def _components(self) -> List[Tuple[str, object, str]]:
+        found = {}
+        services = [("analogy", self.analogy_service), ("exercises", self.exercise_service)]
+        for service_name, service in services:
+            if service is None:
+                continue
+            parts = []
+            for caller in service.routed_caller.callers.values():
+                parts += [("scheduler", caller.scheduler), ("hedger", caller.hedger),
+                          ("context_cache", caller.context_cache)]
+            parts += [(kind, getattr(service, attribute, None)) for kind, attribute in COMPONENT_ATTRIBUTES]
+            for kind, component in parts:
+                if component is None:
+                    continue
+                known = found.setdefault(id(component), [kind, component, service_name])
+                if known[2] != service_name:
+                    known[2] = "shared"
+        return [tuple(entry) for entry in found.values()]
+
+    async def _read_request(self, scope, receive, decoder: Decoder):
+        body = await self._read_body(scope, receive)
+        try:
+            return decoder.decode(body)
+        except DecodeError as e:
+            raise HTTPError(400, "Invalid request", errors=e.errors)
+
+    async def _read_body(self, scope, receive) -> bytes:
+        limit = self.config.max_body_bytes
+        for name, value in scope.get("headers", []):
+            if name == b"content-length":
+                try:
+                    length = int(value)
+                except ValueError:
+                    raise HTTPError(400, "Invalid Content-Length header")
+                if length < 0:
+                    raise HTTPError(400, "Invalid Content-Length header")
+                if length > limit:
+                    raise HTTPError(413, f"Request body exceeds {limit} bytes")
+        chunks, size = [], 0
+        while True:
+            message = await receive()
+            if message["type"] == "http.disconnect":
+                raise HTTPError(400, "Client disconnected")
+            chunk = message.get("body", b"")
+            size += len(chunk)
+            if size > limit:
+                raise HTTPError(413, f"Request body exceeds {limit} bytes")
+            chunks.append(chunk)
+            if not message.get("more_body", False):
+                break
+        return b"".join(chunks)
+
+    async def _ensure_started(self):
+        # Servers run with lifespan disabled never call startup()
+        if self.analogy_service is None or self.exercise_service is None:
+            await asyncio.get_running_loop().run_in_executor(None, self.startup)
+
+    def _admit(self):
+        return _Admission(self)
+
+    def _idle_event(self) -> asyncio.Event:
+        if self._idle is None:
+            self._idle = asyncio.Event()
+            if not self.in_flight:
+                self._idle.set()
+        return self._idle
+
+
+class _Admission:
+    """
+    Counts a model request in flight, shedding it when the app is draining or full
+    """
+
+    def __init__(self, app: ServiceApp):
+        self.app = app
+
+    async def __aenter__(self):
+        app = self.app
+        if app.draining:
+            raise HTTPError(503, "Server is shutting down", [(b"content-type", b"application/json"),
+                                                             (b"connection", b"close")])
+        if app.in_flight >= app.config.max_concurrency:
+            raise HTTPError(503, "Too many requests in flight", [(b"content-type", b"application/json"),
+                                                                 (b"retry-after", b"1")])
+        app.in_flight += 1
+        app._idle_event().clear()
+
+    async def __aexit__(self, *exc_info):
+        app = self.app
+        app.in_flight -= 1
+        if not app.in_flight:
+            app._idle_event().set()
+
+
+def create_app(config: Optional[ServerConfig] = None, **services) -> ServiceApp:
+    return ServiceApp(config or ServerConfig.from_env(), **services)
+
+
+app = create_app()
+
+
+def main():
+    try:
+        import uvicorn
+    except ImportError:
+        raise SystemExit("server.py needs an ASGI server: pip install uvicorn")
+    config = app.config
+    uvicorn.run(
+        "server:app",
+        host=config.host,
+        port=config.port,
+        workers=config.workers,
+        # Leave room for the app's own drain before uvicorn cancels it
+        timeout_graceful_shutdown=int(config.drain_timeout) + 5,
+        access_log=False
+    )
+
+
+if __name__ == "__main__":
+    main()
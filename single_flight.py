@@ -0,0 +1,105 @@
+import threading
+from typing import Any, Awaitable, Callable, Dict, Hashable, Tuple
+from dataclasses import dataclass, asdict
+
+
+@dataclass
+class SingleFlightMetrics:
+    executed: int = 0  # calls that ran the work
+    coalesced: int = 0  # calls that waited on another caller's run
+
+    @property
+    def coalesce_rate(self) -> float:
+        calls = self.executed + self.coalesced
+        return self.coalesced / calls if calls else 0.0
+
+    def to_dict(self) -> Dict:
+        return dict(asdict(self), coalesce_rate=self.coalesce_rate)
+
+
+class _Flight:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    """
+    Collapses concurrent calls with the same key into one execution.
+
+    The first caller for a key runs the work; callers arriving while it is
+    in flight wait for it and receive the same result (or exception).
+    Nothing is remembered once the flight lands, so this complements the
+    response cache rather than replacing it.
+
+    Threads and asyncio are tracked separately: do() coalesces threads,
+    ado() coalesces tasks on the same event loop. In ado() the work runs as
+    its own task, so a cancelled caller does not cancel it for the others.
+    """
+
+    def __init__(self):
+        self.metrics = SingleFlightMetrics()
+        self._flights: Dict[Hashable, _Flight] = {}
+        self._tasks: Dict[Tuple[int, Hashable], "asyncio.Task"] = {}
+        self._lock = threading.Lock()
+
+    def do(self, key: Hashable, fn: Callable[[], Any]) -> Tuple[Any, bool]:
+        """
+        Run fn, or wait for the in-flight run for key; returns (result, shared)
+        """
+        with self._lock:
+            flight = self._flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._flights[key] = _Flight()
+                self.metrics.executed += 1
+            else:
+                self.metrics.coalesced += 1
+
+        if not leader:
+            flight.done.wait()
+            if flight.error is not None:
+                raise flight.error
+            return flight.result, True
+
+        try:
+            flight.result = fn()
+        except BaseException as e:
+            flight.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._flights[key]
+            flight.done.set()
+        return flight.result, False
+
+    async def ado(self, key: Hashable, fn: Callable[[], Awaitable]) -> Tuple[Any, bool]:
+        """
+        Async counterpart of do; fn returns an awaitable
+        """
+        import asyncio
+        loop = asyncio.get_running_loop()
+        flight_key = (id(loop), key)
+        with self._lock:
+            task = self._tasks.get(flight_key)
+            shared = task is not None
+            if shared:
+                self.metrics.coalesced += 1
+            else:
+                task = self._tasks[flight_key] = loop.create_task(fn())
+                task.add_done_callback(lambda _: self._land(flight_key))
+                self.metrics.executed += 1
+
+        return await asyncio.shield(task), shared
+
+    def in_flight(self) -> int:
+        with self._lock:
+            return len(self._flights) + len(self._tasks)
+
+    def stats(self) -> Dict:
+        return dict(self.metrics.to_dict(), in_flight=self.in_flight())
+
+    def _land(self, flight_key: Tuple[int, Hashable]):
+        with self._lock:
+            self._tasks.pop(flight_key, None)
@@ -0,0 +1,182 @@
+"""
+Golden prompts: the services' original f-string prompts, kept verbatim.
+
+The prompts were deliberately reordered for context caching into a static
+prefix and a per-student suffix, so check_golden applies exactly that diff
+to the original prompts and requires byte-identical output:
+
+    analogy:   STUDENT CONTEXT and QUESTION TO EXPLAIN blocks move after the
+               checklist; "in the question" becomes "in the student's
+               question" and both "grade N" become "the student's grade"
+    exercises: the persona sentence ends at "...for students."; the
+               "Generate N ..." line, STUDENT PROFILE and EXERCISE
+               REQUIREMENTS move to the end; "help this student" becomes
+               "help the student described below"
+
+Each edit must apply exactly once, so any other change to the prompts fails.
+Used by tests/test_prompt_build.py and benchmarks/prompt_build.py.
+"""
+from generate_analogy import generate_local_analogy
+from personalized_exercise import generate_personalized_exercises
+from benchmarks.samples import SAMPLE_ANALOGY_REQUEST, SAMPLE_EXERCISE_REQUEST
+
+GOLDEN_VARIANTS = [
+    {},
+    {"question": "Why is {this} in braces?", "complexity_level": "complex"},
+    {"question": "बारिश क्यों होती है?", "preferred_language": "Hindi"},
+]
+CONTEXT_VARIANTS = [
+    {},
+    {"cultural_context": "urban", "familiar_concepts": ["metro", "mall"]},
+    {"cultural_context": "tribal", "grade": 9, "familiar_concepts": []},
+]
+
+
+def legacy_analogy_prompt(service, req, translated_question):
+    context = req.student_context
+    cultural_key = service._get_cultural_key(context.cultural_context, context.region)
+    regional_info = service.regional_contexts.get(cultural_key, service.regional_contexts["rural_india"])
+    return f"""
+        You are an expert teacher who specializes in creating culturally relevant analogies for students. 
+        
+        STUDENT CONTEXT:
+        - Name: {context.name}
+        - Grade: {context.grade}
+        - Region: {context.region}
+        - Local Language: {context.local_language}
+        - Cultural Context: {context.cultural_context}
+        - Familiar Concepts: {', '.join(context.familiar_concepts)}
+        
+        REGIONAL/CULTURAL INFORMATION:
+        - Common local concepts: {', '.join(regional_info['common_concepts'])}
+        - Local occupations: {', '.join(regional_info['occupations'])}
+        - Local festivals: {', '.join(regional_info['festivals'])}
+        - Local food: {', '.join(regional_info['food'])}
+        
+        QUESTION TO EXPLAIN: "{translated_question}"
+        SUBJECT: {req.subject}
+        TOPIC: {req.topic}
+        COMPLEXITY LEVEL: {req.complexity_level}
+        
+        TASK:
+        Create a detailed, culturally relevant analogy that explains the concept in the question using:
+        1. Local and familiar concepts from the student's environment
+        2. Everyday experiences the student can relate to
+        3. Simple language appropriate for grade {context.grade}
+        4. Step-by-step explanation building from familiar to unfamiliar
+        5. Examples from local culture, geography, or daily life
+        
+        STRUCTURE YOUR RESPONSE AS:
+        1. **Simple Explanation**: Start with a basic explanation in simple terms
+        2. **Local Analogy**: Provide a detailed analogy using familiar local concepts
+        3. **Connection**: Clearly connect the analogy back to the original concept
+        4. **Example**: Give a practical example from the student's local environment
+        5. **Summary**: Summarize the key learning points
+        
+        Make sure the analogy is:
+        - Culturally sensitive and appropriate
+        - Age-appropriate for grade {context.grade}
+        - Easy to understand and remember
+        - Relevant to the student's daily life experience
+        """
+
+
+def legacy_exercise_prompt(req):
+    student = req.student_profile
+    return f"""
+        You are an expert educational content creator. Generate {req.exercise_count} personalized practice exercises for a student with the following profile:
+
+        STUDENT PROFILE:
+        - Name: {student.name}
+        - Grade: {student.grade}
+        - Learning Level: {student.learning_level}
+        - Learning Style: {student.learning_style}
+        - Primary Language: {student.language_preference}
+        - Weaknesses: {', '.join(student.weaknesses)}
+        - Strengths: {', '.join(student.strengths)}
+
+        EXERCISE REQUIREMENTS:
+        - Subject: {req.subject}
+        - Topic: {req.topic}
+        - Difficulty Level: {req.difficulty_level}
+        - Exercise Types: {', '.join(req.exercise_types)}
+
+        PERSONALIZATION GUIDELINES:
+        1. Target the student's identified weaknesses while building on their strengths
+        2. Adapt to their learning style:
+           - Visual: Include diagrams, charts, or visual elements
+           - Auditory: Include sound-based or rhythm-based elements
+           - Kinesthetic: Include hands-on or movement-based activities
+           - Reading/Writing: Focus on text-based exercises
+        3. Use appropriate complexity for their learning level
+        4. If language preference is not English, provide translations or explanations in their preferred language
+        5. Create scaffolded exercises that gradually increase in difficulty
+
+        OUTPUT FORMAT:
+        Provide the response as a JSON object with the following structure:
+        {{
+            "exercises": [
+                {{
+                    "id": 1,
+                    "type": "exercise_type",
+                    "question": "exercise question/prompt",
+                    "options": ["option1", "option2", "option3", "option4"] (for multiple choice),
+                    "correct_answer": "correct answer or explanation",
+                    "explanation": "detailed explanation of the solution",
+                    "difficulty": "beginner/intermediate/advanced",
+                    "learning_objective": "what this exercise aims to teach",
+                    "personalization_notes": "how this addresses student's specific needs"
+                }}
+            ]
+        }}
+
+        Generate exercises that are engaging, age-appropriate, and specifically designed to help this student overcome their weaknesses while leveraging their learning style.
+        """
+
+
+def replace_once(text, old, new):
+    assert text.count(old) == 1, old
+    return text.replace(old, new)
+
+
+def reordered_analogy_prompt(legacy, grade):
+    """
+    The original analogy prompt with the documented caching reorder applied
+    """
+    persona, student, regional, question, task, structure, checklist = legacy.split("\n        \n")
+    task = replace_once(task, "in the question using", "in the student's question using")
+    task = replace_once(task, f"for grade {grade}\n", "for the student's grade\n")
+    checklist = replace_once(checklist, f"for grade {grade}\n", "for the student's grade\n")
+    checklist = checklist[:-len("\n        ")]
+    blocks = [persona, regional, task, structure, checklist, student, question]
+    return "\n        \n".join(blocks) + "\n        "
+
+
+def reordered_exercise_prompt(legacy):
+    """
+    The original exercise prompt with the documented caching reorder applied
+    """
+    opening, profile, requirements, guidelines, output_format, closing = legacy.split("\n\n")
+    persona, request_line = opening.split(" Generate ", 1)
+    persona = replace_once(persona, "content creator.", "content creator who generates personalized practice exercises for students.")
+    closing = replace_once(closing, "help this student", "help the student described below")
+    prefix = "\n\n".join([persona, guidelines, output_format, closing])
+    suffix = "\n\n".join(["        Generate " + request_line, profile, requirements])
+    return prefix + "\n" + suffix + "\n        "
+
+
+def check_golden(analogy_service, exercise_service):
+    for question_variant in GOLDEN_VARIANTS:
+        for context_variant in CONTEXT_VARIANTS:
+            data = dict(SAMPLE_ANALOGY_REQUEST, **question_variant)
+            data["student_context"] = dict(SAMPLE_ANALOGY_REQUEST["student_context"], **context_variant)
+            req = generate_local_analogy(data)
+            legacy = legacy_analogy_prompt(analogy_service, req, req.question)
+            expected = reordered_analogy_prompt(legacy, req.student_context.grade)
+            assert str(analogy_service._build_analogy_prompt(req, req.question)) == expected, data
+
+    for profile_variant in [{}, {"weaknesses": [], "name": "{name}"}, {"learning_style": "kinesthetic"}]:
+        data = dict(SAMPLE_EXERCISE_REQUEST, student_profile=dict(SAMPLE_EXERCISE_REQUEST["student_profile"], **profile_variant))
+        req = generate_personalized_exercises(data)
+        expected = reordered_exercise_prompt(legacy_exercise_prompt(req))
+        assert str(exercise_service._create_exercise_prompt(req)) == expected, data
@@ -0,0 +1,66 @@
+import asyncio
+
+import pytest
+
+from analogy_stream import ANALOGY_SECTIONS, PREAMBLE, SectionStreamParser
+from benchmarks.samples import SAMPLE_ANALOGY_REQUEST
+from fake_model import FakeGenerativeModel, default_responder
+from generate_analogy import LocalAnalogyService, generate_local_analogy
+
+ANSWER = "Great question, Guru!\n\n" + "\n".join(
+    f"{index}. **{name}**: {name.lower()} text." for index, name in enumerate(ANALOGY_SECTIONS, 1))
+
+
+def parse(text: str, chunk_size: int):
+    parser = SectionStreamParser()
+    sections = []
+    for start in range(0, len(text), chunk_size):
+        sections.extend(parser.feed(text[start:start + chunk_size]))
+    return sections + parser.finish()
+
+
+@pytest.mark.parametrize("chunk_size", [1, 7, len(ANSWER)])
+def test_sections_and_preamble_survive_any_chunking(chunk_size):
+    sections = parse(ANSWER, chunk_size)
+    assert sections[0] == (PREAMBLE, "Great question, Guru!")
+    assert [name for name, _ in sections[1:]] == ANALOGY_SECTIONS
+    assert sections[-1] == ("Summary", "5. **Summary**: summary text.")
+
+
+def test_no_preamble_without_leading_text():
+    assert [name for name, _ in parse(ANSWER.split("\n\n", 1)[1], 5)] == ANALOGY_SECTIONS
+
+
+def test_unstructured_text_is_one_section():
+    assert parse("Rain falls when clouds get heavy.", 4) == [(ANALOGY_SECTIONS[0], "Rain falls when clouds get heavy.")]
+
+
+def answer_with_preamble(prompt: str) -> str:
+    return ANSWER if "STUDENT CONTEXT" in prompt else default_responder(prompt)
+
+
+def collect(events):
+    events = list(events)
+    return [event for event in events if event["event"] != "chunk"], events[-1]["result"]
+
+
+def test_translated_stream_keeps_the_preamble():
+    analogies = LocalAnalogyService(model=FakeGenerativeModel(responder=answer_with_preamble))
+    events, result = collect(analogies.generate_analogy_stream(generate_local_analogy(SAMPLE_ANALOGY_REQUEST)))
+    assert [event["event"] for event in events[:3]] == ["question", "preamble", "section"]
+    assert events[1]["text"] == "Great question, Guru!"
+    # The fake model's translation echoes the English text
+    assert result["analogy"].startswith("Great question, Guru!\n1. **Simple Explanation**")
+    assert result["analogy"].count("**") == 2 * len(ANALOGY_SECTIONS)
+
+
+def test_async_translated_stream_keeps_the_preamble():
+    analogies = LocalAnalogyService(model=FakeGenerativeModel(responder=answer_with_preamble))
+
+    async def run():
+        return [event async for event in analogies.agenerate_analogy_stream(
+            generate_local_analogy(SAMPLE_ANALOGY_REQUEST))]
+
+    events, result = collect(asyncio.run(run()))
+    assert events[1] == {"event": "preamble", "text": "Great question, Guru!"}
+    assert result["analogy"].startswith("Great question, Guru!\n")
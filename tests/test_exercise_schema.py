@@ -0,0 +1,90 @@
+from dataclasses import dataclass, field
+from typing import List, Optional
+
+import pytest
+
+from exercise_schema import compile_validator, schema_from_dataclass
+from personalized_exercise import EXERCISE_SCHEMA, validate_exercise
+
+
+def valid_exercise(**overrides):
+    exercise = {
+        "id": 1,
+        "type": "multiple_choice",
+        "question": "What is 2 + 2?",
+        "options": ["3", "4"],
+        "correct_answer": "4",
+        "explanation": "Two and two make four.",
+        "difficulty": "beginner",
+        "learning_objective": "Addition",
+        "personalization_notes": "Uses counting on fingers",
+    }
+    exercise.update(overrides)
+    return exercise
+
+
+@dataclass
+class Item:
+    name: str
+    count: int
+    price: float = 0.0
+    tags: List[str] = field(default_factory=list)
+    note: Optional[str] = None
+
+
+def test_schema_from_dataclass():
+    assert schema_from_dataclass(Item) == {
+        "type": "object",
+        "properties": {
+            "name": {"type": "string"},
+            "count": {"type": "integer"},
+            "price": {"type": "number"},
+            "tags": {"type": "array", "items": {"type": "string"}},
+            "note": {"type": "string", "nullable": True},
+        },
+        "required": ["name", "count"],
+    }
+
+
+def test_exercise_schema_requires_fields_without_defaults():
+    assert "options" not in EXERCISE_SCHEMA["required"]
+    assert "personalization_notes" in EXERCISE_SCHEMA["required"]
+
+
+def test_valid_exercise_has_no_errors():
+    assert validate_exercise(valid_exercise()) == []
+    assert validate_exercise(valid_exercise(options=None)) == []
+
+
+def test_missing_field_is_reported():
+    exercise = valid_exercise()
+    del exercise["personalization_notes"]
+    assert validate_exercise(exercise) == ["$.personalization_notes: missing"]
+
+
+@pytest.mark.parametrize("overrides, error", [
+    ({"id": "1"}, "$.id: expected integer"),
+    ({"id": True}, "$.id: expected integer"),
+    ({"question": None}, "$.question: expected string"),
+    ({"options": "4"}, "$.options: expected array"),
+    ({"options": ["3", 4]}, "$.options[1]: expected string"),
+])
+def test_wrong_types_are_reported_with_their_path(overrides, error):
+    assert validate_exercise(valid_exercise(**overrides)) == [error]
+
+
+def test_every_error_is_collected():
+    errors = validate_exercise({"id": 1.5, "question": 3})
+    assert "$.id: expected integer" in errors
+    assert "$.question: expected string" in errors
+    assert "$.type: missing" in errors
+
+
+def test_non_object_is_rejected():
+    assert validate_exercise(["not", "an", "object"]) == ["$: expected object"]
+
+
+def test_number_accepts_integers_but_not_booleans():
+    validate = compile_validator(schema_from_dataclass(Item))
+    assert validate({"name": "pen", "count": 2, "price": 10}) == []
+    assert validate({"name": "pen", "count": 2, "price": False}) == ["$.price: expected number"]
@@ -0,0 +1,107 @@
+import dataclasses
+import json
+
+import pytest
+
+from generate_analogy import (AnalogyRequest, FrozenAnalogyRequest, FrozenStudentContext, StudentContext,
+                              frozen_analogy_request_decoder)
+from personalized_exercise import (ExerciseRequest, FrozenExerciseRequest, FrozenStudentProfile, StudentProfile,
+                                   frozen_exercise_request_decoder)
+from request_decoding import request_digest
+
+
+def analogy_request(**changes) -> AnalogyRequest:
+    context = StudentContext(student_id="7", name="Asha", grade=5, familiar_concepts=["well", "bullock cart"])
+    return dataclasses.replace(AnalogyRequest(context, "Why does it rain?", subject="Science"), **changes)
+
+
+def exercise_request(**changes) -> ExerciseRequest:
+    profile = StudentProfile(student_id="7", name="Asha", grade=5, weaknesses=["fractions"], strengths=["addition"])
+    return dataclasses.replace(ExerciseRequest(profile, exercise_types=["multiple_choice", "true_false"]), **changes)
+
+
+def test_analogy_request_equality_and_hash():
+    first = FrozenAnalogyRequest.from_request(analogy_request())
+    second = FrozenAnalogyRequest.from_request(analogy_request())
+    assert first == second and first is not second
+    assert first.cache_key == second.cache_key == request_digest(first)
+    assert hash(first) == hash(second) == hash(first.cache_key)
+    assert {first: "cached"}[second] == "cached"
+
+
+def test_exercise_request_equality_and_hash():
+    first = FrozenExerciseRequest.from_request(exercise_request())
+    second = FrozenExerciseRequest.from_request(exercise_request())
+    assert first == second and first is not second
+    assert first.cache_key == second.cache_key == request_digest(first)
+    assert hash(first) == hash(second) == hash(first.cache_key)
+    assert len({first, second}) == 1
+
+
+@pytest.mark.parametrize("changes", [
+    {"question": "Why is the sky blue?"},
+    {"preferred_language": "Hindi"},
+    {"student_context": StudentContext(student_id="7", name="Asha", grade=6,
+                                       familiar_concepts=["well", "bullock cart"])},
+    {"student_context": StudentContext(student_id="7", name="Asha", grade=5,
+                                       familiar_concepts=["bullock cart", "well"])},
+])
+def test_different_analogy_requests_get_different_keys(changes):
+    base = FrozenAnalogyRequest.from_request(analogy_request())
+    other = FrozenAnalogyRequest.from_request(analogy_request(**changes))
+    assert base != other
+    assert base.cache_key != other.cache_key
+
+
+@pytest.mark.parametrize("changes", [
+    {"topic": "Fractions"},
+    {"exercise_count": 3},
+    {"exercise_types": ["true_false", "multiple_choice"]},
+])
+def test_different_exercise_requests_get_different_keys(changes):
+    base = FrozenExerciseRequest.from_request(exercise_request())
+    other = FrozenExerciseRequest.from_request(exercise_request(**changes))
+    assert base != other
+    assert base.cache_key != other.cache_key
+
+
+def test_frozen_requests_are_immutable():
+    analogy = FrozenAnalogyRequest.from_request(analogy_request())
+    exercise = FrozenExerciseRequest.from_request(exercise_request())
+    with pytest.raises(dataclasses.FrozenInstanceError):
+        analogy.question = "changed"
+    with pytest.raises(dataclasses.FrozenInstanceError):
+        analogy.student_context.grade = 6
+    with pytest.raises(dataclasses.FrozenInstanceError):
+        exercise.student_profile.name = "changed"
+    assert isinstance(analogy.student_context.familiar_concepts, tuple)
+    assert isinstance(exercise.exercise_types, tuple)
+
+
+def test_conversion_keeps_every_field():
+    request = analogy_request()
+    frozen = FrozenAnalogyRequest.from_request(request)
+    assert frozen.student_context == FrozenStudentContext("7", "Asha", 5, familiar_concepts=("well", "bullock cart"))
+    assert (frozen.question, frozen.subject) == (request.question, request.subject)
+
+    profile = exercise_request().student_profile
+    assert FrozenStudentProfile.from_profile(profile) == FrozenStudentProfile(
+        "7", "Asha", 5, weaknesses=("fractions",), strengths=("addition",))
+
+
+def test_decoders_build_the_same_frozen_requests():
+    request = analogy_request()
+    body = json.dumps(dataclasses.asdict(request)).encode("utf-8")
+    decoded = frozen_analogy_request_decoder.decode(body)
+    assert decoded == FrozenAnalogyRequest.from_request(request)
+    assert decoded.cache_key == FrozenAnalogyRequest.from_request(request).cache_key
+
+    exercise = exercise_request()
+    body = json.dumps(dataclasses.asdict(exercise)).encode("utf-8")
+    assert frozen_exercise_request_decoder.decode(body) == FrozenExerciseRequest.from_request(exercise)
+
+
+def test_cache_key_is_left_out_of_repr_and_comparison():
+    frozen = FrozenAnalogyRequest.from_request(analogy_request())
+    assert "cache_key" not in repr(frozen)
+    assert "cache_key" not in [f.name for f in dataclasses.fields(frozen) if f.compare]
@@ -0,0 +1,128 @@
+import asyncio
+import re
+import threading
+
+from fake_model import FakeGenerativeModel
+from generate_analogy import AnalogyRequest, LocalAnalogyService, StudentContext
+from response_cache import InMemoryLRUCache
+from semantic_cache import SemanticQuestionCache
+from single_flight import SingleFlight
+
+
+def personal_responder(prompt: str) -> str:
+    name = re.search(r"- Name: (.*)", prompt).group(1).strip()
+    concepts = re.search(r"- Familiar Concepts: (.*)", prompt).group(1).strip()
+    return f"Hi {name}, think of {concepts}."
+
+
+def request(name: str, concepts) -> AnalogyRequest:
+    return AnalogyRequest(StudentContext(student_id=name.lower(), name=name, familiar_concepts=concepts),
+                          "Why does it rain?", subject="Science")
+
+
+def service() -> LocalAnalogyService:
+    model = FakeGenerativeModel(latency=0.2, responder=personal_responder)
+    return LocalAnalogyService(model=model, single_flight=SingleFlight())
+
+
+def generate_together(analogies: LocalAnalogyService, requests):
+    results = [None] * len(requests)
+    barrier = threading.Barrier(len(requests))
+
+    def run(index):
+        barrier.wait()
+        results[index] = analogies.generate_analogy(requests[index])
+
+    threads = [threading.Thread(target=run, args=(index,)) for index in range(len(requests))]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return results
+
+
+def test_concurrent_requests_with_other_concepts_are_not_coalesced():
+    analogies = service()
+    guru, asha = generate_together(analogies, [request("Guru", ["farming"]), request("Asha", ["cricket"])])
+    assert guru["analogy"] == "Hi Guru, think of farming."
+    assert asha["analogy"] == "Hi Asha, think of cricket."
+    assert analogies.single_flight.metrics.coalesced == 0
+
+
+def test_coalesced_request_gets_its_own_name():
+    analogies = service()
+    guru, asha = generate_together(analogies, [request("Guru", ["farming"]), request("Asha", [" Farming"])])
+    assert analogies.single_flight.metrics.coalesced == 1
+    # Either request may lead; each student still sees their own name
+    assert guru["analogy"].lower() == "hi guru, think of farming."
+    assert asha["analogy"].lower() == "hi asha, think of farming."
+    assert asha["student_id"] == "asha"
+
+
+def test_async_coalescing_respects_concepts_and_names():
+    analogies = service()
+
+    async def run():
+        return await asyncio.gather(
+            analogies.agenerate_analogy(request("Guru", ["farming"])),
+            analogies.agenerate_analogy(request("Asha", ["cricket"])),
+            analogies.agenerate_analogy(request("Ravi", ["farming"])),
+        )
+
+    guru, asha, ravi = asyncio.run(run())
+    assert guru["analogy"] == "Hi Guru, think of farming."
+    assert asha["analogy"] == "Hi Asha, think of cricket."
+    assert ravi["analogy"] == "Hi Ravi, think of farming."
+    assert analogies.single_flight.metrics.coalesced == 1
+
+
+class SameVectorEmbedder:
+    """
+    Every question embeds to the same unit vector, so any stored question matches
+    """
+    dim = 1
+
+    def embed(self, texts):
+        return [[1.0] for _ in texts]
+
+
+class ListIndex:
+    def __init__(self, dim):
+        self.items = []
+
+    def add(self, vector, payload):
+        self.items.append((vector, payload))
+
+    def search(self, vector, k=1):
+        return [(sum(a * b for a, b in zip(vector, stored)), payload) for stored, payload in self.items[:k]]
+
+    def __len__(self):
+        return len(self.items)
+
+
+def options_responder(prompt: str) -> str:
+    fields = [re.search(rf"{label}: (.*)", prompt).group(1).strip() for label in ("COMPLEXITY LEVEL", "SUBJECT", "TOPIC")]
+    return "answer for " + "/".join(fields)
+
+
+def test_semantic_hits_stay_within_the_request_options():
+    semantic_cache = SemanticQuestionCache(embedder=SameVectorEmbedder(), index_factory=ListIndex)
+    analogies = LocalAnalogyService(model=FakeGenerativeModel(responder=options_responder),
+                                    semantic_cache=semantic_cache, response_cache=InMemoryLRUCache())
+    context = StudentContext(name="Asha")
+
+    def ask(question, **options):
+        return analogies.generate_analogy(AnalogyRequest(context, question, **options))["analogy"]
+
+    assert ask("Why does it rain?", subject="Science", topic="Weather") == "answer for simple/Science/Weather"
+    assert ask("Why do clouds rain?", subject="Science", topic="Weather") == "answer for simple/Science/Weather"
+    assert semantic_cache.metrics.hits == 1
+
+    assert ask("Why does it rain?", subject="Science", topic="Weather",
+               complexity_level="advanced") == "answer for advanced/Science/Weather"
+    assert ask("Why does it rain?", subject="Geography", topic="Weather") == "answer for simple/Geography/Weather"
+    assert ask("Why does it rain?", subject="Science", topic="Water cycle") == "answer for simple/Science/Water cycle"
+    assert semantic_cache.metrics.hits == 1
+    # Nothing from the other scopes was copied into the exact cache either
+    assert ask("Why does it rain?", subject="Science", topic="Weather",
+               complexity_level="advanced") == "answer for advanced/Science/Weather"
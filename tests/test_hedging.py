@@ -0,0 +1,105 @@
+import asyncio
+import threading
+import time
+
+import pytest
+
+from hedging import Hedger
+
+
+def attempts(*behaviours):
+    """
+    fn whose n-th invocation sleeps, then returns or raises, as behaviours[n] says
+    """
+    lock = threading.Lock()
+    calls = []
+
+    def fn():
+        with lock:
+            index = len(calls)
+            calls.append(index)
+        seconds, outcome = behaviours[min(index, len(behaviours) - 1)]
+        time.sleep(seconds)
+        if isinstance(outcome, Exception):
+            raise outcome
+        return outcome
+    return fn, calls
+
+
+def test_fast_calls_are_not_hedged():
+    hedger = Hedger(initial_delay=0.5)
+    fn, calls = attempts((0, "primary"))
+    assert hedger.call(fn) == "primary"
+    assert calls == [0]
+    assert hedger.metrics.hedged == 0
+
+
+def test_backup_wins_when_the_primary_is_slow():
+    hedger = Hedger(initial_delay=0.02)
+    fn, calls = attempts((0.5, "primary"), (0, "backup"))
+    assert hedger.call(fn) == "backup"
+    assert len(calls) == 2
+    assert (hedger.metrics.hedged, hedger.metrics.hedge_wins) == (1, 1)
+
+
+def test_async_backup_wins_and_the_primary_is_cancelled():
+    hedger = Hedger(initial_delay=0.02)
+    started, cancelled = [], []
+
+    async def fn():
+        first = not started
+        started.append(True)
+        try:
+            await asyncio.sleep(0.5 if first else 0)
+        except asyncio.CancelledError:
+            cancelled.append(True)
+            raise
+        return "primary" if first else "backup"
+
+    async def run():
+        result = await hedger.acall(fn)
+        await asyncio.sleep(0)
+        return result
+
+    assert asyncio.run(run()) == "backup"
+    assert cancelled == [True]
+    assert hedger.metrics.hedge_wins == 1
+
+
+def test_hedges_are_capped_by_the_budget():
+    hedger = Hedger(initial_delay=0.02, budget=0.0, burst=1)
+    for _ in range(3):
+        fn, _ = attempts((0.1, "primary"), (0, "backup"))
+        hedger.call(fn)
+    assert hedger.metrics.hedged == 1
+    # Once the budget is spent, sync calls are not handed to the hedge workers at all
+    assert hedger.metrics.inline == 2
+
+    async def run():
+        for _ in range(2):
+            fn, _ = attempts((0.1, "primary"), (0, "backup"))
+            await hedger.acall(lambda: asyncio.to_thread(fn))
+
+    asyncio.run(run())
+    assert hedger.metrics.hedged == 1
+    assert hedger.metrics.budget_denied == 2
+
+
+def test_errors_propagate():
+    hedger = Hedger(initial_delay=0.5)
+    fn, calls = attempts((0, ValueError("bad request")))
+    with pytest.raises(ValueError, match="bad request"):
+        hedger.call(fn)
+    assert calls == [0]
+
+    hedger = Hedger(initial_delay=0.02)
+    fn, calls = attempts((0.1, ValueError("primary failed")), (0.2, ValueError("backup failed")))
+    with pytest.raises(ValueError, match="primary failed"):
+        hedger.call(fn)
+    assert len(calls) == 2
+
+
+def test_a_failed_primary_falls_back_to_the_backup():
+    hedger = Hedger(initial_delay=0.02)
+    fn, _ = attempts((0.1, ValueError("primary failed")), (0.2, "backup"))
+    assert hedger.call(fn) == "backup"
@@ -0,0 +1,47 @@
+import json
+
+import pytest
+
+from json_repair import loads_tolerant, repair_json
+
+
+def test_valid_json_needs_no_repair():
+    assert loads_tolerant('{"exercises": []}') == ({"exercises": []}, False)
+
+
+@pytest.mark.parametrize("text", [
+    '```json\n{"a": 1}\n```',
+    'Here are the exercises: {"a": 1} Hope this helps!',
+])
+def test_code_fences_and_prose_are_unwrapped_without_counting_as_repair(text):
+    assert loads_tolerant(text) == ({"a": 1}, False)
+
+
+@pytest.mark.parametrize("text, expected", [
+    ('{"a": [1, 2,],}', {"a": [1, 2]}),
+    ('{"q": "Say "hello" twice"}', {"q": 'Say "hello" twice'}),
+    ('{"q": "first line\nsecond\tline"}', {"q": "first line\nsecond\tline"}),
+    ('{"a": [1, 2}', {"a": [1, 2]}),
+])
+def test_malformed_json_is_repaired(text, expected):
+    assert loads_tolerant(text) == (expected, True)
+
+
+def test_truncated_output_drops_the_half_written_item():
+    text = '{"exercises": [{"id": 1, "question": "2 + 2?"}, {"id": 2, "question": "What is'
+    assert json.loads(repair_json(text)) == {"exercises": [{"id": 1, "question": "2 + 2?"}]}
+
+
+def test_truncated_right_after_an_item_keeps_it():
+    text = '```json\n{"exercises": [{"id": 1}, {"id": 2},'
+    assert loads_tolerant(text) == ({"exercises": [{"id": 1}, {"id": 2}]}, True)
+
+
+def test_escapes_inside_strings_are_kept():
+    text = '{"q": "a \\"quoted\\" word", "r": [1,]}'
+    assert loads_tolerant(text) == ({"q": 'a "quoted" word', "r": [1]}, True)
+
+
+def test_text_without_json_raises():
+    with pytest.raises(json.JSONDecodeError):
+        loads_tolerant("Sorry, I cannot help with that.")
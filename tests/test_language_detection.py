@@ -0,0 +1,73 @@
+import pytest
+
+from language_detection import LanguageDetector
+
+
+@pytest.fixture(scope="module")
+def detector():
+    return LanguageDetector()
+
+
+@pytest.mark.parametrize("text, language, script, romanized", [
+    ("why does it rain", "English", "Latin", False),
+    ("ye barish kyu hoti hai", "Hindi", "Latin", True),
+    ("बारिश क्यों होती है?", "Hindi", "Devanagari", False),
+    ("पाऊस का पडतो? मला सांगा", "Marathi", "Devanagari", False),
+    ("மழை ஏன் பெய்கிறது", "Tamil", "Tamil", False),
+    ("বৃষ্টি কেন হয়", "Bengali", "Bengali", False),
+    ("ৰাতি কিয় হয়", "Assamese", "Bengali", False),
+    ("વરસાદ કેમ પડે છે", "Gujarati", "Gujarati", False),
+])
+def test_samples(detector, text, language, script, romanized):
+    detection = detector.detect(text)
+    assert (detection.language, detection.script, detection.romanized) == (language, script, romanized)
+    assert detection.confidence > 0
+
+
+@pytest.mark.parametrize("text", [
+    "why does it rain",
+    "ye barish kyu hoti hai",
+    "बारिश क्यों होती है?",
+    "மழை ஏன் பெய்கிறது",
+])
+def test_clear_samples_skip_the_llm_fallback(detector, text):
+    assert detector.is_confident(detector.detect(text))
+
+
+def test_devanagari_with_markers_of_both_languages_is_not_confident(detector):
+    # "का" is also a Hindi marker, so Marathi wins only tentatively
+    detection = detector.detect("पाऊस का पडतो? मला सांगा")
+    assert detection.language == "Marathi"
+    assert not detector.is_confident(detection)
+    assert detector.is_confident(detector.detect("मला पाऊस आवडतो"))
+
+
+@pytest.mark.parametrize("text", ["", "?!", "12345"])
+def test_no_letters_means_no_confidence(detector, text):
+    detection = detector.detect(text)
+    assert detection.confidence == 0.0
+    assert detection.script == "Unknown"
+    assert not detector.is_confident(detection)
+
+
+def test_unsupported_language_is_not_confident():
+    detector = LanguageDetector(supported_languages=["English"])
+    detection = detector.detect("बारिश क्यों होती है?")
+    assert detection.language == "Hindi"
+    assert detection.confidence == 0.0
+    assert detector.is_confident(detector.detect("why does it rain"))
+
+
+def test_mixed_scripts_lower_the_confidence(detector):
+    pure = detector.detect("மழை ஏன் பெய்கிறது")
+    mixed = detector.detect("மழை ஏன் பெய்கிறது rain")
+    assert mixed.language == "Tamil"
+    assert mixed.confidence < pure.confidence
+
+
+@pytest.mark.parametrize("text", ["पाणी गरम होते", "झाडे पाणी पितात", "सूर्य पूर्वेला उगवतो"])
+def test_unmarked_devanagari_is_left_to_the_model(detector, text):
+    # No Hindi or Marathi marker words: the Hindi guess must not skip the model fallback
+    detection = detector.detect(text)
+    assert detection.script == "Devanagari"
+    assert not detector.is_confident(detection)
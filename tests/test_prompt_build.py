@@ -0,0 +1,52 @@
+import pytest
+
+from benchmarks.samples import SAMPLE_ANALOGY_REQUEST, SAMPLE_EXERCISE_REQUEST
+from fake_model import FakeGenerativeModel
+from generate_analogy import LocalAnalogyService, generate_local_analogy
+from personalized_exercise import PersonalizedExerciseService, generate_personalized_exercises
+from tests.golden_prompts import (
+    check_golden, legacy_analogy_prompt, legacy_exercise_prompt, reordered_analogy_prompt,
+    reordered_exercise_prompt
+)
+
+
+@pytest.fixture
+def analogy_service():
+    return LocalAnalogyService(model=FakeGenerativeModel())
+
+
+@pytest.fixture
+def exercise_service():
+    return PersonalizedExerciseService(model=FakeGenerativeModel())
+
+
+def test_prompts_match_golden(analogy_service, exercise_service):
+    check_golden(analogy_service, exercise_service)
+
+
+def test_user_input_braces_are_literal(analogy_service):
+    req = generate_local_analogy(dict(SAMPLE_ANALOGY_REQUEST, question="What is {x} + {{y}}?"))
+    prompt = analogy_service._build_analogy_prompt(req, req.question)
+    assert 'QUESTION TO EXPLAIN: "What is {x} + {{y}}?"' in prompt.suffix
+
+
+def test_analogy_prefix_is_the_same_for_every_student(analogy_service):
+    first = generate_local_analogy(SAMPLE_ANALOGY_REQUEST)
+    context = dict(SAMPLE_ANALOGY_REQUEST["student_context"], name="Ravi", grade=9)
+    second = generate_local_analogy(dict(SAMPLE_ANALOGY_REQUEST, student_context=context, question="What is gravity?"))
+    a = analogy_service._build_analogy_prompt(first, first.question)
+    b = analogy_service._build_analogy_prompt(second, second.question)
+    assert (a.prefix_key, a.prefix) == (b.prefix_key, b.prefix)
+    assert a.suffix != b.suffix
+
+
+def test_reorder_rejects_other_changes(analogy_service):
+    req = generate_local_analogy(SAMPLE_ANALOGY_REQUEST)
+    legacy = legacy_analogy_prompt(analogy_service, req, req.question)
+    with pytest.raises(AssertionError):
+        reordered_analogy_prompt(legacy.replace("in the question using", "in a question using"),
+                                 req.student_context.grade)
+
+    exercise_request = generate_personalized_exercises(SAMPLE_EXERCISE_REQUEST)
+    with pytest.raises(AssertionError):
+        reordered_exercise_prompt(legacy_exercise_prompt(exercise_request).replace("help this student", "help them"))
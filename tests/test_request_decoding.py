@@ -0,0 +1,117 @@
+from dataclasses import dataclass, field
+from typing import List, Optional, Tuple
+
+import pytest
+
+from generate_analogy import AnalogyRequest, StudentContext, analogy_request_decoder, generate_local_analogy
+from personalized_exercise import ExerciseRequest, generate_personalized_exercises
+from request_decoding import DecodeError, Decoder, request_digest
+
+
+@dataclass
+class Point:
+    x: float
+    y: float = 0.0
+
+
+@dataclass
+class Shape:
+    name: str
+    points: List[Point] = field(default_factory=list)
+    tags: Tuple[str, ...] = ()
+    label: Optional[str] = None
+
+
+decoder = Decoder(Shape)
+
+
+def errors_for(payload) -> List[str]:
+    with pytest.raises(DecodeError) as raised:
+        decoder.convert(payload)
+    return raised.value.errors
+
+
+def test_decodes_nested_dataclasses_with_defaults():
+    shape = decoder.decode(b'{"name": "tri", "points": [{"x": 1}, {"x": 2.5, "y": 3}], "tags": ["a"]}')
+    assert shape == Shape("tri", [Point(1.0), Point(2.5, 3.0)], ("a",))
+    assert isinstance(shape.points[0].x, float)
+
+
+def test_unknown_fields_are_ignored():
+    assert decoder.convert({"name": "dot", "colour": "red"}) == Shape("dot")
+
+
+def test_missing_required_field():
+    assert errors_for({}) == ["$.name: missing required field"]
+
+
+@pytest.mark.parametrize("payload, error", [
+    ({"name": 7}, "$.name: expected string, got integer"),
+    ({"name": None}, "$.name: expected string, got null"),
+    ({"name": "a", "points": {}}, "$.points: expected array, got object"),
+    ({"name": "a", "points": [{"x": "1"}]}, "$.points[0].x: expected number, got string"),
+    ({"name": "a", "points": [{"x": True}]}, "$.points[0].x: expected number, got boolean"),
+    ({"name": "a", "points": [3]}, "$.points[0]: expected object, got integer"),
+    ({"name": "a", "tags": ["ok", 2]}, "$.tags[1]: expected string, got integer"),
+    ({"name": "a", "label": []}, "$.label: expected string, got array"),
+])
+def test_errors_name_the_path_and_both_types(payload, error):
+    assert errors_for(payload) == [error]
+
+
+def test_every_error_is_reported():
+    errors = errors_for({"name": 1, "points": [{"y": 1}, {"x": 1, "y": "2"}]})
+    assert errors == [
+        "$.name: expected string, got integer",
+        "$.points[0].x: missing required field",
+        "$.points[1].y: expected number, got string",
+    ]
+    with pytest.raises(DecodeError, match="; "):
+        decoder.convert({"name": 1, "points": [{}]})
+
+
+def test_invalid_json():
+    with pytest.raises(DecodeError) as raised:
+        decoder.decode(b'{"name": ')
+    assert raised.value.errors[0].startswith("$: invalid JSON")
+
+
+def test_top_level_type_mismatch():
+    with pytest.raises(DecodeError) as raised:
+        Decoder(List[Point]).convert({"x": 1})
+    assert raised.value.errors == ["$: expected array, got object"]
+
+
+def test_analogy_request_decoder_matches_the_dataclass_defaults():
+    request = analogy_request_decoder.decode(b'{"student_context": {"name": "Asha"}, "question": "Why?"}')
+    assert request == AnalogyRequest(StudentContext(name="Asha"), "Why?")
+
+
+def test_request_digest_is_stable_and_content_based():
+    first = AnalogyRequest(StudentContext(name="Asha", familiar_concepts=["well"]), "Why?")
+    same = AnalogyRequest(StudentContext(name="Asha", familiar_concepts=["well"]), "Why?")
+    other = AnalogyRequest(StudentContext(name="Asha", familiar_concepts=["river"]), "Why?")
+    assert request_digest(first) == request_digest(same)
+    assert request_digest(first) != request_digest(other)
+    assert len(request_digest(first)) == 16
+
+
+@pytest.mark.parametrize("parse", [generate_local_analogy, generate_personalized_exercises])
+def test_api_functions_return_an_error_dict_for_invalid_payloads(parse):
+    result = parse({})
+    assert result["success"] is False
+    assert result["errors"] and all(error.endswith("missing required field") for error in result["errors"])
+    assert parse(b"{")["error"].startswith("$: invalid JSON")
+
+
+def test_exercise_api_function_reports_every_invalid_field():
+    result = generate_personalized_exercises({"student_profile": {"grade": "5"}, "exercise_count": "3"})
+    assert result == {
+        "success": False,
+        "error": "$.student_profile.grade: expected integer, got string; $.exercise_count: expected integer, got string",
+        "errors": [
+            "$.student_profile.grade: expected integer, got string",
+            "$.exercise_count: expected integer, got string",
+        ],
+    }
+    assert isinstance(generate_personalized_exercises({"student_profile": {}}), ExerciseRequest)
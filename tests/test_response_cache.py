@@ -0,0 +1,82 @@
+import time
+
+import pytest
+
+from response_cache import InMemoryLRUCache, LocalRedisStandIn, RedisCache, SQLiteCache, grade_band, make_cache_key
+
+
+@pytest.fixture(params=["memory", "sqlite", "redis"])
+def make_cache(request, tmp_path):
+    def make(**options):
+        if request.param == "memory":
+            return InMemoryLRUCache(**options)
+        if request.param == "sqlite":
+            return SQLiteCache(str(tmp_path / "cache.sqlite3"), **options)
+        return RedisCache(client=LocalRedisStandIn(), **options)
+    return make
+
+
+def pause():
+    # Distinct access times for the backends that order by timestamp
+    time.sleep(0.002)
+
+
+def test_round_trip_and_metrics(make_cache):
+    cache = make_cache()
+    assert cache.get("missing") is None
+    cache.set("key", {"analogy": "a well fills in the monsoon", "grade": 5})
+    assert cache.get("key") == {"analogy": "a well fills in the monsoon", "grade": 5}
+    assert len(cache) == 1
+    assert (cache.metrics.hits, cache.metrics.misses, cache.metrics.sets) == (1, 1, 1)
+
+
+def test_least_recently_used_entry_is_evicted(make_cache):
+    cache = make_cache(max_entries=2)
+    cache.set("a", 1)
+    pause()
+    cache.set("b", 2)
+    pause()
+    assert cache.get("a") == 1
+    pause()
+    cache.set("c", 3)
+    assert cache.get("b") is None
+    assert (cache.get("a"), cache.get("c")) == (1, 3)
+    assert len(cache) == 2
+    assert cache.metrics.evictions == 1
+
+
+def test_entries_expire_after_their_ttl(make_cache):
+    cache = make_cache(default_ttl=0.05)
+    cache.set("short", "gone soon")
+    cache.set("long", "kept", ttl=60)
+    assert cache.get("short") == "gone soon"
+    time.sleep(0.1)
+    assert cache.get("short") is None
+    assert cache.get("long") == "kept"
+
+
+def test_delete_and_clear(make_cache):
+    cache = make_cache()
+    cache.set("a", 1)
+    cache.set("b", 2)
+    cache.delete("a")
+    assert cache.get("a") is None
+    cache.clear()
+    assert len(cache) == 0
+
+
+def test_redis_drops_expired_keys_before_evicting_live_ones():
+    cache = RedisCache(client=LocalRedisStandIn(), max_entries=2)
+    cache.set("short", 1, ttl=0.05)
+    cache.set("live", 2)
+    time.sleep(0.1)
+    cache.set("new", 3)
+    assert (cache.get("live"), cache.get("new")) == (2, 3)
+    assert (cache.metrics.expirations, cache.metrics.evictions) == (1, 0)
+
+
+def test_cache_key_normalizes_text_and_bands_grades():
+    key = make_cache_key("Why does it rain?", "rural_india", 4, "Science", "Weather", "simple", "English")
+    assert key == make_cache_key("  why does IT rain? ", "rural_india", 5, "science", "weather", "Simple", "english")
+    assert key != make_cache_key("Why does it rain?", "rural_india", 6, "Science", "Weather", "simple", "English")
+    assert grade_band(4) == "3-5"
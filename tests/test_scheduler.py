@@ -0,0 +1,101 @@
+import asyncio
+import threading
+import time
+
+import pytest
+
+from scheduler import Priority, RateLimits, Scheduler
+
+
+class ApiError(Exception):
+    def __init__(self, code: int):
+        super().__init__(f"HTTP {code}")
+        self.code = code
+
+
+def failing_then(result, *codes):
+    """
+    fn raising an ApiError for each code in turn, then returning result
+    """
+    remaining = list(codes)
+    calls = []
+
+    def fn():
+        calls.append(time.monotonic())
+        if remaining:
+            raise ApiError(remaining.pop(0))
+        return result
+    return fn, calls
+
+
+def test_interactive_calls_are_admitted_before_queued_bulk_calls():
+    scheduler = Scheduler(default_limits=RateLimits(requests_per_minute=600))
+    # Spend the burst so the next admissions wait on the refill (10 per second)
+    for _ in range(600):
+        scheduler.acquire("m", 1)
+    order = []
+
+    def call(label, priority):
+        scheduler.call("m", 1, lambda: order.append(label), priority)
+
+    threads = []
+    for label, priority in [("bulk-1", Priority.BULK), ("bulk-2", Priority.BULK), ("interactive", Priority.INTERACTIVE)]:
+        thread = threading.Thread(target=call, args=(label, priority))
+        thread.start()
+        threads.append(thread)
+        while sum(scheduler.queue_depth().values()) < len(threads):
+            time.sleep(0.001)
+    for thread in threads:
+        thread.join()
+    assert order == ["interactive", "bulk-1", "bulk-2"]
+
+
+def test_rate_limited_calls_are_retried():
+    scheduler = Scheduler(default_limits=RateLimits(requests_per_minute=60_000), base_backoff=0.001)
+    fn, calls = failing_then("ok", 429, 503)
+    assert scheduler.call("m", 10, fn) == "ok"
+    assert len(calls) == 3
+    assert (scheduler.metrics.throttled, scheduler.metrics.retries) == (1, 2)
+
+
+def test_other_errors_and_exhausted_retries_propagate():
+    scheduler = Scheduler(default_limits=RateLimits(requests_per_minute=60_000), base_backoff=0.001, max_retries=1)
+    fn, calls = failing_then("ok", 400)
+    with pytest.raises(ApiError):
+        scheduler.call("m", 10, fn)
+    assert len(calls) == 1
+
+    fn, calls = failing_then("ok", 429, 429)
+    with pytest.raises(ApiError):
+        scheduler.call("m", 10, fn)
+    assert len(calls) == 2
+
+
+def test_aimd_rate_factor():
+    scheduler = Scheduler(default_limits=RateLimits(requests_per_minute=60_000), base_backoff=0.001,
+                          decrease_factor=0.5, increase_step=0.05, min_rate_factor=0.2)
+    fn, _ = failing_then("ok", 429)
+    scheduler.call("m", 10, fn)
+    # Halved by the 429, then one additive step for the successful retry
+    assert scheduler.stats()["rate_factor"]["m"] == pytest.approx(0.55)
+
+    fn, _ = failing_then("ok", 429, 429, 429)
+    scheduler.call("m", 10, fn)
+    # 0.275, then floored at min_rate_factor, plus one step
+    assert scheduler.stats()["rate_factor"]["m"] == pytest.approx(0.25)
+
+    for _ in range(20):
+        scheduler.call("m", 10, lambda: None)
+    assert scheduler.stats()["rate_factor"]["m"] == 1.0
+
+
+def test_async_calls_retry_too():
+    scheduler = Scheduler(default_limits=RateLimits(requests_per_minute=60_000), base_backoff=0.001)
+    sync_fn, calls = failing_then("ok", 429)
+
+    async def fn():
+        return sync_fn()
+
+    assert asyncio.run(scheduler.acall("m", 10, fn)) == "ok"
+    assert len(calls) == 2
+    assert scheduler.stats()["rate_factor"]["m"] == pytest.approx(0.55)
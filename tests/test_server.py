@@ -0,0 +1,143 @@
+import asyncio
+import json
+
+import pytest
+
+from benchmarks.samples import SAMPLE_ANALOGY_REQUEST
+from fake_model import FakeGenerativeModel
+from generate_analogy import LocalAnalogyService
+from personalized_exercise import PersonalizedExerciseService
+from server import ServerConfig, create_app, dumps
+
+
+def make_app(latency: float = 0.0, **config):
+    model = FakeGenerativeModel(latency=latency)
+    return create_app(ServerConfig(warm_up=False, **config), analogy_service=LocalAnalogyService(model=model),
+                      exercise_service=PersonalizedExerciseService(model=model))
+
+
+async def request(app, method: str, path: str, body: bytes = b"", headers=None, chunks=None):
+    """
+    Drive one request through the ASGI app; returns (status, headers, decoded body)
+    """
+    if headers is None:
+        headers = [(b"content-type", b"application/json"), (b"content-length", str(len(body)).encode())]
+    parts = chunks if chunks is not None else [body]
+    messages = [{"type": "http.request", "body": part, "more_body": index < len(parts) - 1}
+                for index, part in enumerate(parts)]
+    sent = []
+
+    async def receive():
+        return messages.pop(0) if messages else {"type": "http.disconnect"}
+
+    async def send(message):
+        sent.append(message)
+
+    await app({"type": "http", "method": method, "path": path, "headers": headers}, receive, send)
+    start, body = sent
+    payload = body["body"]
+    if dict(start["headers"]).get(b"content-type") == b"application/json":
+        payload = json.loads(payload)
+    return start["status"], dict(start["headers"]), payload
+
+
+def run(coroutine):
+    return asyncio.run(coroutine)
+
+
+def test_analogy_request_succeeds():
+    status, _, body = run(request(make_app(), "POST", "/analogy", dumps(SAMPLE_ANALOGY_REQUEST)))
+    assert status == 200
+    assert body["success"] is True
+
+
+@pytest.mark.parametrize("body, headers, error", [
+    (b"{", None, "Invalid request"),
+    (b"{}", None, "Invalid request"),
+    (b"{}", [(b"content-length", b"abc")], "Invalid Content-Length header"),
+    (b"{}", [(b"content-length", b"-1")], "Invalid Content-Length header"),
+])
+def test_bad_requests_get_400(body, headers, error):
+    status, _, payload = run(request(make_app(), "POST", "/analogy", body, headers))
+    assert status == 400
+    assert payload["success"] is False
+    assert payload["error"] == error
+
+
+def test_validation_errors_name_every_field():
+    body = dumps({"student_context": {"grade": "5"}, "question": 1})
+    status, _, payload = run(request(make_app(), "POST", "/analogy", body))
+    assert status == 400
+    assert payload["errors"] == ["$.student_context.grade: expected integer, got string",
+                                 "$.question: expected string, got integer"]
+
+
+def test_wrong_method_gets_405_and_unknown_path_404():
+    app = make_app()
+    assert run(request(app, "GET", "/analogy"))[0] == 405
+    assert run(request(app, "POST", "/health"))[0] == 405
+    assert run(request(app, "GET", "/nowhere"))[0] == 404
+
+
+def test_oversized_bodies_get_413():
+    app = make_app(max_body_bytes=100)
+    # Refused from the declared length, before reading the body
+    assert run(request(app, "POST", "/analogy", b"x" * 101))[0] == 413
+    # And while reading a chunked body without a length
+    status, _, payload = run(request(app, "POST", "/analogy", headers=[], chunks=[b"x" * 60, b"x" * 60]))
+    assert status == 413
+    assert payload["error"] == "Request body exceeds 100 bytes"
+
+
+def test_draining_refuses_new_requests_and_waits_for_in_flight_ones():
+    app = make_app(latency=0.2)
+    body = dumps(SAMPLE_ANALOGY_REQUEST)
+
+    async def scenario():
+        in_flight = asyncio.ensure_future(request(app, "POST", "/analogy", body))
+        while not app.in_flight:
+            await asyncio.sleep(0.005)
+        drain = asyncio.ensure_future(app.drain())
+        await asyncio.sleep(0)
+        refused = await request(app, "POST", "/analogy", body)
+        health = await request(app, "GET", "/health")
+        drained_early = drain.done()
+        await drain
+        return await in_flight, refused, health, drained_early
+
+    finished, refused, health, drained_early = run(scenario())
+    assert finished[0] == 200
+    assert refused[0] == 503
+    assert refused[1][b"connection"] == b"close"
+    assert refused[2]["error"] == "Server is shutting down"
+    assert health[0] == 503 and health[2]["status"] == "draining"
+    assert not drained_early
+    assert app.in_flight == 0
+
+
+def test_requests_beyond_max_concurrency_get_503():
+    app = make_app(latency=0.2, max_concurrency=1)
+    body = dumps(SAMPLE_ANALOGY_REQUEST)
+
+    async def scenario():
+        first = asyncio.ensure_future(request(app, "POST", "/analogy", body))
+        while not app.in_flight:
+            await asyncio.sleep(0.005)
+        second = await request(app, "POST", "/analogy", body)
+        return await first, second
+
+    first, second = run(scenario())
+    assert first[0] == 200
+    assert second[0] == 503
+    assert second[1][b"retry-after"] == b"1"
+
+
+def test_health_and_metrics():
+    app = make_app()
+    status, _, body = run(request(app, "GET", "/health"))
+    assert (status, body["status"]) == (200, "healthy")
+    run(request(app, "GET", "/nowhere"))
+    status, headers, text = run(request(app, "GET", "/metrics"))
+    assert status == 200
+    assert headers[b"content-type"].startswith(b"text/plain")
+    assert b'sahyogi_http_requests_total{route="other",status="404"}' in text
@@ -0,0 +1,118 @@
+import asyncio
+import threading
+import time
+
+import pytest
+
+from single_flight import SingleFlight
+
+
+def run_together(count: int, target):
+    results = [None] * count
+    errors = [None] * count
+
+    def run(index):
+        try:
+            results[index] = target()
+        except Exception as e:
+            errors[index] = e
+
+    threads = [threading.Thread(target=run, args=(index,)) for index in range(count)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return results, errors
+
+
+def release_when(condition, event: threading.Event) -> threading.Thread:
+    """
+    Set event once condition holds, e.g. once every caller has joined the flight
+    """
+    def watch():
+        deadline = time.monotonic() + 5
+        while not condition() and time.monotonic() < deadline:
+            time.sleep(0.001)
+        event.set()
+
+    thread = threading.Thread(target=watch)
+    thread.start()
+    return thread
+
+
+def test_concurrent_calls_share_one_run():
+    flight = SingleFlight()
+    release = threading.Event()
+    runs = []
+
+    def work():
+        runs.append(True)
+        release.wait(5)
+        return "answer"
+
+    watcher = release_when(lambda: flight.metrics.coalesced == 4, release)
+    results, errors = run_together(5, lambda: flight.do("key", work))
+    watcher.join()
+
+    assert runs == [True]
+    assert errors == [None] * 5
+    assert sorted(shared for _, shared in results) == [False, True, True, True, True]
+    assert {result for result, _ in results} == {"answer"}
+    assert (flight.metrics.executed, flight.metrics.coalesced) == (1, 4)
+    assert flight.metrics.coalesce_rate == pytest.approx(0.8)
+    assert flight.in_flight() == 0
+
+
+def test_leader_exception_reaches_every_waiter():
+    flight = SingleFlight()
+    release = threading.Event()
+
+    def work():
+        release.wait(5)
+        raise ValueError("model unavailable")
+
+    watcher = release_when(lambda: flight.metrics.coalesced == 2, release)
+    results, errors = run_together(3, lambda: flight.do("key", work))
+    watcher.join()
+
+    assert results == [None] * 3
+    assert all(isinstance(error, ValueError) and str(error) == "model unavailable" for error in errors)
+    # Nothing is remembered: the next call runs again
+    with pytest.raises(ValueError):
+        flight.do("key", work)
+    assert flight.metrics.executed == 2
+
+
+def test_different_keys_run_separately():
+    flight = SingleFlight()
+    assert flight.do("a", lambda: 1) == (1, False)
+    assert flight.do("b", lambda: 2) == (2, False)
+    assert flight.metrics.coalesced == 0
+
+
+def test_async_calls_share_one_run_and_its_exception():
+    flight = SingleFlight()
+    runs = []
+
+    async def work():
+        runs.append(True)
+        await asyncio.sleep(0.05)
+        return "answer"
+
+    async def failing():
+        await asyncio.sleep(0.05)
+        raise ValueError("model unavailable")
+
+    async def run():
+        shared = await asyncio.gather(*(flight.ado("key", work) for _ in range(4)))
+        failed = await asyncio.gather(*(flight.ado("other", failing) for _ in range(3)), return_exceptions=True)
+        return shared, failed
+
+    shared, failed = asyncio.run(run())
+    assert runs == [True]
+    assert [result for result, _ in shared] == ["answer"] * 4
+    assert [was_shared for _, was_shared in shared] == [False, True, True, True]
+    assert all(isinstance(error, ValueError) for error in failed)
+    assert (flight.metrics.executed, flight.metrics.coalesced) == (2, 5)
+    assert flight.in_flight() == 0
+
@@ -0,0 +1,65 @@
+import json
+import time
+
+from response_cache import InMemoryLRUCache, SQLiteCache
+from translation_memory import TranslationMemory
+
+
+def test_exact_then_normalized_matches():
+    memory = TranslationMemory()
+    memory.store("Why does it rain?", "English", "Hindi", "बारिश क्यों होती है?")
+    assert memory.lookup("Why does it rain?", "English", "Hindi") == "बारिश क्यों होती है?"
+    assert memory.lookup("  why does it RAIN ", "english", "hindi") == "बारिश क्यों होती है?"
+    assert (memory.metrics.exact_hits, memory.metrics.normalized_hits) == (1, 1)
+
+
+def test_language_pair_is_part_of_the_key():
+    memory = TranslationMemory()
+    memory.store("Why does it rain?", "English", "Hindi", "बारिश क्यों होती है?")
+    assert memory.lookup("Why does it rain?", "English", "Marathi") is None
+    assert memory.lookup("Why does it rain?", "Hindi", "English") is None
+    assert memory.metrics.misses == 2
+
+
+def test_entries_expire_after_the_ttl():
+    memory = TranslationMemory(ttl=0.05)
+    memory.store("rain", "English", "Hindi", "बारिश")
+    assert memory.lookup("rain", "English", "Hindi") == "बारिश"
+    time.sleep(0.1)
+    assert memory.lookup("rain", "English", "Hindi") is None
+
+
+def test_oldest_pairs_are_evicted_by_the_backend():
+    # Each pair takes two entries: the exact text and its normalized form
+    memory = TranslationMemory(InMemoryLRUCache(max_entries=4))
+    memory.store("rain", "English", "Hindi", "बारिश")
+    memory.store("sun", "English", "Hindi", "सूरज")
+    memory.store("moon", "English", "Hindi", "चाँद")
+    assert memory.lookup("rain", "English", "Hindi") is None
+    assert memory.lookup("sun", "English", "Hindi") == "सूरज"
+    assert memory.lookup("moon", "English", "Hindi") == "चाँद"
+    assert memory.backend.metrics.evictions == 2
+
+
+def test_sqlite_memory_survives_a_restart(tmp_path):
+    path = str(tmp_path / "tm.sqlite3")
+    first = TranslationMemory(SQLiteCache(path))
+    first.store("rain", "English", "Hindi", "बारिश")
+    first.backend.close()
+    assert TranslationMemory(SQLiteCache(path)).lookup("rain", "English", "Hindi") == "बारिश"
+
+
+def test_warm_up_from_jsonl_and_tsv(tmp_path):
+    jsonl = tmp_path / "tm.jsonl"
+    jsonl.write_text(json.dumps({"source_text": "rain", "source_language": "English",
+                                 "target_language": "Hindi", "translation": "बारिश"}, ensure_ascii=False)
+                     + "\n\n", encoding="utf-8")
+    tsv = tmp_path / "tm.tsv"
+    tsv.write_text("sun\tEnglish\tHindi\tसूरज\nmalformed row\n", encoding="utf-8")
+
+    memory = TranslationMemory()
+    assert memory.warm_up(str(jsonl)) == 1
+    assert memory.warm_up(str(tsv)) == 1
+    assert memory.lookup("rain", "English", "Hindi") == "बारिश"
+    assert memory.lookup("sun", "English", "Hindi") == "सूरज"
+    assert memory.stats()["entries"] == 4
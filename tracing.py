@@ -0,0 +1,408 @@
+import bisect
+import functools
+import inspect
+import random
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Callable, Dict, List, Optional, Tuple
+from dataclasses import dataclass, field
+
+# Latency buckets in seconds, from local parsing up to slow model calls
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+@dataclass
+class Span:
+    """
+    A finished or running span. Field and method names follow OpenTelemetry
+    (ids are hex strings, times are epoch nanoseconds).
+    """
+    name: str
+    trace_id: str
+    span_id: str
+    parent_id: Optional[str] = None
+    start_time: int = field(default_factory=time.time_ns)
+    end_time: Optional[int] = None
+    attributes: Dict[str, object] = field(default_factory=dict)
+    events: List[Tuple[str, int, Dict]] = field(default_factory=list)
+    status: str = "OK"
+
+    @property
+    def duration(self) -> float:
+        return ((self.end_time or time.time_ns()) - self.start_time) / 1e9
+
+    def set_attribute(self, key: str, value):
+        self.attributes[key] = value
+
+    def set_attributes(self, attributes: Dict):
+        self.attributes.update(attributes)
+
+    def add_event(self, name: str, attributes: Optional[Dict] = None):
+        self.events.append((name, time.time_ns(), attributes or {}))
+
+    def record_exception(self, exception: BaseException):
+        self.status = "ERROR"
+        self.add_event("exception", {"exception.type": type(exception).__name__, "exception.message": str(exception)})
+
+    def to_dict(self) -> Dict:
+        return {
+            "name": self.name,
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "start_time": self.start_time,
+            "end_time": self.end_time,
+            "duration": self.duration,
+            "attributes": dict(self.attributes),
+            "events": [{"name": name, "time": at, "attributes": attrs} for name, at, attrs in self.events],
+            "status": self.status
+        }
+
+
+class _NoOpSpan:
+    """
+    Span used while tracing is disabled; every method does nothing
+    """
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return None
+
+    def set_attribute(self, key: str, value):
+        pass
+
+    def set_attributes(self, attributes: Dict):
+        pass
+
+    def add_event(self, name: str, attributes: Optional[Dict] = None):
+        pass
+
+    def record_exception(self, exception: BaseException):
+        pass
+
+
+NOOP_SPAN = _NoOpSpan()
+
+_current_span: ContextVar[Optional[object]] = ContextVar("current_span", default=None)
+
+# Span ids need to be unique, not unpredictable
+_ids = random.Random()
+
+
+class MetricsRegistry:
+    """
+    Counters, gauges and histograms rendered in the Prometheus text exposition format
+    """
+
+    def __init__(self, buckets: Tuple[float, ...] = DEFAULT_BUCKETS):
+        self.buckets = buckets
+        self._help: Dict[str, Tuple[str, str]] = {}
+        # Counter and gauge values; _help records which kind each name is
+        self._counters: Dict[Tuple[str, Tuple], float] = {}
+        self._histograms: Dict[Tuple[str, Tuple], List] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, name: str, amount: float = 1.0, help: str = "", **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self._help.setdefault(name, ("counter", help))
+            self._counters[key] = self._counters.get(key, 0.0) + amount
+
+    def set(self, name: str, value: float, help: str = "", **labels):
+        """
+        Set a gauge
+        """
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self._help.setdefault(name, ("gauge", help))
+            self._counters[key] = value
+
+    def observe(self, name: str, value: float, help: str = "", **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self._help.setdefault(name, ("histogram", help))
+            state = self._histograms.get(key)
+            if state is None:
+                # Per-bucket counts, then sum and count
+                state = self._histograms[key] = [[0] * len(self.buckets), 0.0, 0]
+            index = bisect.bisect_left(self.buckets, value)
+            if index < len(self.buckets):
+                state[0][index] += 1
+            state[1] += value
+            state[2] += 1
+
+    def render(self) -> str:
+        with self._lock:
+            counters = sorted(self._counters.items())
+            histograms = sorted((key, ([*state[0]], state[1], state[2])) for key, state in self._histograms.items())
+            described = dict(self._help)
+        lines = []
+        seen = set()
+
+        def header(name: str):
+            if name not in seen:
+                seen.add(name)
+                kind, help_text = described[name]
+                if help_text:
+                    lines.append(f"# HELP {name} {help_text}")
+                lines.append(f"# TYPE {name} {kind}")
+
+        for (name, labels), value in counters:
+            header(name)
+            lines.append(f"{name}{_labels(labels)} {_number(value)}")
+        for (name, labels), (counts, total, count) in histograms:
+            header(name)
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets, counts):
+                cumulative += bucket_count
+                lines.append(f"{name}_bucket{_labels(labels + (('le', _number(bound)),))} {cumulative}")
+            lines.append(f"{name}_bucket{_labels(labels + (('le', '+Inf'),))} {count}")
+            lines.append(f"{name}_sum{_labels(labels)} {_number(total)}")
+            lines.append(f"{name}_count{_labels(labels)} {count}")
+        return "\n".join(lines) + "\n"
+
+
+def _labels(labels: Tuple) -> str:
+    if not labels:
+        return ""
+    escaped = (f'{key}="{_escape(value)}"' for key, value in labels)
+    return "{" + ",".join(escaped) + "}"
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _number(value: float) -> str:
+    return repr(int(value)) if float(value).is_integer() else repr(float(value))
+
+
+class InMemoryExporter:
+    """
+    Keeps finished spans in memory, for tests and benchmarks
+    """
+
+    def __init__(self):
+        self._spans: List[Span] = []
+        self._lock = threading.Lock()
+
+    def export(self, span: Span):
+        with self._lock:
+            self._spans.append(span)
+
+    def get_finished_spans(self) -> List[Span]:
+        with self._lock:
+            return list(self._spans)
+
+    def clear(self):
+        with self._lock:
+            self._spans.clear()
+
+
+class NoOpTracer:
+    """
+    Default tracer: records nothing and costs one attribute check per stage
+    """
+    enabled = False
+    metrics = None
+
+    def span(self, name: str, attributes: Optional[Dict] = None, activate: bool = True):
+        return NOOP_SPAN
+
+
+class Tracer:
+    """
+    Records spans for every stage and model call, hands finished spans to
+    the exporter and feeds span latencies into the metrics registry.
+
+    activate=False records a span without making it the parent of spans
+    started inside it; generators use it, since they suspend between yields.
+    """
+    enabled = True
+
+    def __init__(self, exporter: Optional[InMemoryExporter] = None, metrics: Optional[MetricsRegistry] = None):
+        self.exporter = exporter
+        self.metrics = metrics or MetricsRegistry()
+
+    @contextmanager
+    def span(self, name: str, attributes: Optional[Dict] = None, activate: bool = True):
+        parent = _current_span.get()
+        span = Span(
+            name,
+            trace_id=parent.trace_id if isinstance(parent, Span) else f"{_ids.getrandbits(128):032x}",
+            span_id=f"{_ids.getrandbits(64):016x}",
+            parent_id=parent.span_id if isinstance(parent, Span) else None,
+            attributes=dict(attributes or {})
+        )
+        token = _current_span.set(span) if activate else None
+        try:
+            yield span
+        except BaseException as e:
+            span.record_exception(e)
+            raise
+        finally:
+            if token is not None:
+                _current_span.reset(token)
+            span.end_time = time.time_ns()
+            self.metrics.observe("sahyogi_span_duration_seconds", span.duration,
+                                 help="Latency of each pipeline stage and model call", span=name)
+            if self.exporter is not None:
+                self.exporter.export(span)
+
+
+class OpenTelemetryTracer:
+    """
+    Sends spans to an OpenTelemetry tracer (opentelemetry-api must be
+    installed and an SDK configured to export them); metrics still go to
+    the registry so the Prometheus endpoint works alongside OTLP export.
+    """
+    enabled = True
+
+    def __init__(self, tracer=None, metrics: Optional[MetricsRegistry] = None):
+        if tracer is None:
+            from opentelemetry import trace
+            tracer = trace.get_tracer("sahyogi")
+        self._tracer = tracer
+        self.metrics = metrics or MetricsRegistry()
+
+    @contextmanager
+    def span(self, name: str, attributes: Optional[Dict] = None, activate: bool = True):
+        started = time.perf_counter()
+        if activate:
+            context = self._tracer.start_as_current_span(name, attributes=attributes)
+        else:
+            context = self._tracer.start_span(name, attributes=attributes)
+        with context as span:
+            token = _current_span.set(span) if activate else None
+            try:
+                yield span
+            finally:
+                if token is not None:
+                    _current_span.reset(token)
+                self.metrics.observe("sahyogi_span_duration_seconds", time.perf_counter() - started,
+                                     help="Latency of each pipeline stage and model call", span=name)
+
+
+_tracer = NoOpTracer()
+
+
+def get_tracer():
+    return _tracer
+
+
+def set_tracer(tracer):
+    """
+    Install the process-wide tracer; pass NoOpTracer() to disable tracing again
+    """
+    global _tracer
+    _tracer = tracer
+
+
+def span(name: str, attributes: Optional[Dict] = None, activate: bool = True):
+    return _tracer.span(name, attributes, activate)
+
+
+def current_span():
+    """
+    The active span, or a no-op span outside of one or while tracing is disabled
+    """
+    if not _tracer.enabled:
+        return NOOP_SPAN
+    return _current_span.get() or NOOP_SPAN
+
+
+def traced(name: str):
+    """
+    Run the decorated function or coroutine function inside a span called name
+    """
+    def decorate(fn: Callable):
+        if inspect.iscoroutinefunction(fn):
+            @functools.wraps(fn)
+            async def async_wrapper(*args, **kwargs):
+                if not _tracer.enabled:
+                    return await fn(*args, **kwargs)
+                with _tracer.span(name):
+                    return await fn(*args, **kwargs)
+            return async_wrapper
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            if not _tracer.enabled:
+                return fn(*args, **kwargs)
+            with _tracer.span(name):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorate
+
+
+def record_model_call(model_span, step: str, model_name: str, prompt_tokens: int, response_tokens: int):
+    """
+    Attach token counts to a model-call span and count them per step
+    """
+    if not _tracer.enabled:
+        return
+    model_span.set_attributes({"llm.prompt_tokens": prompt_tokens, "llm.response_tokens": response_tokens})
+    metrics = _tracer.metrics
+    metrics.inc("sahyogi_model_calls_total", help="Model calls per pipeline step", step=step, model=model_name)
+    metrics.inc("sahyogi_model_tokens_total", prompt_tokens, help="Estimated tokens sent and received",
+                step=step, direction="prompt")
+    metrics.inc("sahyogi_model_tokens_total", response_tokens, step=step, direction="response")
+
+
+def record_cache(cache: str, hit: bool):
+    """
+    Count a cache lookup and mark the current span with its outcome
+    """
+    if not _tracer.enabled:
+        return
+    current_span().set_attribute(f"cache.{cache}.hit", hit)
+    _tracer.metrics.inc("sahyogi_cache_lookups_total", help="Cache lookups by cache and outcome",
+                        cache=cache, result="hit" if hit else "miss")
+
+
+def record_retry(model_name: str, code: Optional[int]):
+    """
+    Count a retried model call and add a retry event to the current span
+    """
+    if not _tracer.enabled:
+        return
+    current_span().add_event("retry", {"http.status_code": code})
+    _tracer.metrics.inc("sahyogi_model_retries_total", help="Model calls retried after 429/503",
+                        model=model_name, code=str(code))
+
+
+def render_metrics() -> str:
+    """
+    Current metrics in the Prometheus text format (empty while tracing is disabled)
+    """
+    return _tracer.metrics.render() if _tracer.metrics is not None else ""
+
+
+def serve_metrics(port: int = 9464, host: str = "0.0.0.0"):
+    """
+    Serve /metrics for Prometheus scraping from a daemon thread; returns the server
+    """
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    class MetricsHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path != "/metrics":
+                self.send_error(404)
+                return
+            body = render_metrics().encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer((host, port), MetricsHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
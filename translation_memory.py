@@ -0,0 +1,103 @@
+import csv
+import hashlib
+import json
+import unicodedata
+from typing import Dict, Optional
+from dataclasses import dataclass, asdict
+
+from response_cache import CacheBackend, InMemoryLRUCache
+
+
+def normalize_for_match(text: str) -> str:
+    """
+    Fold case, punctuation and whitespace so trivially different phrasings match
+    """
+    folded = "".join(ch for ch in text.casefold() if not unicodedata.category(ch).startswith("P"))
+    return " ".join(folded.split())
+
+
+def translation_key(text: str, source_language: str, target_language: str, normalized: bool = False) -> str:
+    """
+    Key for a translation pair; exact and normalized entries live side by side
+    """
+    kind = "norm" if normalized else "exact"
+    body = normalize_for_match(text) if normalized else text
+    digest = hashlib.sha256(body.encode("utf-8")).hexdigest()
+    return f"tm:{kind}:{source_language.strip().lower()}:{target_language.strip().lower()}:{digest}"
+
+
+@dataclass
+class TranslationMemoryMetrics:
+    exact_hits: int = 0
+    normalized_hits: int = 0
+    misses: int = 0
+    stores: int = 0
+
+    @property
+    def hit_rate(self) -> float:
+        lookups = self.exact_hits + self.normalized_hits + self.misses
+        return (self.exact_hits + self.normalized_hits) / lookups if lookups else 0.0
+
+    def to_dict(self) -> Dict:
+        return dict(asdict(self), hit_rate=self.hit_rate)
+
+
+class TranslationMemory:
+    """
+    Translation memory keyed on (source text hash, source language, target language).
+
+    Entries are stored in a response_cache backend, so persistence and
+    eviction come from the backend: use SQLiteCache for a memory that
+    survives restarts, or InMemoryLRUCache (the default) for a process-local one.
+    """
+
+    def __init__(self, backend: Optional[CacheBackend] = None, ttl: Optional[float] = None):
+        self.backend = backend if backend is not None else InMemoryLRUCache(max_entries=50000)
+        self.ttl = ttl
+        self.metrics = TranslationMemoryMetrics()
+
+    def lookup(self, text: str, source_language: str, target_language: str) -> Optional[str]:
+        """
+        Return a stored translation, trying an exact match before a normalized one
+        """
+        translation = self.backend.get(translation_key(text, source_language, target_language))
+        if translation is not None:
+            self.metrics.exact_hits += 1
+            return translation
+
+        translation = self.backend.get(translation_key(text, source_language, target_language, normalized=True))
+        if translation is not None:
+            self.metrics.normalized_hits += 1
+            return translation
+
+        self.metrics.misses += 1
+        return None
+
+    def store(self, text: str, source_language: str, target_language: str, translation: str):
+        self.backend.set(translation_key(text, source_language, target_language), translation, self.ttl)
+        self.backend.set(translation_key(text, source_language, target_language, normalized=True), translation, self.ttl)
+        self.metrics.stores += 1
+
+    def warm_up(self, path: str) -> int:
+        """
+        Bulk-load translations from a file and return the number of entries loaded.
+
+        .jsonl files hold one object per line with source_text, source_language,
+        target_language and translation; any other file is read as tab-separated
+        columns in that order.
+        """
+        loaded = 0
+        with open(path, encoding="utf-8", newline="") as handle:
+            if path.endswith(".jsonl"):
+                rows = (json.loads(line) for line in handle if line.strip())
+                rows = ((row["source_text"], row["source_language"], row["target_language"], row["translation"])
+                        for row in rows)
+            else:
+                rows = (row for row in csv.reader(handle, delimiter="\t") if len(row) == 4)
+            for source_text, source_language, target_language, translation in rows:
+                self.store(source_text, source_language, target_language, translation)
+                loaded += 1
+        return loaded
+
+    def stats(self) -> Dict:
+        return dict(self.metrics.to_dict(), entries=len(self.backend))